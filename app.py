@@ -1,7 +1,12 @@
-import streamlit as st
+import hashlib
+import io
+import os
+
+import numpy as np
 import pandas as pd
 import joblib
-from dash.healthscore import calculate_health_score
+import streamlit as st
+from backend.healthscore import calculate_health_scores
 
 # ==============================
 # Streamlit Page Setup
@@ -9,88 +14,172 @@ from dash.healthscore import calculate_health_score
 st.set_page_config(page_title="SME Financial Health", layout="wide")
 st.title("📊 SME Financial Health Assessment")
 
+ARTIFACTS = ("financial_health_model.pkl", "label_encoder.pkl", "feature_columns.pkl")
+
+# Scored uploads kept in memory; each entry is one portfolio
+RESULT_CACHE_ENTRIES = 8
+PAGE_SIZES = (50, 100, 500, 1000)
+# Points per chart series, whatever the portfolio size
+CHART_POINTS = 2000
+
 # ==============================
 # Load Model & Artifacts
 # ==============================
-model = joblib.load("financial_health_model.pkl")
-le = joblib.load("label_encoder.pkl")
-feature_cols = joblib.load("feature_columns.pkl")
+def artifact_version():
+    """
+    Modification times of the artifacts, so retraining invalidates the
+    cached model and every cached result scored with the old one.
+    """
+    return tuple(os.path.getmtime(path) for path in ARTIFACTS)
 
-st.sidebar.info("Upload SME financial data CSV to assess financial health.")
 
-# ==============================
-# File Upload
-# ==============================
-uploaded_file = st.file_uploader("Upload CSV", type=["csv"])
+@st.cache_resource(show_spinner="Loading model…")
+def load_artifacts(version):
+    model = joblib.load("financial_health_model.pkl")
+    le = joblib.load("label_encoder.pkl")
+    feature_cols = joblib.load("feature_columns.pkl")
+    return model, le, feature_cols
 
-if uploaded_file:
-    df = pd.read_csv(uploaded_file)
-    df.columns = df.columns.str.strip()
 
-    # ==============================
-    # 1️⃣ Feature Engineering (SAFE)
-    # ==============================
+# ==============================
+# Assessment (cached per upload)
+# ==============================
+def engineer_features(df):
+    """
+    Adds Cost_Ratio / Profit_Margin when missing. Returns (warnings, error).
+    """
+    warnings = []
 
-    # Cost Ratio
     if "Cost_Ratio" not in df.columns:
         if {"COGS", "Revenue"}.issubset(df.columns):
             df["Cost_Ratio"] = df["COGS"] / df["Revenue"].replace(0, 1)
         else:
-            st.error("❌ Missing COGS or Revenue to compute Cost_Ratio")
-            st.stop()
+            return warnings, "❌ Missing COGS or Revenue to compute Cost_Ratio"
 
-    # Profit Margin (FIX FOR YOUR ERROR)
     if "Profit_Margin" not in df.columns:
         if {"NetProfit", "Revenue"}.issubset(df.columns):
             df["Profit_Margin"] = df["NetProfit"] / df["Revenue"].replace(0, 1)
         else:
-            st.warning("⚠️ Profit_Margin cannot be computed (NetProfit/Revenue missing)")
+            warnings.append("⚠️ Profit_Margin cannot be computed (NetProfit/Revenue missing)")
             df["Profit_Margin"] = 0  # safe fallback
 
-    # ==============================
-    # 2️⃣ Feature Validation
-    # ==============================
+    return warnings, None
+
+
+def downsample(df, columns, points=CHART_POINTS):
+    """
+    At most `points` rows for a line chart: consecutive rows are grouped
+    into equal buckets and each bucket is drawn as its mean, indexed by the
+    bucket's first row.
+    """
+    frame = df[columns]
+    if len(frame) <= points:
+        return frame
+    buckets = np.arange(len(frame)) * points // len(frame)
+    sampled = frame.groupby(buckets).mean()
+    sampled.index = np.searchsorted(buckets, sampled.index)
+    return sampled
+
+
+@st.cache_data(max_entries=RESULT_CACHE_ENTRIES, show_spinner="Scoring portfolio…")
+def assess_upload(digest, version, _raw):
+    """
+    Scored portfolio for an upload. Keyed by the upload's SHA-256 and the
+    artifact version; the raw bytes (underscore) are not hashed again.
+    """
+    model, le, feature_cols = load_artifacts(version)
+
+    df = pd.read_csv(io.BytesIO(_raw))
+    df.columns = df.columns.str.strip()
+
+    warnings, error = engineer_features(df)
+    if error:
+        return {"error": error, "warnings": warnings}
+
     missing_features = [f for f in feature_cols if f not in df.columns]
     if missing_features:
-        st.error(f"❌ Missing required model features: {missing_features}")
-        st.stop()
+        return {"error": f"❌ Missing required model features: {missing_features}", "warnings": warnings}
 
-    # ==============================
-    # 3️⃣ Model Input Alignment
-    # ==============================
-    X = df[feature_cols]
+    # One predict_proba pass gives both the class and its confidence
+    probs = model.predict_proba(df[feature_cols])
+    df["Health_Status"] = le.inverse_transform(model.classes_[probs.argmax(axis=1)])
+    df["Confidence"] = probs.max(axis=1).round(2)
+    df["Health_Score"] = calculate_health_scores(df)
 
-    # ==============================
-    # 4️⃣ Predictions
-    # ==============================
-    preds = model.predict(X)
-    probs = model.predict_proba(X).max(axis=1)
+    trend = None
+    if {"Revenue", "NetProfit"}.issubset(df.columns):
+        trend = downsample(df, ["Revenue", "NetProfit"])
+
+    return {
+        "error": None,
+        "warnings": warnings,
+        "df": df,
+        "kpis": {
+            "avg_score": round(df["Health_Score"].mean(), 1),
+            "healthy": int((df["Health_Status"] == "Healthy").sum()),
+            "risky": int((df["Health_Status"] == "Risky").sum()),
+        },
+        "by_status": df.groupby("Health_Status")["Health_Score"].mean(),
+        "trend": trend,
+    }
 
-    df["Health_Status"] = le.inverse_transform(preds)
-    df["Confidence"] = probs.round(2)
 
-    # ==============================
-    # 5️⃣ Health Score Calculation
-    # ==============================
-    df["Health_Score"] = df.apply(calculate_health_score, axis=1)
+st.sidebar.info("Upload SME financial data CSV to assess financial health.")
+
+# ==============================
+# File Upload
+# ==============================
+uploaded_file = st.file_uploader("Upload CSV", type=["csv"])
+
+if uploaded_file:
+    raw = uploaded_file.getvalue()
+    result = assess_upload(hashlib.sha256(raw).hexdigest(), artifact_version(), raw)
+
+    for warning in result["warnings"]:
+        st.warning(warning)
+    if result["error"]:
+        st.error(result["error"])
+        st.stop()
+
+    df = result["df"]
 
     # ==============================
-    # 6️⃣ KPIs
+    # KPIs
     # ==============================
+    kpis = result["kpis"]
     col1, col2, col3 = st.columns(3)
-    col1.metric("Avg Health Score", round(df["Health_Score"].mean(), 1))
-    col2.metric("Healthy SMEs", (df["Health_Status"] == "Healthy").sum())
-    col3.metric("Risky SMEs", (df["Health_Status"] == "Risky").sum())
+    col1.metric("Avg Health Score", kpis["avg_score"])
+    col2.metric("Healthy SMEs", kpis["healthy"])
+    col3.metric("Risky SMEs", kpis["risky"])
 
     # ==============================
-    # 7️⃣ Visuals
+    # Paginated Table
     # ==============================
+    # Only the current page is sent to the browser
     st.subheader("📋 SME Financial Assessment")
-    st.dataframe(df, use_container_width=True)
+    filter_col, size_col, page_col = st.columns(3)
+    status = filter_col.selectbox("Health status", ["All"] + sorted(df["Health_Status"].unique()))
+    page_size = size_col.selectbox("Rows per page", PAGE_SIZES, index=1)
 
+    view = df if status == "All" else df[df["Health_Status"] == status]
+    pages = max(1, -(-len(view) // page_size))
+    # keyed by the view so a new filter or page size starts at page 1
+    page = page_col.number_input(f"Page (of {pages:,})", min_value=1, max_value=pages, value=1,
+                                 key=f"page-{status}-{page_size}")
+
+    start = (page - 1) * page_size
+    st.dataframe(view.iloc[start:start + page_size], use_container_width=True)
+    if len(view):
+        st.caption(f"Rows {start + 1:,}–{min(start + page_size, len(view)):,} of {len(view):,}")
+
+    # ==============================
+    # Visuals
+    # ==============================
     st.subheader("📊 Avg Health Score by Status")
-    st.bar_chart(df.groupby("Health_Status")["Health_Score"].mean())
+    st.bar_chart(result["by_status"])
 
-    if {"Revenue", "NetProfit"}.issubset(df.columns):
+    if result["trend"] is not None:
         st.subheader("📈 Revenue vs Net Profit")
-        st.line_chart(df[["Revenue", "NetProfit"]])
+        if len(df) > CHART_POINTS:
+            st.caption(f"Mean per {-(-len(df) // CHART_POINTS):,} rows")
+        st.line_chart(result["trend"])
@@ -1,17 +1,20 @@
 from fastapi import APIRouter
 from pydantic import BaseModel
-from backend.llm.gemini_client import GeminiClient
-import os
+
+from llm.fallback import fallback_financial_report
+from llm.gemini_client import get_client, LLMError
 
 router = APIRouter()
-client = GeminiClient(api_key=os.getenv("GEMINI_API_KEY"))
 
 class FinancialRequest(BaseModel):
     prompt: str
 
 @router.post("/analyze")
 async def analyze_financials(req: FinancialRequest):
-    result = await client.generate_financial_report(req.prompt)
+    try:
+        result = await get_client().generate_financial_report(req.prompt)
+    except LLMError:
+        result = fallback_financial_report({})
     return {
         "analysis": result
     }
@@ -0,0 +1,164 @@
+"""
+/history latency while the threadpool is busy: sync vs async sessions.
+
+Sync routes run in Starlette's threadpool, so when its tokens are taken by
+other blocking work (uploads being persisted, jobs, slow sync endpoints)
+every /history request queues behind them. The async route awaits the
+database on the event loop instead. Both variants serve the same query
+from the same SQLite file while `--busy` tasks keep submitting blocking
+snapshot writes to the threadpool, which is capped at `--threads` tokens.
+
+    python -m benchmarks.bench_async_db --requests 400 --concurrency 32
+"""
+import argparse
+import asyncio
+import os
+import tempfile
+import threading
+import time
+
+import anyio
+import httpx
+import numpy as np
+from fastapi import Depends, FastAPI
+from sqlalchemy.ext.asyncio import async_sessionmaker
+from sqlalchemy.orm import sessionmaker
+
+from benchmarks.bench_snapshot_writes import make_scored_frame
+from database.batches import create_batch
+from database.database import make_engine, make_async_engine
+from database.models import Base
+from database.snapshots import write_snapshots, query_history, query_history_async
+
+
+def build_app(path):
+    engine = make_engine(f"sqlite:///{path}")
+    async_engine = make_async_engine(f"sqlite:///{path}")
+    Session = sessionmaker(bind=engine)
+    AsyncSession = async_sessionmaker(bind=async_engine, expire_on_commit=False)
+
+    def get_db():
+        db = Session()
+        try:
+            yield db
+        finally:
+            db.close()
+
+    async def get_async_db():
+        async with AsyncSession() as db:
+            yield db
+
+    app = FastAPI()
+
+    @app.get("/sync")
+    def history_sync(db=Depends(get_db)):
+        items, next_cursor = query_history(db, limit=50)
+        return {"items": items, "next_cursor": next_cursor}
+
+    @app.get("/async")
+    async def history_async(db=Depends(get_async_db)):
+        items, next_cursor = await query_history_async(db, limit=50)
+        return {"items": items, "next_cursor": next_cursor}
+
+    return app, engine, async_engine
+
+
+def busy_write(Session, frame, hold):
+    """
+    One blocking snapshot write, like a sync upload holding a threadpool
+    token until its commit returns. The transaction is kept open for `hold`
+    seconds to stand in for a slow disk or a remote database; the other
+    writers wait on SQLite's lock meanwhile.
+    """
+    db = Session()
+    try:
+        write_snapshots(db, frame, create_batch(db, "busy", row_count=len(frame)).id)
+        time.sleep(hold)
+        db.commit()
+    finally:
+        db.close()
+
+
+async def measure(app, engine, route, args, frame):
+    limiter = anyio.to_thread.current_default_thread_limiter()
+    limiter.total_tokens = args.threads
+
+    Session = sessionmaker(bind=engine)
+    stop = threading.Event()
+    latencies = []
+
+    async def occupy():
+        while not stop.is_set():
+            await anyio.to_thread.run_sync(busy_write, Session, frame, args.hold_ms / 1000)
+
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+        gate = asyncio.Semaphore(args.concurrency)
+
+        async def one():
+            async with gate:
+                start = time.perf_counter()
+                response = await client.get(route)
+                assert response.status_code == 200, response.text[:200]
+                latencies.append((time.perf_counter() - start) * 1e3)
+
+        async with anyio.create_task_group() as tg:
+            for _ in range(args.busy):
+                tg.start_soon(occupy)
+            await anyio.sleep(0.2)  # let the writers take their tokens
+
+            start = time.perf_counter()
+            await asyncio.gather(*(one() for _ in range(args.requests)))
+            elapsed = time.perf_counter() - start
+            stop.set()
+    return elapsed, latencies
+
+
+async def check_parity(app):
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+        sync_page = (await client.get("/sync")).json()
+        async_page = (await client.get("/async")).json()
+    assert sync_page == async_page, "sync and async /history pages differ"
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--requests", type=int, default=400)
+    parser.add_argument("--concurrency", type=int, default=32)
+    parser.add_argument("--threads", type=int, default=8, help="threadpool tokens")
+    parser.add_argument("--busy", type=int, default=8, help="tasks submitting blocking writes")
+    parser.add_argument("--busy-rows", type=int, default=200, help="rows per busy write")
+    parser.add_argument("--hold-ms", type=float, default=50, help="time each write keeps its transaction open")
+    parser.add_argument("--seed-rows", type=int, default=20000)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "history.db")
+        app, engine, async_engine = build_app(path)
+        Base.metadata.create_all(bind=engine)
+        db = sessionmaker(bind=engine)()
+        write_snapshots(db, make_scored_frame(args.seed_rows, seed=1), create_batch(db, "seed").id)
+        db.commit()
+        db.close()
+
+        async def run():
+            await check_parity(app)
+            frame = make_scored_frame(args.busy_rows, seed=2)
+            results = {route: await measure(app, engine, route, args, frame) for route in ("/sync", "/async")}
+            await async_engine.dispose()
+            return results
+
+        results = asyncio.run(run())
+        engine.dispose()
+
+    print(f"{args.requests} /history requests, {args.concurrency} concurrent, "
+          f"{args.busy} writers competing for {args.threads} threadpool tokens")
+    print(f"{'route':<7} {'req/s':>8} {'p50 ms':>8} {'p95 ms':>8} {'max ms':>8}")
+    for route, (elapsed, latencies) in results.items():
+        print(f"{route:<7} {args.requests / elapsed:8.1f} {np.percentile(latencies, 50):8.1f} "
+              f"{np.percentile(latencies, 95):8.1f} {max(latencies):8.1f}")
+
+
+if __name__ == "__main__":
+    main()
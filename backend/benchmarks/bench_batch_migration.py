@@ -0,0 +1,154 @@
+"""
+Per-row insight copies vs assessment batches.
+
+Builds a database in the old layout (the insight text on every
+sme_snapshots row), upgrades it with database.migrations.upgrade() and
+checks every snapshot still resolves to the insight it had, then compares
+file sizes, and the bytes one more upload adds, in each layout.
+
+    python -m benchmarks.bench_batch_migration --uploads 20 --rows 20000
+"""
+import argparse
+import os
+import sqlite3
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+from sqlalchemy import create_engine, func, select
+from sqlalchemy.orm import Session
+
+from benchmarks.bench_snapshot_writes import make_scored_frame
+from database.batches import create_batch
+from database.migrations import upgrade
+from database.models import AssessmentBatch, Base, SMESnapshot
+from database.rollups import rebuild, verify
+from database.snapshots import SNAPSHOT_COLUMNS, write_snapshots
+
+LEGACY_DDL = """
+CREATE TABLE sme_snapshots (
+    id INTEGER PRIMARY KEY,
+    transaction_id VARCHAR,
+    revenue FLOAT,
+    profit_margin FLOAT,
+    cost_ratio FLOAT,
+    health_score INTEGER,
+    health_status VARCHAR,
+    confidence FLOAT,
+    insight VARCHAR,
+    created_at DATETIME
+);
+CREATE INDEX ix_sme_snapshots_created_at_id ON sme_snapshots (created_at, id);
+CREATE INDEX ix_sme_snapshots_status_created_at_id ON sme_snapshots (health_status, created_at, id);
+CREATE INDEX ix_sme_snapshots_transaction_id ON sme_snapshots (transaction_id);
+"""
+
+
+def report_text(upload):
+    """
+    An LLM-sized report (~2 KB), different for every upload.
+    """
+    lines = [f"FINANCIAL HEALTH REPORT #{upload}", "-" * 22]
+    lines += [f"• Recommendation {i}: review cost ratios and receivables for segment {i}." for i in range(24)]
+    return "\n".join(lines)
+
+
+def legacy_rows(df, insight, created_at):
+    keys = list(SNAPSHOT_COLUMNS.values())
+    columns = [df[name].astype(object).where(df[name].notna(), None).tolist() for name in SNAPSHOT_COLUMNS]
+    return [(*values, insight, created_at.isoformat(sep=" ")) for values in zip(*columns)], keys
+
+
+def write_legacy(conn, df, insight, created_at):
+    rows, keys = legacy_rows(df, insight, created_at)
+    placeholders = ", ".join("?" * (len(keys) + 2))
+    conn.executemany(
+        f"INSERT INTO sme_snapshots ({', '.join(keys)}, insight, created_at) VALUES ({placeholders})", rows
+    )
+    conn.commit()
+
+
+def vacuumed_size(path):
+    conn = sqlite3.connect(path)
+    conn.execute("VACUUM")
+    conn.close()
+    return os.path.getsize(path)
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--uploads", type=int, default=20)
+    parser.add_argument("--rows", type=int, default=20000, help="rows per upload")
+    args = parser.parse_args()
+
+    frame = make_scored_frame(args.rows)
+    start_day = datetime(2024, 1, 1)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "legacy.db")
+        conn = sqlite3.connect(path)
+        conn.executescript(LEGACY_DDL)
+        expected = {}
+        for upload in range(args.uploads):
+            insight = report_text(upload)
+            write_legacy(conn, frame, insight, start_day + timedelta(hours=upload))
+            expected[upload] = insight
+        conn.close()
+        legacy_size = vacuumed_size(path)
+
+        engine = create_engine(f"sqlite:///{path}")
+        Base.metadata.create_all(bind=engine)
+        start = time.perf_counter()
+        upgrade(engine)
+        migrate_time = time.perf_counter() - start
+
+        with Session(bind=engine) as db:
+            batches = db.execute(select(func.count()).select_from(AssessmentBatch)).scalar()
+            assert batches == args.uploads, f"{batches} batches for {args.uploads} distinct insights"
+            orphans = db.execute(select(func.count()).where(SMESnapshot.batch_id.is_(None))).scalar()
+            assert orphans == 0, f"{orphans} snapshots without a batch"
+
+            # Snapshot ids were assigned upload by upload
+            per_batch = db.execute(
+                select(SMESnapshot.batch_id, func.min(SMESnapshot.id), AssessmentBatch.insight,
+                       AssessmentBatch.row_count)
+                .join(AssessmentBatch, AssessmentBatch.id == SMESnapshot.batch_id)
+                .group_by(SMESnapshot.batch_id)
+            ).all()
+            for _, first_id, insight, row_count in per_batch:
+                assert insight == expected[(first_id - 1) // args.rows], "snapshot lost its insight"
+                assert row_count == args.rows
+
+            rebuild(db)
+            assert not verify(db)
+        engine.dispose()
+        batch_size = vacuumed_size(path)
+
+        # One more upload written in each layout
+        legacy_write_path = os.path.join(tmp, "legacy_write.db")
+        conn = sqlite3.connect(legacy_write_path)
+        conn.executescript(LEGACY_DDL)
+        write_legacy(conn, frame, report_text(-1), datetime.utcnow())
+        conn.close()
+        legacy_write_size = os.path.getsize(legacy_write_path)
+
+        new_path = os.path.join(tmp, "batches_write.db")
+        engine = create_engine(f"sqlite:///{new_path}")
+        Base.metadata.create_all(bind=engine)
+        with Session(bind=engine) as db:
+            batch = create_batch(db, "benchmark", insight=report_text(-1), row_count=len(frame))
+            write_snapshots(db, frame, batch.id)
+            db.commit()
+        engine.dispose()
+        batch_write_size = os.path.getsize(new_path)
+
+    total_rows = args.uploads * args.rows
+    print(f"✅ {total_rows:,} snapshots in {args.uploads} batches, every insight preserved "
+          f"(migration took {migrate_time:.2f} s)")
+    print(f"{'':<22} {'per-row insight':>16} {'batches':>10}")
+    print(f"{'database size (MB)':<22} {legacy_size / 1e6:16.1f} {batch_size / 1e6:10.1f}")
+    print(f"{'one upload (MB)':<22} {legacy_write_size / 1e6:16.1f} {batch_write_size / 1e6:10.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,132 @@
+"""
+Cold start of the API: import time and time to first response.
+
+Each run starts uvicorn in a fresh process against a throwaway database
+and measures:
+
+    import     `import main` in a fresh interpreter (median of --imports)
+    live       first 200 from GET /health/live
+    ready      first 200 from GET /health/ready (warm-up finished)
+    predict    latency of the first POST /predict once ready
+
+once with the warm-up and once with WARMUP_ENABLED=0, where the first
+/predict loads the model itself:
+
+    python -m benchmarks.bench_cold_start --runs 3
+"""
+import argparse
+import os
+import socket
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+import httpx
+
+from benchmarks.sme_data import sme_csv_bytes
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+HEAVY_MODULES = ("pandas", "sklearn", "joblib", "pyarrow")
+
+
+def free_port():
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def server_env(tmp, **overrides):
+    env = dict(os.environ)
+    env.update({
+        "DATABASE_URL": f"sqlite:///{os.path.join(tmp, 'cold.db')}",
+        "ASYNC_DATABASE_URL": "",
+        "JOBS_DIR": os.path.join(tmp, "jobs"),
+        "RESULT_CACHE_DIR": os.path.join(tmp, "result_cache"),
+        "RESULT_CACHE_ENABLED": "0",
+        "GEMINI_API_KEY": "",
+    })
+    env.update(overrides)
+    return env
+
+
+def measure_import(runs):
+    code = (
+        "import sys, time\n"
+        "start = time.perf_counter()\n"
+        "import main\n"
+        "print(time.perf_counter() - start)\n"
+        f"print(','.join(m for m in {HEAVY_MODULES!r} if m in sys.modules))\n"
+    )
+    seconds, heavy = [], ""
+    with tempfile.TemporaryDirectory() as tmp:
+        for _ in range(runs):
+            out = subprocess.run([sys.executable, "-c", code], cwd=BACKEND_DIR, env=server_env(tmp),
+                                 capture_output=True, text=True, check=True).stdout.splitlines()
+            seconds.append(float(out[0]))
+            heavy = out[1] if len(out) > 1 else ""
+    return statistics.median(seconds), heavy
+
+
+def wait_for(client, path, deadline=120):
+    end = time.monotonic() + deadline
+    while time.monotonic() < end:
+        try:
+            if client.get(path).status_code == 200:
+                return
+        except httpx.TransportError:
+            pass
+        time.sleep(0.01)
+    raise TimeoutError(f"{path} not ready after {deadline}s")
+
+
+def cold_start(raw, warmup):
+    port = free_port()
+    with tempfile.TemporaryDirectory() as tmp:
+        env = server_env(tmp, WARMUP_ENABLED="1" if warmup else "0")
+        start = time.perf_counter()
+        proc = subprocess.Popen(
+            [sys.executable, "-m", "uvicorn", "main:create_app", "--factory", "--port", str(port)],
+            cwd=BACKEND_DIR, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+        )
+        try:
+            with httpx.Client(base_url=f"http://127.0.0.1:{port}", timeout=120) as client:
+                wait_for(client, "/health/live")
+                live = time.perf_counter() - start
+                wait_for(client, "/health/ready")
+                ready = time.perf_counter() - start
+
+                request_start = time.perf_counter()
+                response = client.post("/predict", files={"file": ("sme.csv", raw, "text/csv")},
+                                       params={"format": "summary"})
+                predict = time.perf_counter() - request_start
+                assert response.status_code == 200, response.text[:200]
+        finally:
+            proc.terminate()
+            proc.wait(10)
+    return {"live": live, "ready": ready, "predict": predict}
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--runs", type=int, default=3)
+    parser.add_argument("--imports", type=int, default=5)
+    parser.add_argument("--rows", type=int, default=2000)
+    args = parser.parse_args()
+
+    import_seconds, heavy = measure_import(args.imports)
+    assert not heavy, f"import main pulled in {heavy}"
+    print(f"✅ import main: {import_seconds * 1e3:.0f} ms, without {', '.join(HEAVY_MODULES)}")
+
+    raw = sme_csv_bytes(args.rows, 0)
+    print(f"{'':<14} {'live (s)':>9} {'ready (s)':>10} {'1st predict (ms)':>17}")
+    for warmup in (True, False):
+        runs = [cold_start(raw, warmup) for _ in range(args.runs)]
+        median = {key: statistics.median(run[key] for run in runs) for key in runs[0]}
+        label = "warm-up" if warmup else "no warm-up"
+        print(f"{label:<14} {median['live']:9.2f} {median['ready']:10.2f} {median['predict'] * 1e3:17.0f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,115 @@
+"""
+Parity check + latency benchmark: compiled forest vs sklearn predict_proba.
+
+Uses the trained model when it is present (MODEL_PATH), otherwise fits a
+forest with the training.py hyperparameters on synthetic data.
+
+    python -m benchmarks.bench_forest_engine --batch-sizes 1 10 100 1000 100000
+"""
+import argparse
+import os
+import statistics
+import time
+
+import joblib
+import numpy as np
+import pandas as pd
+from sklearn.ensemble import RandomForestClassifier
+
+from forest_engine import CompiledForest, RoutedForest, compile_forest
+from settings import MODEL_PATH, COMPILED_MAX_ROWS
+
+
+def synthetic_features(rows, seed=0):
+    rng = np.random.default_rng(seed)
+    revenue = rng.lognormal(10, 1, rows)
+    cogs = revenue * rng.uniform(0.3, 0.95, rows)
+    opex = revenue * rng.uniform(0.05, 0.4, rows)
+    gross = revenue - cogs
+    # Revenue, COGS, OperatingExpenses, GrossProfit, Cost_Ratio
+    return np.column_stack([revenue, cogs, opex, gross, cogs / revenue])
+
+
+def with_missing(X, rate=0.005, seed=0):
+    """
+    Copy of X with `rate` of its cells blanked (like the blanked COGS,
+    OperatingExpenses and NetProfit of sme_data uploads), plus a few rows
+    that are missing every feature.
+    """
+    rng = np.random.default_rng(seed)
+    X = X.copy()
+    X[rng.random(X.shape) < rate] = np.nan
+    X[:10] = np.nan
+    return X
+
+
+def load_or_fit_model(path):
+    if os.path.exists(path):
+        print(f"Using trained model: {path}")
+        return joblib.load(path)
+
+    print("Trained model not found, fitting a synthetic one")
+    X = synthetic_features(20_000)
+    margin = (X[:, 3] - X[:, 2]) / X[:, 0]
+    y = np.where(margin < 0, 2, np.where(margin < 0.2, 1, 0))
+    model = RandomForestClassifier(
+        n_estimators=300, max_depth=12, class_weight="balanced", random_state=42
+    )
+    return model.fit(X, y)
+
+
+def as_model_input(model, X):
+    # Keep sklearn quiet about feature names when the model was fit on a DataFrame
+    names = getattr(model, "feature_names_in_", None)
+    return pd.DataFrame(X, columns=names) if names is not None else X
+
+
+def check_parity(model, compiled, X):
+    expected = model.predict_proba(X)
+    actual = compiled.predict_proba(X)
+    np.testing.assert_allclose(actual, expected, rtol=0, atol=1e-9)
+    assert np.array_equal(compiled.predict(X), model.predict(X)), "class predictions differ"
+
+
+def latency(fn, X, repeats):
+    fn(X)  # warm-up
+    samples = []
+    for _ in range(repeats):
+        start = time.perf_counter()
+        fn(X)
+        samples.append(time.perf_counter() - start)
+    return statistics.median(samples)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compiled forest vs sklearn")
+    parser.add_argument("--model", default=MODEL_PATH)
+    parser.add_argument("--parity-rows", type=int, default=50_000)
+    parser.add_argument("--batch-sizes", type=int, nargs="+", default=[1, 10, 100, 1000, 100_000])
+    parser.add_argument("--repeats", type=int, default=20)
+    args = parser.parse_args()
+
+    model = load_or_fit_model(args.model)
+    compiled = CompiledForest(compile_forest(model))
+    routed = RoutedForest(compiled, model, COMPILED_MAX_ROWS)
+    n_features = model.n_features_in_
+
+    X = synthetic_features(args.parity_rows, seed=1)[:, :n_features]
+    check_parity(model, compiled, as_model_input(model, X))
+    print(f"✅ predict_proba parity on {args.parity_rows:,} rows")
+    for rate in (0.005, 0.2):
+        check_parity(model, compiled, as_model_input(model, with_missing(X, rate)))
+        print(f"✅ predict_proba parity with {rate:.1%} of values missing")
+
+    print(f"\n{'rows':>10} {'sklearn ms':>12} {'compiled ms':>12} {'speed-up':>9} {'auto ms':>10}")
+    for size in args.batch_sizes:
+        X = as_model_input(model, synthetic_features(size, seed=2)[:, :n_features])
+        repeats = max(1, args.repeats if size <= 1000 else args.repeats // 10)
+        sk = latency(model.predict_proba, X, repeats)
+        cf = latency(compiled.predict_proba, X, repeats)
+        auto = latency(routed.predict_proba, X, repeats)
+        print(f"{size:>10,} {sk * 1000:>12.2f} {cf * 1000:>12.2f} {sk / cf:>8.1f}x {auto * 1000:>10.2f}")
+
+
+if __name__ == "__main__":
+    main()
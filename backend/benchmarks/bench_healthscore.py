@@ -0,0 +1,87 @@
+"""
+Parity check + timing for the vectorized health-scoring engine.
+
+Run from the backend directory:
+
+    python -m benchmarks.bench_healthscore --rows 1000000 --parity-rows 100000
+"""
+import argparse
+import time
+
+import numpy as np
+import pandas as pd
+
+from healthscore import (
+    calculate_health_score,
+    assign_health_status,
+    calculate_health_scores,
+    assign_health_statuses,
+)
+
+
+def make_frame(rows, seed=42):
+    rng = np.random.default_rng(seed)
+    df = pd.DataFrame({
+        "Profit_Margin": rng.normal(0.12, 0.15, rows),
+        "Cost_Ratio": rng.uniform(0.2, 1.2, rows),
+    })
+    # Exact band edges and missing values are where the two paths could drift
+    edges = rng.random(rows) < 0.05
+    df.loc[edges, "Profit_Margin"] = rng.choice([0.1, 0.2], edges.sum())
+    df.loc[edges, "Cost_Ratio"] = rng.choice([0.6, 0.8], edges.sum())
+    df.loc[rng.random(rows) < 0.01, "Profit_Margin"] = np.nan
+    df.loc[rng.random(rows) < 0.01, "Cost_Ratio"] = np.nan
+    return df
+
+
+def timed(fn, *args):
+    start = time.perf_counter()
+    result = fn(*args)
+    return result, time.perf_counter() - start
+
+
+def check_parity(df):
+    expected_scores = df.apply(calculate_health_score, axis=1).to_numpy()
+    expected_status = np.array([assign_health_status(s) for s in expected_scores], dtype=object)
+
+    scores = calculate_health_scores(df)
+    status = assign_health_statuses(scores)
+
+    assert np.array_equal(scores, expected_scores), "health scores differ from row-wise rules"
+    assert np.array_equal(status, expected_status), "health statuses differ from row-wise rules"
+
+    # Missing columns fall back to the same defaults as row.get(...)
+    for dropped in (["Profit_Margin"], ["Cost_Ratio"], ["Profit_Margin", "Cost_Ratio"]):
+        partial = df.head(1000).drop(columns=dropped)
+        assert np.array_equal(
+            calculate_health_scores(partial),
+            partial.apply(calculate_health_score, axis=1).to_numpy(),
+        ), f"defaults differ when {dropped} is missing"
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--rows", type=int, default=1_000_000)
+    parser.add_argument("--parity-rows", type=int, default=100_000)
+    args = parser.parse_args()
+
+    parity_df = make_frame(args.parity_rows)
+    check_parity(parity_df)
+    print(f"✅ Parity OK on {args.parity_rows:,} rows")
+
+    _, row_wise = timed(lambda d: d.apply(calculate_health_score, axis=1).apply(assign_health_status), parity_df)
+
+    df = make_frame(args.rows)
+    scores, score_time = timed(calculate_health_scores, df)
+    _, status_time = timed(assign_health_statuses, scores)
+
+    print(f"Row-wise     ({args.parity_rows:,} rows): {row_wise * 1000:10.1f} ms")
+    print(f"Vectorized   ({args.rows:,} rows): {(score_time + status_time) * 1000:10.1f} ms"
+          f"  (score {score_time * 1000:.1f} ms, status {status_time * 1000:.1f} ms)")
+    per_row_old = row_wise / args.parity_rows
+    per_row_new = (score_time + status_time) / args.rows
+    print(f"Speed-up per row: {per_row_old / per_row_new:,.0f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,264 @@
+"""
+Exercise the LLM client against a local stub of Gemini's generateContent.
+
+The stub answers with a configurable delay, HTTP status or raw body and records how
+many requests it served concurrently and over how many connections. The
+scenarios check the client's guarantees, then run /predict against a
+provider that hangs to show the circuit breaker capping the LLM stage:
+
+    python -m benchmarks.bench_llm_client
+"""
+import argparse
+import asyncio
+import json
+import os
+import tempfile
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from benchmarks.sme_data import sme_csv_bytes
+from benchmarks.suite import open_session
+from database.database import make_async_engine
+from llm.gemini_client import CircuitBreaker, GeminiClient, LLMError, LLMTimeout, LLMUnavailable
+
+
+# =========================
+# Stub Provider
+# =========================
+def default_reply(body):
+    if "generationConfig" in body:
+        return json.dumps({"health_score": 71, "summary": "stub report"})
+    return "Stub insight"
+
+
+class StubProvider:
+    """
+    reply(body) gives the response text; delay is seconds, or a function
+    of the request body. raw, when set, is sent as the body instead of a
+    generateContent response.
+    """
+
+    def __init__(self, reply=default_reply):
+        self.reply = reply
+        self.delay = 0.0
+        self.status = 200
+        self.raw = None
+        self.requests = 0
+        self.in_flight = 0
+        self.max_in_flight = 0
+        self.peers = set()
+        self._lock = threading.Lock()
+
+        provider = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"  # keep-alive, so pooling is visible
+
+            def do_POST(self):
+                body = json.loads(self.rfile.read(int(self.headers["Content-Length"])))
+                with provider._lock:
+                    provider.requests += 1
+                    provider.in_flight += 1
+                    provider.max_in_flight = max(provider.max_in_flight, provider.in_flight)
+                    provider.peers.add(self.client_address)
+                    delay, status, raw = provider.delay, provider.status, provider.raw
+                try:
+                    time.sleep(delay(body) if callable(delay) else delay)
+                    if raw is None:
+                        text = provider.reply(body)
+                        raw = json.dumps({"candidates": [{"content": {"parts": [{"text": text}]}}]})
+                    payload = raw.encode("utf-8")
+                    self.send_response(status)
+                    self.send_header("Content-Type", "application/json")
+                    self.send_header("Content-Length", str(len(payload)))
+                    self.end_headers()
+                    self.wfile.write(payload)
+                except (BrokenPipeError, ConnectionResetError):
+                    pass  # the client gave up (deadline)
+                finally:
+                    with provider._lock:
+                        provider.in_flight -= 1
+
+            def log_message(self, *args):
+                pass
+
+        self.server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        self.server.daemon_threads = True
+        self.url = f"http://127.0.0.1:{self.server.server_address[1]}"
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+
+    def reset(self, delay=0.0, status=200, raw=None):
+        with self._lock:
+            self.delay, self.status, self.raw = delay, status, raw
+            self.requests = self.max_in_flight = 0
+            self.peers = set()
+
+    def close(self):
+        self.server.shutdown()
+
+
+def make_client(stub, **kwargs):
+    options = dict(api_key="stub-key", base_url=stub.url, timeout=2.0, max_retries=0,
+                   max_concurrency=8, max_connections=8,
+                   breaker=CircuitBreaker(failures=3, reset_after=0.5))
+    options.update(kwargs)
+    return GeminiClient(**options)
+
+
+async def timed_calls(client, calls, summary=None):
+    async def one():
+        start = time.perf_counter()
+        try:
+            await client.generate_insights(summary or {"avg_health_score": 80})
+            outcome = "ok"
+        except LLMUnavailable:
+            outcome = "rejected"
+        except LLMTimeout:
+            outcome = "timeout"
+        except LLMError:
+            outcome = "error"
+        return outcome, time.perf_counter() - start
+
+    return await asyncio.gather(*(one() for _ in range(calls)))
+
+
+# =========================
+# Scenarios
+# =========================
+def check_pooling_and_concurrency(stub, calls):
+    stub.reset(delay=0.05)
+    client = make_client(stub, timeout=30.0)  # the whole burst queues for 8 slots
+    start = time.perf_counter()
+    results = asyncio.run(timed_calls(client, calls))
+    elapsed = time.perf_counter() - start
+    client.close()
+
+    assert all(outcome == "ok" for outcome, _ in results)
+    assert stub.max_in_flight <= client.max_concurrency, stub.max_in_flight
+    assert len(stub.peers) <= client.max_connections, len(stub.peers)
+    print(f"✅ {calls} calls in {elapsed:.2f}s: at most {stub.max_in_flight} in flight "
+          f"over {len(stub.peers)} connections (cap {client.max_concurrency})")
+
+
+def check_deadline(stub):
+    stub.reset(delay=3.0)
+    client = make_client(stub, timeout=0.3, breaker=CircuitBreaker(failures=100))
+    results = asyncio.run(timed_calls(client, 4))
+    client.close()
+
+    assert all(outcome == "timeout" for outcome, _ in results), results
+    slowest = max(seconds for _, seconds in results)
+    assert slowest < 0.6, slowest
+    print(f"✅ Hung provider: every call gave up after ≤ {slowest * 1e3:.0f} ms (deadline 300 ms)")
+
+
+def check_breaker(stub):
+    stub.reset(status=503)
+    client = make_client(stub)
+    failures = asyncio.run(timed_calls(client, 3))
+    assert [outcome for outcome, _ in failures] == ["error"] * 3
+    assert client.breaker.state == CircuitBreaker.OPEN
+
+    served = stub.requests
+    rejected = asyncio.run(timed_calls(client, 50))
+    assert all(outcome == "rejected" for outcome, _ in rejected)
+    assert stub.requests == served, "open circuit still reached the provider"
+    slowest = max(seconds for _, seconds in rejected)
+    print(f"✅ Circuit opened after 3 failures; 50 calls rejected in ≤ {slowest * 1e3:.2f} ms each")
+
+    stub.reset()
+    time.sleep(client.breaker.reset_after)
+    recovered = asyncio.run(timed_calls(client, 1))
+    assert recovered[0][0] == "ok" and client.breaker.state == CircuitBreaker.CLOSED
+    report = client.call_blocking(client.generate_financial_report("Analyse this SME"))
+    assert report["health_score"] == 71
+    client.close()
+    print("✅ Trial call after the reset timeout closed the circuit; structured reports parse")
+
+
+def check_malformed_trial(stub):
+    stub.reset(status=500)
+    client = make_client(stub, breaker=CircuitBreaker(failures=1, reset_after=0.2))
+    assert asyncio.run(timed_calls(client, 1))[0][0] == "error"
+    assert client.breaker.state == CircuitBreaker.OPEN
+
+    # The half-open trial gets a 200 that is not JSON: a failure, not a stuck trial
+    stub.reset(raw="<html><body>Bad gateway</body></html>")
+    time.sleep(client.breaker.reset_after)
+    assert asyncio.run(timed_calls(client, 1))[0][0] == "error"
+    assert client.breaker.state == CircuitBreaker.OPEN
+
+    stub.reset()
+    time.sleep(client.breaker.reset_after)
+    assert asyncio.run(timed_calls(client, 1))[0][0] == "ok"
+    assert client.breaker.state == CircuitBreaker.CLOSED
+    client.close()
+    print("✅ Non-JSON body on the half-open trial re-opened the circuit; it closed once the provider recovered")
+
+
+def check_predict_latency(stub, requests):
+    """
+    /predict against a provider that hangs: the first calls wait out the
+    deadline, then the open circuit answers with the rule-based insight.
+    """
+    from fastapi.testclient import TestClient
+    from sqlalchemy.ext.asyncio import AsyncSession
+    import main
+
+    tmp = tempfile.TemporaryDirectory()
+    db_path = os.path.join(tmp.name, "llm.db")
+    open_session(db_path).close()
+    async_engine = make_async_engine(f"sqlite:///{db_path}")
+
+    async def override_async_db():
+        async with AsyncSession(async_engine, expire_on_commit=False) as db:
+            yield db
+
+    main.app.dependency_overrides[main.get_async_db] = override_async_db
+    stub.reset(delay=5.0)
+    client = make_client(stub, timeout=0.5, breaker=CircuitBreaker(failures=3, reset_after=60))
+    main.llm = client
+    main.insights.generator = client
+    main.insights.enabled = False
+    main.result_cache = None
+
+    raw = sme_csv_bytes(200, 0)
+    stages = []
+    with TestClient(main.app) as http:
+        for _ in range(requests):
+            response = http.post("/predict", files={"file": ("sme.csv", raw, "text/csv")},
+                                 params={"format": "summary"})
+            assert response.status_code == 200
+            assert "RECOMMENDATIONS" in response.json()["ai_insights"]
+            timing = dict(part.split(";dur=") for part in response.headers["server-timing"].split(", "))
+            stages.append(float(timing["llm"]))
+        http.portal.call(async_engine.dispose)
+    main.app.dependency_overrides.clear()
+    client.close()
+    tmp.cleanup()
+
+    print("✅ /predict with a hung provider, llm stage per request (ms): "
+          + ", ".join(f"{ms:.0f}" for ms in stages))
+    assert max(stages[3:]) < 50, stages
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--calls", type=int, default=200)
+    parser.add_argument("--predict-requests", type=int, default=6)
+    args = parser.parse_args()
+
+    stub = StubProvider()
+    try:
+        check_pooling_and_concurrency(stub, args.calls)
+        check_deadline(stub)
+        check_breaker(stub)
+        check_malformed_trial(stub)
+        check_predict_latency(stub, args.predict_requests)
+    finally:
+        stub.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,154 @@
+"""
+One LLM request per segment vs segments packed within a token budget.
+
+A scored portfolio with an Industry column is split into health status x
+industry segments and analysed twice through the shared client against
+the stub provider from bench_llm_client: once with one segment per
+request, once packed. The stub's latency grows with the number of
+reports asked for, like a real model's output time. Then the provider
+drops a report, answers with the wrong shape and fails outright, and the
+client is disabled, to check the per-segment fallbacks. A segment with
+no valid revenue or profit values must still serialize as JSON:
+
+    python -m benchmarks.bench_segment_analysis --rows 20000 --industries 12
+"""
+import argparse
+import asyncio
+import json
+import re
+import time
+
+import numpy as np
+import pandas as pd
+
+from benchmarks.bench_llm_client import StubProvider, make_client
+from benchmarks.sme_data import make_sme_frame
+from llm.gemini_client import CircuitBreaker
+from services.model_registry import registry
+from services.pipeline import assess_frame
+from services.segment_analysis import analyze_segments, estimate_tokens
+from settings import SEGMENT_TOKEN_BUDGET
+
+SEGMENT_ID = re.compile(r'"segment_id": "([^"]+)"')
+
+
+def segment_ids(body):
+    return SEGMENT_ID.findall(body["contents"][0]["parts"][0]["text"])
+
+
+def reply_all(body):
+    reports = [{"segment_id": sid, "health_score": 70, "summary": f"Report for {sid}"}
+               for sid in segment_ids(body)]
+    return json.dumps({"reports": reports})
+
+
+def scored_portfolio(rows, industries):
+    df = make_sme_frame(rows, seed=3)
+    rng = np.random.default_rng(3)
+    df["Industry"] = rng.choice([f"industry_{i:02d}" for i in range(industries)], rows)
+    loaded = registry.get()
+    return assess_frame(df, loaded.model, loaded.feature_cols)
+
+
+def run(stub, df, client_options=None, **options):
+    client = make_client(stub, **{"timeout": 60.0, "breaker": CircuitBreaker(failures=1000),
+                                  **(client_options or {})})
+    start = time.perf_counter()
+    result = asyncio.run(analyze_segments(df, client, **options))
+    elapsed = time.perf_counter() - start
+    client.close()
+    return result, elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--rows", type=int, default=20000)
+    parser.add_argument("--industries", type=int, default=12)
+    parser.add_argument("--base-latency", type=float, default=0.4, help="seconds per request")
+    parser.add_argument("--report-latency", type=float, default=0.05, help="seconds per report")
+    args = parser.parse_args()
+
+    df = scored_portfolio(args.rows, args.industries)
+    prompt_tokens = []
+
+    def reply(body):
+        prompt_tokens.append(estimate_tokens(body["contents"][0]["parts"][0]["text"]))
+        return reply_all(body)
+
+    stub = StubProvider(reply)
+    try:
+        stub.reset(delay=lambda body: args.base_latency + args.report_latency * len(segment_ids(body)))
+        single, single_time = run(stub, df, max_per_request=1)
+        single_tokens = sum(prompt_tokens)
+
+        prompt_tokens.clear()
+        packed, packed_time = run(stub, df)
+        packed_tokens = sum(prompt_tokens)
+
+        segments = len(packed["segments"])
+        assert single["fallbacks"] == packed["fallbacks"] == 0
+        for one, many in zip(single["segments"], packed["segments"]):
+            assert one["segment_id"] == many["segment_id"]
+            assert many["report"]["summary"] == f"Report for {many['segment_id']}"
+        assert max(prompt_tokens) <= SEGMENT_TOKEN_BUDGET
+
+        print(f"✅ {segments} segments, every report matched back to its segment")
+        print(f"{'':<18} {'requests':>9} {'prompt tokens':>14} {'seconds':>8}")
+        print(f"{'one per segment':<18} {single['requests']:9d} {single_tokens:14,d} {single_time:8.2f}")
+        print(f"{'packed':<18} {packed['requests']:9d} {packed_tokens:14,d} {packed_time:8.2f}")
+
+        # The provider leaves one segment out of its answer
+        dropped = packed["segments"][0]["segment_id"]
+
+        def reply_missing(body):
+            reports = json.loads(reply_all(body))
+            reports["reports"] = [r for r in reports["reports"] if r["segment_id"] != dropped]
+            return json.dumps(reports)
+
+        stub.reply = reply_missing
+        stub.reset()
+        partial, _ = run(stub, df)
+        fallbacks = [s["segment_id"] for s in partial["segments"] if s["report"].get("fallback")]
+        assert fallbacks == [dropped], fallbacks
+        print(f"✅ Report missing from the response: only {dropped} fell back to rules")
+
+        stub.reply = lambda body: json.dumps([{"segment_id": sid} for sid in segment_ids(body)])
+        stub.reset()
+        wrong_shape, _ = run(stub, df)
+        assert wrong_shape["fallbacks"] == segments
+        assert wrong_shape["requests"] == packed["requests"] == stub.requests
+        print(f"✅ Top-level list instead of an object: all {segments} segments fell back to rules")
+
+        stub.reply = reply_all
+        stub.reset(status=503)
+        failed, _ = run(stub, df)
+        assert failed["fallbacks"] == segments
+        assert all(s["report"]["health_score"] == s["avg_health_score"] for s in failed["segments"])
+        assert all(f"{round(s['avg_profit_margin'] * 100, 2)}%" in s["report"]["summary"]
+                   for s in failed["segments"])
+        print(f"✅ Provider down: all {segments} segments got rule-based reports")
+
+        stub.reset()
+        disabled, _ = run(stub, df, client_options={"api_key": None})
+        assert disabled["fallbacks"] == segments
+        assert disabled["requests"] == stub.requests == 0
+        print("✅ Client disabled: no requests counted")
+
+        # One SME in an industry of its own, with blank Revenue and NetProfit
+        blank = df.head(1).assign(Industry="blank_industry")
+        for col in ("Revenue", "NetProfit", "Profit_Margin", "Cost_Ratio"):
+            blank[col] = np.nan
+        # Rule-based reports, so the margin text is checked too
+        with_blank, _ = run(stub, pd.concat([df, blank], ignore_index=True),
+                            client_options={"api_key": None})
+        segment = next(s for s in with_blank["segments"] if s["industry"] == "blank_industry")
+        assert segment["avg_profit_margin"] is None and segment["median_revenue"] is None, segment
+        assert "Profit margin trend: n/a" in segment["report"]["summary"]
+        json.dumps(with_blank, allow_nan=False)
+        print(f"✅ All-NaN segment {segment['segment_id']}: averages reported as null")
+    finally:
+        stub.close()
+
+
+if __name__ == "__main__":
+    main()
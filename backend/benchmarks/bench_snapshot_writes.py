@@ -0,0 +1,94 @@
+"""
+Compare the ORM and bulk snapshot write paths.
+
+Writes the same scored DataFrame to two fresh SQLite databases, checks the
+stored rows are identical and reports the time each path took.
+
+    python -m benchmarks.bench_snapshot_writes --rows 100000 --batch-size 5000
+"""
+import argparse
+import os
+import tempfile
+import time
+
+import numpy as np
+import pandas as pd
+from sqlalchemy import create_engine, select
+from sqlalchemy.orm import sessionmaker
+
+from database.batches import create_batch
+from database.models import Base, SMESnapshot
+from database.snapshots import add_snapshots_orm, bulk_insert_snapshots
+from healthscore import apply_health_scores
+
+
+def make_scored_frame(rows, seed=7):
+    rng = np.random.default_rng(seed)
+    revenue = rng.lognormal(10, 1, rows).round(2)
+    df = pd.DataFrame({
+        "TransactionID": [f"TX{i:08d}" for i in range(rows)],
+        "Revenue": revenue,
+        "Profit_Margin": rng.normal(0.12, 0.15, rows),
+        "Cost_Ratio": rng.uniform(0.2, 1.2, rows),
+        "Confidence": rng.uniform(0.4, 1.0, rows).round(2),
+    })
+    df.loc[rng.random(rows) < 0.01, "Revenue"] = np.nan
+    return apply_health_scores(df)
+
+
+def open_session(path):
+    engine = create_engine(f"sqlite:///{path}")
+    Base.metadata.create_all(bind=engine)
+    return sessionmaker(bind=engine)()
+
+
+def stored_rows(db):
+    columns = [
+        SMESnapshot.transaction_id, SMESnapshot.revenue, SMESnapshot.profit_margin,
+        SMESnapshot.cost_ratio, SMESnapshot.health_score, SMESnapshot.health_status,
+        SMESnapshot.confidence, SMESnapshot.batch_id,
+    ]
+    return db.execute(select(*columns).order_by(SMESnapshot.id)).all()
+
+
+def run(write, path, df, insight):
+    db = open_session(path)
+    start = time.perf_counter()
+    write(db, df, create_batch(db, "benchmark", insight=insight, row_count=len(df)).id)
+    db.commit()
+    elapsed = time.perf_counter() - start
+    return db, elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser(description="ORM vs bulk snapshot writes")
+    parser.add_argument("--rows", type=int, default=100_000)
+    parser.add_argument("--batch-size", type=int, default=5000)
+    parser.add_argument("--commit-every", type=int, default=0)
+    args = parser.parse_args()
+
+    df = make_scored_frame(args.rows)
+    insight = "FINANCIAL HEALTH REPORT\n(benchmark)"
+
+    with tempfile.TemporaryDirectory() as tmp:
+        orm_db, orm_time = run(
+            add_snapshots_orm, os.path.join(tmp, "orm.db"), df, insight,
+        )
+        bulk_db, bulk_time = run(
+            lambda db, d, batch_id: bulk_insert_snapshots(
+                db, d, batch_id, batch_size=args.batch_size, commit_every=args.commit_every
+            ),
+            os.path.join(tmp, "bulk.db"), df, insight,
+        )
+
+        assert stored_rows(orm_db) == stored_rows(bulk_db), "bulk path stored different rows"
+        orm_db.close()
+        bulk_db.close()
+
+    print(f"✅ Identical sme_snapshots rows ({args.rows:,})")
+    print(f"ORM  : {orm_time:8.2f} s  ({args.rows / orm_time:,.0f} rows/s)")
+    print(f"Bulk : {bulk_time:8.2f} s  ({args.rows / bulk_time:,.0f} rows/s)")
+
+
+if __name__ == "__main__":
+    main()
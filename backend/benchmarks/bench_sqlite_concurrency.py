@@ -0,0 +1,130 @@
+"""
+Mixed read/write stress test of the SQLite setup.
+
+Several processes (standing in for uvicorn workers) share one database
+file for a fixed time. Each operation is either a write, one upload's
+snapshots plus rollups and a commit like /predict, or a read of three
+/history pages plus /portfolio/stats. The same load runs against the
+previous engine (rollback journal, default 5 s lock timeout, no PRAGMAs)
+and the tuned one from database.database.make_engine().
+
+    python -m benchmarks.bench_sqlite_concurrency --workers 8 --seconds 15
+"""
+import argparse
+import multiprocessing
+import os
+import random
+import tempfile
+import time
+
+import numpy as np
+from sqlalchemy import create_engine
+from sqlalchemy.exc import OperationalError
+from sqlalchemy.orm import sessionmaker
+
+from benchmarks.bench_snapshot_writes import make_scored_frame
+from database.batches import create_batch
+from database.database import make_engine
+from database.models import Base
+from database.rollups import portfolio_stats
+from database.snapshots import write_snapshots, query_history
+
+CONFIGS = ("baseline", "tuned")
+
+
+def engine_for(config, path):
+    url = f"sqlite:///{path}"
+    if config == "baseline":
+        return create_engine(url, connect_args={"check_same_thread": False})
+    return make_engine(url)
+
+
+def setup(config, path, seed_rows):
+    engine = engine_for(config, path)
+    Base.metadata.create_all(bind=engine)
+    db = sessionmaker(bind=engine)()
+    write_snapshots(db, make_scored_frame(seed_rows, seed=1), create_batch(db, "seed").id)
+    db.commit()
+    db.close()
+    engine.dispose()
+
+
+def worker(args):
+    config, path, seconds, write_share, rows, seed = args
+    rng = random.Random(seed)
+    engine = engine_for(config, path)
+    Session = sessionmaker(bind=engine)
+    frame = make_scored_frame(rows, seed=seed)
+
+    stats = {"reads": 0, "writes": 0, "errors": 0, "read_ms": [], "write_ms": []}
+    deadline = time.perf_counter() + seconds
+    while time.perf_counter() < deadline:
+        is_write = rng.random() < write_share
+        db = Session()
+        start = time.perf_counter()
+        try:
+            if is_write:
+                write_snapshots(db, frame, create_batch(db, "stress", row_count=len(frame)).id)
+                db.commit()
+            else:
+                cursor = None
+                for _ in range(3):
+                    _, cursor = query_history(db, limit=50, cursor=cursor)
+                portfolio_stats(db)
+        except OperationalError:  # "database is locked"
+            db.rollback()
+            stats["errors"] += 1
+            continue
+        finally:
+            db.close()
+        elapsed = (time.perf_counter() - start) * 1e3
+        kind = "write" if is_write else "read"
+        stats[kind + "s"] += 1
+        stats[kind + "_ms"].append(elapsed)
+
+    engine.dispose()
+    return stats
+
+
+def run(config, workers, seconds, write_share, rows, seed_rows):
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, f"{config}.db")
+        setup(config, path, seed_rows)
+
+        tasks = [(config, path, seconds, write_share, rows, 100 + i) for i in range(workers)]
+        with multiprocessing.get_context("spawn").Pool(workers) as pool:
+            results = pool.map(worker, tasks)
+
+    totals = {"reads": 0, "writes": 0, "errors": 0, "read_ms": [], "write_ms": []}
+    for result in results:
+        for key, value in result.items():
+            totals[key] += value
+    return totals
+
+
+def percentile(values, q):
+    return float(np.percentile(values, q)) if values else float("nan")
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--workers", type=int, default=4)
+    parser.add_argument("--seconds", type=float, default=10)
+    parser.add_argument("--write-share", type=float, default=0.3)
+    parser.add_argument("--rows", type=int, default=1000, help="snapshot rows per write")
+    parser.add_argument("--seed-rows", type=int, default=20000)
+    args = parser.parse_args()
+
+    print(f"{args.workers} processes x {args.seconds:.0f}s, {args.write_share:.0%} writes of {args.rows} rows")
+    print(f"{'config':<9} {'reads/s':>8} {'writes/s':>9} {'rows/s':>9} {'errors':>7} "
+          f"{'read p50/p95 ms':>17} {'write p50/p95 ms':>18}")
+    for config in CONFIGS:
+        t = run(config, args.workers, args.seconds, args.write_share, args.rows, args.seed_rows)
+        print(f"{config:<9} {t['reads'] / args.seconds:8.1f} {t['writes'] / args.seconds:9.1f} "
+              f"{t['writes'] * args.rows / args.seconds:9.0f} {t['errors']:7d} "
+              f"{percentile(t['read_ms'], 50):8.1f}/{percentile(t['read_ms'], 95):<8.1f} "
+              f"{percentile(t['write_ms'], 50):8.1f}/{percentile(t['write_ms'], 95):<9.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,133 @@
+"""
+Incremental SME trend aggregates vs recomputing them from history.
+
+Writes one upload per month for `--months` months (each with rows spread
+over `--smes` businesses) and, after every upload, updates the trend
+aggregates two ways:
+
+    incremental   update_trends() on the new rows only (what write_snapshots does)
+    recompute     aggregate every row uploaded so far and rewrite the table
+
+then checks both tables, and the rolling features read from them, agree:
+
+    python -m benchmarks.bench_trends --months 24 --rows 20000 --smes 2000
+"""
+import argparse
+import math
+import os
+import tempfile
+import time
+
+import numpy as np
+import pandas as pd
+from sqlalchemy import create_engine, delete, insert, select
+from sqlalchemy.orm import Session
+
+from benchmarks.sme_data import make_sme_frame
+from database.models import Base, SMEPeriodMetric
+from database.trends import PERIOD_FIELDS, aggregate_periods, get_trend, list_trends, update_trends
+from services.trends import adjust_for_trends
+
+
+def monthly_upload(month, rows, smes):
+    df = make_sme_frame(rows, seed=month, missing_rate=0)
+    rng = np.random.default_rng(1000 + month)
+    first_day = pd.Timestamp("2023-01-01") + pd.DateOffset(months=month)
+    days = rng.integers(0, first_day.days_in_month, rows)
+    df["TransactionDate"] = (first_day + pd.to_timedelta(days, unit="D")).strftime("%Y-%m-%d")
+    df["SME_ID"] = [f"SME{i:05d}" for i in rng.integers(0, smes, rows)]
+    df["Cost_Ratio"] = df["COGS"] / df["Revenue"]
+    df["Profit_Margin"] = df["NetProfit"] / df["Revenue"]
+    df["Health_Score"] = 70
+    return df
+
+
+def open_db(path):
+    engine = create_engine(f"sqlite:///{path}")
+    Base.metadata.create_all(bind=engine)
+    return Session(bind=engine)
+
+
+def recompute(db, history):
+    rows = aggregate_periods(pd.concat(history, ignore_index=True))
+    db.execute(delete(SMEPeriodMetric))
+    db.execute(insert(SMEPeriodMetric), rows)
+    db.commit()
+
+
+def table(db):
+    return {
+        (r.sme_id, r.period): {f: getattr(r, f) for f in PERIOD_FIELDS}
+        for r in db.execute(select(SMEPeriodMetric)).scalars()
+    }
+
+
+def assert_same(left, right):
+    assert left.keys() == right.keys(), "different (sme, month) keys"
+    for key, values in left.items():
+        for field in PERIOD_FIELDS:
+            assert math.isclose(values[field], right[key][field], rel_tol=1e-9, abs_tol=1e-6), (key, field)
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--months", type=int, default=24)
+    parser.add_argument("--rows", type=int, default=20000, help="rows per monthly upload")
+    parser.add_argument("--smes", type=int, default=2000)
+    args = parser.parse_args()
+
+    uploads = [monthly_upload(month, args.rows, args.smes) for month in range(args.months)]
+    checkpoints = sorted({0, args.months // 2, args.months - 1})
+    timings = {"incremental": [], "recompute": []}
+
+    with tempfile.TemporaryDirectory() as tmp:
+        incremental = open_db(os.path.join(tmp, "incremental.db"))
+        full = open_db(os.path.join(tmp, "recompute.db"))
+
+        for month, df in enumerate(uploads):
+            start = time.perf_counter()
+            update_trends(incremental, df)
+            incremental.commit()
+            timings["incremental"].append(time.perf_counter() - start)
+
+            start = time.perf_counter()
+            recompute(full, uploads[:month + 1])
+            timings["recompute"].append(time.perf_counter() - start)
+
+        assert_same(table(incremental), table(full))
+
+        # Rolling features agree too, for every SME
+        items, after = list_trends(incremental, limit=args.smes)
+        assert after is None and len(items) == args.smes
+        expected, _ = list_trends(full, limit=args.smes)
+        assert items == expected
+
+        start = time.perf_counter()
+        list_trends(incremental, limit=50)
+        page_ms = (time.perf_counter() - start) * 1e3
+        start = time.perf_counter()
+        trend = get_trend(incremental, items[0]["sme_id"])
+        detail_ms = (time.perf_counter() - start) * 1e3
+        assert len(trend["series"]) == trend["months"] == min(6, args.months)
+
+        scored = monthly_upload(args.months, args.rows, args.smes)
+        start = time.perf_counter()
+        adjust_for_trends(incremental, scored)
+        adjust_ms = (time.perf_counter() - start) * 1e3
+        assert scored["Trend_Adjustment"].abs().sum() > 0
+
+        incremental.close()
+        full.close()
+
+    print(f"✅ Incremental aggregates match a full recompute "
+          f"({args.months} months x {args.rows:,} rows, {args.smes:,} SMEs)")
+    print(f"{'upload':<10} {'history rows':>13} {'incremental (ms)':>17} {'recompute (ms)':>15}")
+    for month in checkpoints:
+        print(f"{month + 1:<10} {(month + 1) * args.rows:13,d} "
+              f"{timings['incremental'][month] * 1e3:17.1f} {timings['recompute'][month] * 1e3:15.1f}")
+    print(f"/trends page of 50: {page_ms:.1f} ms, /trends/{{sme_id}}: {detail_ms:.1f} ms, "
+          f"trend scoring of one upload: {adjust_ms:.1f} ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,75 @@
+"""
+Seeded generator of realistic SME transaction uploads.
+
+Columns match what /predict expects (and preprocessing.py reads):
+TransactionID, TransactionDate, OrderID, Revenue, COGS, GrossProfit,
+OperatingExpenses, NetProfit. Revenue is log-normal, costs are drawn as
+shares of revenue so margins look like real small businesses (some of them
+loss-making), and a small share of cells is left empty.
+
+    python -m benchmarks.sme_data 100k sme_100k.csv
+"""
+import argparse
+
+import numpy as np
+import pandas as pd
+
+SIZES = {"1k": 1_000, "100k": 100_000, "1M": 1_000_000}
+
+
+def parse_size(label):
+    """
+    "1k" / "100k" / "1M" or a plain row count.
+    """
+    if label in SIZES:
+        return SIZES[label]
+    suffixes = {"k": 1_000, "K": 1_000, "m": 1_000_000, "M": 1_000_000}
+    if label[-1] in suffixes:
+        return int(float(label[:-1]) * suffixes[label[-1]])
+    return int(label)
+
+
+def make_sme_frame(rows, seed=0, missing_rate=0.005):
+    rng = np.random.default_rng(seed)
+
+    revenue = rng.lognormal(10, 1, rows).round(2)
+    cogs = (revenue * rng.beta(6, 4, rows)).round(2)                 # ~60% of revenue
+    opex = (revenue * rng.gamma(4, 0.05, rows)).round(2)             # ~20% of revenue
+    gross = (revenue - cogs).round(2)
+    net = (gross - opex).round(2)
+    dates = pd.Timestamp("2023-01-01") + pd.to_timedelta(rng.integers(0, 730, rows), unit="D")
+
+    df = pd.DataFrame({
+        "TransactionID": [f"TX{i:08d}" for i in range(rows)],
+        "TransactionDate": dates.strftime("%Y-%m-%d"),
+        "OrderID": rng.integers(1, 10**7, rows),
+        "Revenue": revenue,
+        "COGS": cogs,
+        "GrossProfit": gross,
+        "OperatingExpenses": opex,
+        "NetProfit": net,
+    })
+
+    if missing_rate:
+        for col in ["COGS", "OperatingExpenses", "NetProfit"]:
+            df.loc[rng.random(rows) < missing_rate, col] = np.nan
+    return df
+
+
+def sme_csv_bytes(rows, seed=0):
+    return make_sme_frame(rows, seed).to_csv(index=False).encode("utf-8")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Write a synthetic SME upload")
+    parser.add_argument("size", help="1k, 100k, 1M or a row count")
+    parser.add_argument("output")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    make_sme_frame(parse_size(args.size), args.seed).to_csv(args.output, index=False)
+    print(f"Wrote {parse_size(args.size):,} rows to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
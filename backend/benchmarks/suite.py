@@ -0,0 +1,326 @@
+"""
+Benchmark suite for the assessment hot paths.
+
+For every dataset size the synthetic upload from benchmarks.sme_data is run
+through each stage separately (CSV parsing, feature engineering,
+predict_proba, health scoring, to_dict(orient="records") against the
+response renderers, snapshot persistence and /history queries on sync and
+async sessions) and then end to end through FastAPI's TestClient with
+Gemini stubbed out. Results are written as JSON so runs on different
+commits can be compared:
+
+    python -m benchmarks.suite --sizes 1k 100k 1M --output before.json
+    python -m benchmarks.suite --sizes 1k 100k 1M --output after.json
+    python -m benchmarks.suite --compare before.json after.json
+
+Needs the model artifacts the API serves (see settings.MODEL_PATH).
+"""
+import argparse
+import asyncio
+import io
+import json
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime, timezone
+
+import pandas as pd
+from sqlalchemy import create_engine
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
+from sqlalchemy.orm import sessionmaker
+
+from benchmarks.sme_data import parse_size, sme_csv_bytes
+from database.database import make_async_engine
+from database.batches import create_batch, create_batch_async
+from database.models import Base
+from database.snapshots import (
+    add_snapshots_orm, write_snapshots, query_history, write_snapshots_async, query_history_async,
+)
+from healthscore import calculate_health_score, apply_health_scores
+from services.model_registry import registry
+from services.pipeline import engineer_features, assess_frame, build_summary
+from services.serialization import render_body, compress, ARROW_AVAILABLE
+
+# Stages that are row-by-row Python and would dominate the run at 1M rows
+SLOW_STAGES = {"health_score_rowwise", "persist_orm", "end_to_end_predict"}
+
+HISTORY_PAGES = 20
+STUB_INSIGHT = "Benchmark insight (Gemini stubbed out)."
+
+
+class StubGemini:
+    enabled = True
+
+    async def generate_insights(self, summary):
+        return STUB_INSIGHT
+
+
+def timed(fn, repeat=1):
+    """
+    Best of `repeat` runs in seconds, plus the last result.
+    """
+    best, result = float("inf"), None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = fn()
+        best = min(best, time.perf_counter() - start)
+    return best, result
+
+
+def open_session(path):
+    engine = create_engine(f"sqlite:///{path}")
+    Base.metadata.create_all(bind=engine)
+    return sessionmaker(bind=engine)()
+
+
+def persist(db, write, df):
+    """
+    A batch plus its snapshot rows, committed, as /predict writes them.
+    """
+    batch = create_batch(db, "benchmark", insight=STUB_INSIGHT, row_count=len(df))
+    write(db, df, batch.id)
+    db.commit()
+
+
+def walk_history(db, pages=HISTORY_PAGES):
+    cursor = None
+    for _ in range(pages):
+        _, cursor = query_history(db, limit=50, cursor=cursor)
+        if cursor is None:
+            break
+
+
+def bench_async_persistence(path, scored, repeat):
+    """
+    persist_async and history_first_page_async: the AsyncSession paths the
+    API routes use, each timed inside one event loop.
+    """
+    async def run():
+        engine = make_async_engine(f"sqlite:///{path}")
+        factory = async_sessionmaker(bind=engine, expire_on_commit=False)
+        results = {}
+        async with factory() as db:
+            start = time.perf_counter()
+            batch = await create_batch_async(db, "benchmark", insight=STUB_INSIGHT, row_count=len(scored))
+            await write_snapshots_async(db, scored, batch.id)
+            await db.commit()
+            results["persist_async"] = time.perf_counter() - start
+
+            best = float("inf")
+            for _ in range(repeat):
+                start = time.perf_counter()
+                await query_history_async(db, limit=50)
+                best = min(best, time.perf_counter() - start)
+            results["history_first_page_async"] = best
+        await engine.dispose()
+        return results
+
+    return asyncio.run(run())
+
+
+# =========================
+# Stage Benchmarks
+# =========================
+def bench_stages(rows, raw, tmp, repeat, max_slow_rows):
+    loaded = registry.get()
+    model, feature_cols = loaded.model, loaded.feature_cols
+    skip = SLOW_STAGES if rows > max_slow_rows else set()
+
+    parsed = pd.read_csv(io.BytesIO(raw))
+    featured = engineer_features(parsed.copy())
+    scored = assess_frame(parsed.copy(), model, feature_cols)
+    X = featured[feature_cols].fillna(0)
+    summary = build_summary(scored)
+    json_body, _ = render_body(summary, STUB_INSIGHT, scored, "json")
+
+    stages = {
+        "csv_parse": lambda: pd.read_csv(io.BytesIO(raw)),
+        "feature_engineering": lambda: engineer_features(parsed.copy()),
+        "predict_proba": lambda: model.predict_proba(X),
+        "health_score_rowwise": lambda: featured.apply(calculate_health_score, axis=1),
+        "health_score_vectorized": lambda: apply_health_scores(featured.copy()),
+        "to_dict_records": lambda: scored.to_dict(orient="records"),
+        "render_json": lambda: render_body(summary, STUB_INSIGHT, scored, "json"),
+        "render_columnar": lambda: render_body(summary, STUB_INSIGHT, scored, "columnar"),
+        "gzip_json": lambda: compress(json_body, "gzip"),
+    }
+    if ARROW_AVAILABLE:
+        stages["render_arrow"] = lambda: render_body(summary, STUB_INSIGHT, scored, "arrow")
+    results = {}
+    for name, fn in stages.items():
+        if name not in skip:
+            results[name], _ = timed(fn, repeat)
+
+    # Persistence writes into throwaway SQLite files, one per path
+    if "persist_orm" not in skip:
+        db = open_session(os.path.join(tmp, f"orm_{rows}.db"))
+        results["persist_orm"], _ = timed(lambda: persist(db, add_snapshots_orm, scored))
+        db.close()
+
+    db = open_session(os.path.join(tmp, f"bulk_{rows}.db"))
+    results["persist_bulk"], _ = timed(lambda: persist(db, write_snapshots, scored))
+    results["history_first_page"], _ = timed(lambda: query_history(db, limit=50), repeat)
+    results["history_walk_pages"], _ = timed(lambda: walk_history(db), repeat)
+    db.close()
+
+    async_path = os.path.join(tmp, f"async_{rows}.db")
+    open_session(async_path).close()
+    results.update(bench_async_persistence(async_path, scored, repeat))
+    return results
+
+
+# =========================
+# End-to-End (TestClient)
+# =========================
+def bench_end_to_end(rows, raw, tmp, repeat, max_slow_rows):
+    from fastapi.testclient import TestClient
+    import main
+
+    db_path = os.path.join(tmp, f"e2e_{rows}.db")
+    session = open_session(db_path)
+    session.close()
+    factory = sessionmaker(bind=create_engine(f"sqlite:///{db_path}"))
+    async_engine = make_async_engine(f"sqlite:///{db_path}")
+
+    def override_db():
+        db = factory()
+        try:
+            yield db
+        finally:
+            db.close()
+
+    async def override_async_db():
+        async with AsyncSession(async_engine, expire_on_commit=False) as db:
+            yield db
+
+    main.app.dependency_overrides[main.get_db] = override_db
+    main.app.dependency_overrides[main.get_async_db] = override_async_db
+    main.insights.generator = StubGemini()
+    main.insights.enabled = False  # every request reaches the stub
+    main.result_cache = None       # measure the full pipeline, not cache hits
+
+    results = {}
+    with TestClient(main.app) as client:
+        def predict():
+            response = client.post("/predict", files={"file": ("sme.csv", raw, "text/csv")})
+            assert response.status_code == 200, response.text[:200]
+            return response.json()
+
+        if rows <= max_slow_rows:
+            results["end_to_end_predict"], body = timed(predict, repeat)
+            assert body["ai_insights"] == STUB_INSIGHT
+        else:
+            predict()  # history needs rows either way
+
+        def history():
+            response = client.get("/history", params={"limit": 50})
+            assert response.status_code == 200
+        results["end_to_end_history"], _ = timed(history, repeat)
+        client.portal.call(async_engine.dispose)
+
+    main.app.dependency_overrides.clear()
+    return results
+
+
+# =========================
+# Reporting
+# =========================
+def git_revision():
+    try:
+        commit = subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True,
+                                text=True, check=True).stdout.strip()
+        dirty = bool(subprocess.run(["git", "status", "--porcelain", "--untracked-files=no"],
+                                    capture_output=True, text=True).stdout.strip())
+        return commit + ("-dirty" if dirty else "")
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def run_suite(sizes, repeat=3, seed=0, max_slow_rows=100_000, end_to_end=True):
+    loaded = registry.get()
+    meta = {
+        "created_at": datetime.now(timezone.utc).isoformat(),
+        "git": git_revision(),
+        "python": sys.version.split()[0],
+        "platform": platform.platform(),
+        "cpu_count": os.cpu_count(),
+        "model_version": loaded.version,
+        "inference_engine": loaded.engine,
+        "repeat": repeat,
+        "seed": seed,
+    }
+    results = []
+    with tempfile.TemporaryDirectory() as tmp:
+        for label in sizes:
+            rows = parse_size(label)
+            raw = sme_csv_bytes(rows, seed)
+            print(f"\n📦 {label}: {rows:,} rows, {len(raw) / 1e6:.1f} MB CSV")
+
+            timings = bench_stages(rows, raw, tmp, repeat, max_slow_rows)
+            if end_to_end:
+                timings.update(bench_end_to_end(rows, raw, tmp, repeat, max_slow_rows))
+
+            for stage, seconds in timings.items():
+                results.append({
+                    "size": label,
+                    "rows": rows,
+                    "stage": stage,
+                    "seconds": seconds,
+                    "rows_per_second": rows / seconds if seconds and "history" not in stage else None,
+                })
+                print(f"   {stage:<26} {seconds * 1e3:12.2f} ms")
+    return {"meta": meta, "results": results}
+
+
+def compare(old_path, new_path, threshold):
+    """
+    Print new/old time ratios per (size, stage). Returns the regressions.
+    """
+    with open(old_path) as f:
+        old = {(r["size"], r["stage"]): r["seconds"] for r in json.load(f)["results"]}
+    with open(new_path) as f:
+        new = json.load(f)["results"]
+
+    regressions = []
+    print(f"{'size':<6} {'stage':<26} {'old ms':>12} {'new ms':>12} {'ratio':>7}")
+    for r in new:
+        before = old.get((r["size"], r["stage"]))
+        if before is None:
+            continue
+        ratio = r["seconds"] / before if before else float("inf")
+        flag = " ⚠️" if ratio > threshold else ""
+        if flag:
+            regressions.append((r["size"], r["stage"], ratio))
+        print(f"{r['size']:<6} {r['stage']:<26} {before * 1e3:12.2f} {r['seconds'] * 1e3:12.2f} {ratio:7.2f}{flag}")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Time the assessment hot paths")
+    parser.add_argument("--sizes", nargs="+", default=["1k", "100k"], help="e.g. 1k 100k 1M")
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--max-slow-rows", type=int, default=100_000,
+                        help=f"skip {', '.join(sorted(SLOW_STAGES))} above this size")
+    parser.add_argument("--no-end-to-end", action="store_true")
+    parser.add_argument("--output", default="benchmark_results.json")
+    parser.add_argument("--compare", nargs=2, metavar=("OLD", "NEW"))
+    parser.add_argument("--threshold", type=float, default=1.2,
+                        help="ratio above which --compare reports a regression")
+    args = parser.parse_args()
+
+    if args.compare:
+        regressions = compare(*args.compare, args.threshold)
+        sys.exit(1 if regressions else 0)
+
+    report = run_suite(args.sizes, args.repeat, args.seed, args.max_slow_rows, not args.no_end_to_end)
+    with open(args.output, "w") as f:
+        json.dump(report, f, indent=2)
+    print(f"\n💾 Results written to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
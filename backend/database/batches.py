@@ -0,0 +1,135 @@
+"""
+Assessment batches: one row per scored upload.
+
+The summary, insight, model version and stage timings of an upload are
+stored once here; its sme_snapshots rows reference the batch by batch_id.
+"""
+import json
+from datetime import datetime
+
+from sqlalchemy import delete, select
+
+from .models import AssessmentBatch, SMESnapshot
+
+LIST_COLUMNS = (
+    AssessmentBatch.id,
+    AssessmentBatch.source,
+    AssessmentBatch.filename,
+    AssessmentBatch.model_version,
+    AssessmentBatch.row_count,
+    AssessmentBatch.summary,
+    AssessmentBatch.complete,
+    AssessmentBatch.created_at,
+)
+
+
+def _json(value):
+    return json.dumps(value) if value is not None else None
+
+
+def create_batch(db, source, model_version=None, filename=None, content_hash=None,
+                 summary=None, insight=None, timings=None, row_count=0, created_at=None,
+                 complete=True):
+    """
+    Add a batch to the caller's transaction and return it with its id
+    assigned. Batches written chunk by chunk start with complete=False.
+    """
+    batch = AssessmentBatch(
+        source=source,
+        filename=filename,
+        content_hash=content_hash,
+        model_version=model_version,
+        row_count=row_count,
+        summary=_json(summary),
+        insight=insight,
+        timings=_json(timings),
+        complete=complete,
+        created_at=created_at or datetime.utcnow(),
+    )
+    db.add(batch)
+    db.flush()
+    return batch
+
+
+def finish_batch(db, batch_id, summary, insight, row_count, timings=None):
+    """
+    Fill in the results of a batch created before its upload was scored
+    (streamed uploads and jobs) and mark it complete.
+    """
+    batch = db.get(AssessmentBatch, batch_id)
+    batch.summary = _json(summary)
+    batch.insight = insight
+    batch.row_count = row_count
+    batch.complete = True
+    if timings is not None:
+        batch.timings = _json(timings)
+    return batch
+
+
+def delete_batch(db, batch_id):
+    """
+    Remove an unfinished batch and the snapshot rows committed for it so
+    far. Its rollups and trends were never applied, so nothing else
+    changes. Complete batches are left alone; returns whether one was
+    deleted.
+    """
+    batch = db.get(AssessmentBatch, batch_id)
+    if batch is None or batch.complete:
+        return False
+    db.execute(delete(SMESnapshot).where(SMESnapshot.batch_id == batch_id))
+    db.delete(batch)
+    return True
+
+
+def describe_batch(row, with_insight=True):
+    batch = {
+        "batch_id": row.id,
+        "source": row.source,
+        "filename": row.filename,
+        "model_version": row.model_version,
+        "rows": row.row_count,
+        "complete": row.complete,
+        "summary": json.loads(row.summary) if row.summary else None,
+        "created_at": row.created_at,
+    }
+    if with_insight:
+        batch["ai_insights"] = row.insight
+        batch["timings"] = json.loads(row.timings) if row.timings else {}
+    return batch
+
+
+# =========================
+# Queries
+# =========================
+def list_batches(db, limit=50, before=None, source=None):
+    """
+    Newest-first page of batches without insight text. Pass the returned
+    next_before to get the following page.
+    """
+    stmt = select(*LIST_COLUMNS)
+    if before is not None:
+        stmt = stmt.where(AssessmentBatch.id < before)
+    if source:
+        stmt = stmt.where(AssessmentBatch.source == source)
+    rows = db.execute(stmt.order_by(AssessmentBatch.id.desc()).limit(limit + 1)).all()
+
+    items = [describe_batch(row, with_insight=False) for row in rows[:limit]]
+    next_before = items[-1]["batch_id"] if len(rows) > limit else None
+    return items, next_before
+
+
+def get_batch(db, batch_id):
+    row = db.get(AssessmentBatch, batch_id)
+    return describe_batch(row) if row is not None else None
+
+
+async def create_batch_async(db, source, **fields):
+    return await db.run_sync(create_batch, source, **fields)
+
+
+async def list_batches_async(db, limit=50, before=None, source=None):
+    return await db.run_sync(list_batches, limit=limit, before=before, source=source)
+
+
+async def get_batch_async(db, batch_id):
+    return await db.run_sync(get_batch, batch_id)
@@ -1,17 +1,134 @@
-from sqlalchemy import create_engine
+from sqlalchemy import create_engine, event
+from sqlalchemy.engine import make_url
+from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker
 from sqlalchemy.orm import sessionmaker, declarative_base
 
-DATABASE_URL = "sqlite:///./app.db"
-
-engine = create_engine(
+from settings import (
     DATABASE_URL,
-    connect_args={"check_same_thread": False}
+    ASYNC_DATABASE_URL,
+    SQLITE_JOURNAL_MODE,
+    SQLITE_SYNCHRONOUS,
+    SQLITE_CACHE_SIZE_KB,
+    SQLITE_MMAP_SIZE,
+    SQLITE_BUSY_TIMEOUT_MS,
+    DB_POOL_SIZE,
+    DB_MAX_OVERFLOW,
+    DB_POOL_TIMEOUT,
 )
 
+
+def sqlite_pragmas(in_memory=False):
+    pragmas = {
+        "busy_timeout": SQLITE_BUSY_TIMEOUT_MS,
+        "synchronous": SQLITE_SYNCHRONOUS,
+        "cache_size": -SQLITE_CACHE_SIZE_KB,  # negative = KiB instead of pages
+        "mmap_size": SQLITE_MMAP_SIZE,
+        "temp_store": "MEMORY",
+        "foreign_keys": "ON",
+    }
+    if not in_memory:
+        pragmas["journal_mode"] = SQLITE_JOURNAL_MODE
+    return pragmas
+
+
+def _engine_options(parsed, pragmas):
+    """
+    (create_engine kwargs, PRAGMAs to apply) for a parsed URL.
+    """
+    kwargs = {}
+
+    if parsed.get_backend_name() == "sqlite":
+        in_memory = parsed.database in (None, "", ":memory:")
+        kwargs["connect_args"] = {
+            "check_same_thread": False,
+            "timeout": SQLITE_BUSY_TIMEOUT_MS / 1000,
+        }
+        if pragmas is None:
+            pragmas = sqlite_pragmas(in_memory)
+        if not in_memory:
+            kwargs.update(pool_size=DB_POOL_SIZE, max_overflow=DB_MAX_OVERFLOW, pool_timeout=DB_POOL_TIMEOUT)
+    else:
+        kwargs.update(pool_size=DB_POOL_SIZE, max_overflow=DB_MAX_OVERFLOW,
+                      pool_timeout=DB_POOL_TIMEOUT, pool_pre_ping=True)
+    return kwargs, pragmas
+
+
+def _apply_pragmas_on_connect(engine, pragmas):
+    @event.listens_for(engine, "connect")
+    def apply_pragmas(dbapi_connection, connection_record):
+        cursor = dbapi_connection.cursor()
+        for name, value in pragmas.items():
+            cursor.execute(f"PRAGMA {name}={value}")
+        cursor.close()
+
+
+def make_engine(url=DATABASE_URL, pragmas=None, **engine_kwargs):
+    """
+    Engine for url. SQLite connections get the PRAGMAs above (or the given
+    ones) as they are opened; every backend gets a sized connection pool.
+    """
+    kwargs, pragmas = _engine_options(make_url(url), pragmas)
+    kwargs.update(engine_kwargs)
+    engine = create_engine(url, **kwargs)
+    if pragmas:
+        _apply_pragmas_on_connect(engine, pragmas)
+    return engine
+
+
+# =========================
+# Async Engine
+# =========================
+ASYNC_DRIVERS = {
+    "sqlite": "sqlite+aiosqlite",
+    "postgresql": "postgresql+asyncpg",
+}
+
+
+def async_url(url):
+    """
+    The async-driver form of a sync database URL.
+    """
+    parsed = make_url(url)
+    if parsed.get_dialect().is_async:
+        return parsed
+    driver = ASYNC_DRIVERS.get(parsed.get_backend_name())
+    if driver is None:
+        raise ValueError(f"No async driver configured for {parsed.get_backend_name()!r}; "
+                         "set ASYNC_DATABASE_URL")
+    return parsed.set(drivername=driver)
+
+
+def make_async_engine(url=None, pragmas=None, **engine_kwargs):
+    """
+    AsyncEngine with the same pool sizing and SQLite PRAGMAs as
+    make_engine(). url defaults to ASYNC_DATABASE_URL, or DATABASE_URL
+    with its async driver.
+    """
+    parsed = async_url(url or ASYNC_DATABASE_URL or DATABASE_URL)
+    kwargs, pragmas = _engine_options(parsed, pragmas)
+    kwargs.update(engine_kwargs)
+    engine = create_async_engine(parsed, **kwargs)
+    if pragmas:
+        # aiosqlite's connection adapter exposes a blocking cursor() for this
+        _apply_pragmas_on_connect(engine.sync_engine, pragmas)
+    return engine
+
+
+engine = make_engine()
+
 SessionLocal = sessionmaker(
     autocommit=False,
     autoflush=False,
     bind=engine
 )
 
+# Async routes share one engine (and pool) per process
+async_engine = make_async_engine()
+
+AsyncSessionLocal = async_sessionmaker(
+    bind=async_engine,
+    autoflush=False,
+    expire_on_commit=False,
+)
+
 Base = declarative_base()
@@ -0,0 +1,131 @@
+import logging
+from datetime import datetime
+
+from sqlalchemy import column, exists, func, inspect, or_, select, table, text, update
+from sqlalchemy.exc import OperationalError
+from sqlalchemy.orm import Session
+
+from .models import AssessmentBatch, SMESnapshot, PortfolioRollup
+from .rollups import rebuild
+
+logger = logging.getLogger(__name__)
+
+# =========================
+# Schema Upgrades
+# =========================
+# Base.metadata.create_all() only creates missing tables. These helpers
+# bring databases created by older versions up to date and are safe to run
+# on every startup.
+
+
+def ensure_indexes(engine, tables=(SMESnapshot.__table__,)):
+    for tbl in tables:
+        for index in tbl.indexes:
+            index.create(bind=engine, checkfirst=True)
+
+
+def backfill_rollups(engine):
+    """
+    Databases created before portfolio_rollups existed have snapshots but
+    no rollups; compute them once from the raw rows.
+    """
+    with Session(bind=engine) as db:
+        has_rollups = db.execute(select(exists().select_from(PortfolioRollup))).scalar()
+        has_snapshots = db.execute(select(exists().select_from(SMESnapshot))).scalar()
+        if has_snapshots and not has_rollups:
+            logger.info("Backfilling portfolio rollups from existing snapshots")
+            rebuild(db)
+
+
+def _columns(engine, table_name):
+    return {column["name"] for column in inspect(engine).get_columns(table_name)}
+
+
+def _snapshot_columns(engine):
+    return _columns(engine, SMESnapshot.__tablename__)
+
+
+def add_column(engine, table_name, name, definition):
+    if name in _columns(engine, table_name):
+        return
+    logger.info("Adding %s.%s", table_name, name)
+    with engine.begin() as conn:
+        conn.execute(text(f"ALTER TABLE {table_name} ADD COLUMN {name} {definition}"))
+
+
+def add_batch_column(engine):
+    add_column(engine, "sme_snapshots", "batch_id", "INTEGER REFERENCES assessment_batches(id)")
+
+
+def add_chunked_batch_columns(engine):
+    """
+    Streamed uploads and jobs commit chunk by chunk: batches record whether
+    they finished, jobs which batch their current run is writing.
+    """
+    add_column(engine, "assessment_batches", "complete", "BOOLEAN NOT NULL DEFAULT TRUE")
+    add_column(engine, "assessment_jobs", "batch_id", "INTEGER")
+
+
+def backfill_batches(engine):
+    """
+    Databases from before assessment_batches kept the insight on every
+    snapshot. Create one batch per distinct insight text, point the
+    snapshots at it and drop the per-row copy.
+    """
+    if "insight" not in _snapshot_columns(engine):
+        return
+
+    # The ORM model no longer maps the insight column
+    legacy = table("sme_snapshots", column("batch_id"), column("insight"), column("created_at"))
+
+    with Session(bind=engine) as db:
+        pending = db.execute(select(exists().where(
+            or_(legacy.c.insight.is_not(None), legacy.c.batch_id.is_(None))
+        ))).scalar()
+    if not pending:
+        # Already moved: SQLite before 3.35 keeps the emptied column
+        return
+
+    with Session(bind=engine) as db:
+        groups = db.execute(
+            select(legacy.c.insight, func.count().label("rows"), func.min(legacy.c.created_at).label("first"))
+            .where(legacy.c.batch_id.is_(None))
+            .group_by(legacy.c.insight)
+        ).all()
+        logger.info("Backfilling %d assessment batches from snapshot insights", len(groups))
+
+        for group in groups:
+            batch = AssessmentBatch(source="backfill", insight=group.insight, row_count=group.rows,
+                                    created_at=_as_datetime(group.first))
+            db.add(batch)
+            db.flush()
+            same_insight = legacy.c.insight.is_(None) if group.insight is None else legacy.c.insight == group.insight
+            db.execute(
+                update(legacy)
+                .where(legacy.c.batch_id.is_(None), same_insight)
+                .values(batch_id=batch.id)
+            )
+        db.commit()
+
+    try:
+        with engine.begin() as conn:
+            conn.execute(text("ALTER TABLE sme_snapshots DROP COLUMN insight"))
+    except OperationalError:
+        # SQLite before 3.35 cannot drop columns; empty it instead
+        with engine.begin() as conn:
+            conn.execute(text("UPDATE sme_snapshots SET insight = NULL WHERE insight IS NOT NULL"))
+    logger.info("Moved snapshot insights to assessment_batches; VACUUM to reclaim the space")
+
+
+def _as_datetime(value):
+    if isinstance(value, str):  # SQLite returns raw text for aggregates
+        return datetime.fromisoformat(value)
+    return value or datetime.utcnow()
+
+
+def upgrade(engine):
+    add_batch_column(engine)
+    add_chunked_batch_columns(engine)
+    backfill_batches(engine)
+    ensure_indexes(engine)
+    backfill_rollups(engine)
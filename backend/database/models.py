@@ -1,11 +1,37 @@
-from sqlalchemy import Column, Integer, Float, String, DateTime
+from sqlalchemy import Column, Integer, Float, String, Boolean, DateTime, Date, Index, ForeignKey, true
 from datetime import datetime
 from .database import Base
 
+class AssessmentBatch(Base):
+    """
+    One scored upload: the portfolio summary, the insight text and how it
+    was produced. Snapshots point here instead of each carrying a copy of
+    the insight.
+    """
+    __tablename__ = "assessment_batches"
+
+    id = Column(Integer, primary_key=True)
+    source = Column(String, index=True)  # predict | predict_stream | jobs | backfill
+    filename = Column(String, nullable=True)
+    content_hash = Column(String, nullable=True, index=True)
+    model_version = Column(String, nullable=True)
+
+    row_count = Column(Integer, default=0)
+    summary = Column(String, nullable=True)  # JSON
+    insight = Column(String, nullable=True)
+    timings = Column(String, nullable=True)  # JSON, seconds per stage
+    # False while a streamed upload or job is still writing its chunks;
+    # rollups and trends only include complete batches
+    complete = Column(Boolean, nullable=False, default=True, server_default=true())
+
+    created_at = Column(DateTime, default=datetime.utcnow, index=True)
+
+
 class SMESnapshot(Base):
     __tablename__ = "sme_snapshots"
 
     id = Column(Integer, primary_key=True, index=True)
+    batch_id = Column(Integer, ForeignKey("assessment_batches.id"), nullable=True)
 
     transaction_id = Column(String, nullable=True)
     revenue = Column(Float, nullable=True)
@@ -15,6 +41,95 @@ class SMESnapshot(Base):
     health_score = Column(Integer)
     health_status = Column(String)
     confidence = Column(Float)
-    insight = Column(String)
 
     created_at = Column(DateTime, default=datetime.utcnow)
+
+    __table_args__ = (
+        # /history: newest-first keyset paging, optionally per status
+        Index("ix_sme_snapshots_created_at_id", "created_at", "id"),
+        Index("ix_sme_snapshots_status_created_at_id", "health_status", "created_at", "id"),
+        Index("ix_sme_snapshots_transaction_id", "transaction_id"),
+        Index("ix_sme_snapshots_batch_id", "batch_id"),
+    )
+
+
+class InsightCacheEntry(Base):
+    __tablename__ = "insight_cache"
+
+    key = Column(String, primary_key=True)
+    prompt_version = Column(String, index=True)
+    summary = Column(String)
+    insight = Column(String)
+
+    created_at = Column(DateTime, default=datetime.utcnow, index=True)
+
+
+class AssessmentJob(Base):
+    __tablename__ = "assessment_jobs"
+
+    id = Column(String, primary_key=True)
+    status = Column(String, index=True)  # queued | running | succeeded | failed
+    filename = Column(String, nullable=True)
+    model_version = Column(String, nullable=True)
+
+    upload_path = Column(String)
+    upload_bytes = Column(Integer, default=0)
+    result_path = Column(String, nullable=True)
+    batch_id = Column(Integer, nullable=True)  # assessment batch of the current run
+
+    rows_processed = Column(Integer, default=0)
+    bytes_processed = Column(Integer, default=0)
+
+    summary = Column(String, nullable=True)  # JSON
+    insight = Column(String, nullable=True)
+    timings = Column(String, nullable=True)  # JSON, seconds per stage
+    error = Column(String, nullable=True)
+
+    created_at = Column(DateTime, default=datetime.utcnow, index=True)
+    started_at = Column(DateTime, nullable=True)
+    finished_at = Column(DateTime, nullable=True)
+
+
+class PortfolioRollup(Base):
+    """
+    Running aggregates per day and health status, maintained in the same
+    transaction as the snapshot inserts they summarise.
+    """
+    __tablename__ = "portfolio_rollups"
+
+    day = Column(Date, primary_key=True)
+    health_status = Column(String, primary_key=True)
+
+    snapshot_count = Column(Integer, default=0)
+    score_sum = Column(Integer, default=0)
+    score_min = Column(Integer)
+    score_max = Column(Integer)
+
+    # Sums and non-null counts, so averages skip missing values like AVG()
+    profit_margin_sum = Column(Float, default=0.0)
+    profit_margin_count = Column(Integer, default=0)
+    cost_ratio_sum = Column(Float, default=0.0)
+    cost_ratio_count = Column(Integer, default=0)
+
+
+class SMEPeriodMetric(Base):
+    """
+    Running aggregates per SME and calendar month, maintained in the same
+    transaction as the snapshot inserts. Rolling trends read an SME's last
+    few months from here instead of its history.
+    """
+    __tablename__ = "sme_period_metrics"
+
+    sme_id = Column(String, primary_key=True)
+    period = Column(String, primary_key=True)  # YYYY-MM
+
+    row_count = Column(Integer, default=0)
+    revenue_sum = Column(Float, default=0.0)
+    net_profit_sum = Column(Float, default=0.0)
+    loss_count = Column(Integer, default=0)  # rows with NetProfit < 0
+
+    # Sums and non-null counts, so averages skip missing values like AVG()
+    profit_margin_sum = Column(Float, default=0.0)
+    profit_margin_count = Column(Integer, default=0)
+    cost_ratio_sum = Column(Float, default=0.0)
+    cost_ratio_count = Column(Integer, default=0)
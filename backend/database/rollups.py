@@ -0,0 +1,337 @@
+"""
+Portfolio rollups: per day x health_status aggregates of sme_snapshots.
+
+write_snapshots() folds every batch into the rollups inside its own
+transaction, so dashboard queries read a handful of rows instead of
+scanning the snapshot table. Batches written chunk by chunk (streamed
+uploads, jobs) are added once complete. Recompute them from the raw snapshots with:
+
+    python -m database.rollups verify     # report drift, change nothing
+    python -m database.rollups rebuild    # recompute, then verify
+"""
+import argparse
+import math
+from datetime import date
+
+from sqlalchemy import case, delete, exists, func, select
+
+from .models import AssessmentBatch, PortfolioRollup, SMESnapshot
+
+AGGREGATE_FIELDS = (
+    "snapshot_count", "score_sum", "score_min", "score_max",
+    "profit_margin_sum", "profit_margin_count", "cost_ratio_sum", "cost_ratio_count",
+)
+
+
+def numeric_column(df, name):
+    """
+    df[name] as floats (unparseable values become NaN), or all NaN when
+    the column is missing.
+    """
+    import numpy as np
+    import pandas as pd
+
+    if name in df.columns:
+        return pd.to_numeric(df[name], errors="coerce")
+    return pd.Series(np.nan, index=df.index)
+
+
+def aggregate_frame(df, day):
+    """
+    Rollup rows for one batch of scored rows written on `day`.
+    """
+    if df.empty:
+        return []
+
+    import pandas as pd
+    frame = pd.DataFrame({
+        "status": df["Health_Status"].to_numpy(),
+        "score": df["Health_Score"].to_numpy(),
+        "pm": numeric_column(df, "Profit_Margin").to_numpy(),
+        "cr": numeric_column(df, "Cost_Ratio").to_numpy(),
+    })
+    grouped = frame.groupby("status", sort=False).agg(
+        snapshot_count=("score", "size"),
+        score_sum=("score", "sum"),
+        score_min=("score", "min"),
+        score_max=("score", "max"),
+        profit_margin_sum=("pm", "sum"),
+        profit_margin_count=("pm", "count"),
+        cost_ratio_sum=("cr", "sum"),
+        cost_ratio_count=("cr", "count"),
+    )
+
+    rows = []
+    for status, agg in grouped.iterrows():
+        rows.append({
+            "day": day,
+            "health_status": status,
+            "snapshot_count": int(agg.snapshot_count),
+            "score_sum": int(agg.score_sum),
+            "score_min": int(agg.score_min),
+            "score_max": int(agg.score_max),
+            "profit_margin_sum": float(agg.profit_margin_sum),
+            "profit_margin_count": int(agg.profit_margin_count),
+            "cost_ratio_sum": float(agg.cost_ratio_sum),
+            "cost_ratio_count": int(agg.cost_ratio_count),
+        })
+    return rows
+
+
+def _upsert_statement(dialect):
+    if dialect == "sqlite":
+        from sqlalchemy.dialects.sqlite import insert
+    elif dialect == "postgresql":
+        from sqlalchemy.dialects.postgresql import insert
+    else:
+        return None
+
+    table = PortfolioRollup.__table__
+    stmt = insert(table)
+    new = stmt.excluded
+    return stmt.on_conflict_do_update(
+        index_elements=["day", "health_status"],
+        set_={
+            "snapshot_count": table.c.snapshot_count + new.snapshot_count,
+            "score_sum": table.c.score_sum + new.score_sum,
+            "score_min": case((new.score_min < table.c.score_min, new.score_min), else_=table.c.score_min),
+            "score_max": case((new.score_max > table.c.score_max, new.score_max), else_=table.c.score_max),
+            "profit_margin_sum": table.c.profit_margin_sum + new.profit_margin_sum,
+            "profit_margin_count": table.c.profit_margin_count + new.profit_margin_count,
+            "cost_ratio_sum": table.c.cost_ratio_sum + new.cost_ratio_sum,
+            "cost_ratio_count": table.c.cost_ratio_count + new.cost_ratio_count,
+        },
+    )
+
+
+def update_rollups(db, df, day):
+    """
+    Add a batch of scored rows to the rollups. Runs in the caller's
+    transaction; cost depends on the number of statuses, not on history.
+    """
+    add_rollup_rows(db, aggregate_frame(df, day))
+
+
+def add_rollup_rows(db, rows):
+    """
+    Upsert rollup rows (see aggregate_frame) into the caller's transaction.
+    """
+    if not rows:
+        return
+
+    stmt = _upsert_statement(db.get_bind().dialect.name)
+    if stmt is not None:
+        db.execute(stmt, rows)
+        return
+
+    # Dialects without ON CONFLICT: read-modify-write inside the transaction
+    for row in rows:
+        current = db.get(PortfolioRollup, (row["day"], row["health_status"]))
+        if current is None:
+            db.add(PortfolioRollup(**row))
+            continue
+        current.snapshot_count += row["snapshot_count"]
+        current.score_sum += row["score_sum"]
+        current.score_min = min(current.score_min, row["score_min"])
+        current.score_max = max(current.score_max, row["score_max"])
+        current.profit_margin_sum += row["profit_margin_sum"]
+        current.profit_margin_count += row["profit_margin_count"]
+        current.cost_ratio_sum += row["cost_ratio_sum"]
+        current.cost_ratio_count += row["cost_ratio_count"]
+
+
+def merge_rollup_rows(totals, rows):
+    """
+    Fold rollup rows into totals ({(day, health_status): row}) in memory,
+    for batches whose rollups are applied only once they complete.
+    """
+    for row in rows:
+        key = (row["day"], row["health_status"])
+        current = totals.get(key)
+        if current is None:
+            totals[key] = dict(row)
+            continue
+        for field in ("snapshot_count", "score_sum", "profit_margin_sum",
+                      "profit_margin_count", "cost_ratio_sum", "cost_ratio_count"):
+            current[field] += row[field]
+        current["score_min"] = min(current["score_min"], row["score_min"])
+        current["score_max"] = max(current["score_max"], row["score_max"])
+    return totals
+
+
+async def update_rollups_async(db, df, day):
+    """
+    update_rollups() on an AsyncSession.
+    """
+    await db.run_sync(update_rollups, df, day)
+
+
+# =========================
+# Queries
+# =========================
+def _ratio(total, count):
+    return round(total / count, 4) if count else None
+
+
+def _describe(agg):
+    count = agg["snapshot_count"]
+    return {
+        "count": count,
+        "avg_health_score": round(agg["score_sum"] / count, 1) if count else None,
+        "min_health_score": agg["score_min"],
+        "max_health_score": agg["score_max"],
+        "avg_profit_margin": _ratio(agg["profit_margin_sum"], agg["profit_margin_count"]),
+        "avg_cost_ratio": _ratio(agg["cost_ratio_sum"], agg["cost_ratio_count"]),
+    }
+
+
+def _combine(rows):
+    combined = {}
+    for row in rows:
+        acc = combined.get(row["health_status"])
+        if acc is None:
+            combined[row["health_status"]] = dict(row)
+            continue
+        for field in ("snapshot_count", "score_sum", "profit_margin_sum",
+                      "profit_margin_count", "cost_ratio_sum", "cost_ratio_count"):
+            acc[field] += row[field]
+        acc["score_min"] = min(acc["score_min"], row["score_min"])
+        acc["score_max"] = max(acc["score_max"], row["score_max"])
+    return combined
+
+
+def portfolio_stats(db, start=None, end=None, by_day=False):
+    """
+    Portfolio-wide statistics from the rollups, optionally limited to
+    [start, end] days and broken down per day.
+    """
+    stmt = select(PortfolioRollup)
+    if start is not None:
+        stmt = stmt.where(PortfolioRollup.day >= start)
+    if end is not None:
+        stmt = stmt.where(PortfolioRollup.day <= end)
+    rollups = db.execute(stmt.order_by(PortfolioRollup.day)).scalars().all()
+
+    rows = [
+        {"day": r.day, "health_status": r.health_status, **{f: getattr(r, f) for f in AGGREGATE_FIELDS}}
+        for r in rollups
+    ]
+    per_status = _combine(rows)
+    overall = _combine([{**row, "health_status": "all"} for row in per_status.values()])
+
+    stats = {
+        "overall": _describe(overall["all"]) if overall else _describe({f: 0 for f in AGGREGATE_FIELDS}),
+        "by_status": {status: _describe(agg) for status, agg in per_status.items()},
+    }
+    if by_day:
+        days = {}
+        for row in rows:
+            days.setdefault(row["day"].isoformat(), {})[row["health_status"]] = _describe(row)
+        stats["by_day"] = days
+    return stats
+
+
+async def portfolio_stats_async(db, start=None, end=None, by_day=False):
+    """
+    portfolio_stats() on an AsyncSession.
+    """
+    return await db.run_sync(portfolio_stats, start=start, end=end, by_day=by_day)
+
+
+# =========================
+# Rebuild / Verify
+# =========================
+def compute_from_snapshots(db):
+    """
+    Rollup rows recomputed from sme_snapshots of complete batches with a
+    full scan.
+    """
+    day = func.date(SMESnapshot.created_at)
+    stmt = select(
+        day.label("day"),
+        SMESnapshot.health_status,
+        func.count().label("snapshot_count"),
+        func.coalesce(func.sum(SMESnapshot.health_score), 0).label("score_sum"),
+        func.min(SMESnapshot.health_score).label("score_min"),
+        func.max(SMESnapshot.health_score).label("score_max"),
+        func.coalesce(func.sum(SMESnapshot.profit_margin), 0.0).label("profit_margin_sum"),
+        func.count(SMESnapshot.profit_margin).label("profit_margin_count"),
+        func.coalesce(func.sum(SMESnapshot.cost_ratio), 0.0).label("cost_ratio_sum"),
+        func.count(SMESnapshot.cost_ratio).label("cost_ratio_count"),
+    ).where(
+        # snapshots of unfinished chunked batches are not in the rollups yet
+        ~exists().where(AssessmentBatch.id == SMESnapshot.batch_id, AssessmentBatch.complete.is_(False))
+    ).group_by(day, SMESnapshot.health_status)
+
+    rows = []
+    for row in db.execute(stmt).mappings():
+        row = dict(row)
+        if isinstance(row["day"], str):
+            row["day"] = date.fromisoformat(row["day"])
+        rows.append(row)
+    return rows
+
+
+def verify(db, rel_tol=1e-9):
+    """
+    Compare stored rollups with a recomputation. Returns a list of
+    human-readable differences (empty when they match).
+    """
+    expected = {(r["day"], r["health_status"]): r for r in compute_from_snapshots(db)}
+    stored = {
+        (r.day, r.health_status): {f: getattr(r, f) for f in AGGREGATE_FIELDS}
+        for r in db.execute(select(PortfolioRollup)).scalars()
+    }
+
+    problems = []
+    for key in sorted(set(expected) | set(stored), key=lambda k: (k[0], k[1] or "")):
+        if key not in stored:
+            problems.append(f"{key}: missing rollup")
+            continue
+        if key not in expected:
+            problems.append(f"{key}: rollup without snapshots")
+            continue
+        for field in AGGREGATE_FIELDS:
+            want, have = expected[key][field], stored[key][field]
+            if not math.isclose(float(want or 0), float(have or 0), rel_tol=rel_tol, abs_tol=1e-9):
+                problems.append(f"{key}: {field} is {have}, expected {want}")
+    return problems
+
+
+def rebuild(db):
+    """
+    Replace all rollups with a recomputation from the raw snapshots.
+    """
+    rows = compute_from_snapshots(db)
+    db.execute(delete(PortfolioRollup))
+    if rows:
+        db.execute(PortfolioRollup.__table__.insert(), rows)
+    db.commit()
+    return len(rows)
+
+
+def main():
+    from .database import SessionLocal
+
+    parser = argparse.ArgumentParser(description="Rebuild or verify portfolio rollups")
+    parser.add_argument("command", choices=["rebuild", "verify"])
+    args = parser.parse_args()
+
+    db = SessionLocal()
+    try:
+        if args.command == "rebuild":
+            print(f"✅ Rebuilt {rebuild(db)} rollup rows")
+        problems = verify(db)
+    finally:
+        db.close()
+
+    if problems:
+        print(f"❌ {len(problems)} rollup differences:")
+        for problem in problems:
+            print("  " + problem)
+        raise SystemExit(1)
+    print("✅ Rollups match the raw snapshots")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,302 @@
+from datetime import datetime
+import asyncio
+import base64
+import logging
+
+from sqlalchemy import select, tuple_
+
+from .models import SMESnapshot
+from .rollups import update_rollups, update_rollups_async
+from .trends import update_trends, update_trends_async
+from settings import SNAPSHOT_WRITE_MODE, SNAPSHOT_BATCH_SIZE, SNAPSHOT_COMMIT_EVERY
+
+logger = logging.getLogger(__name__)
+
+# DataFrame column -> sme_snapshots column
+SNAPSHOT_COLUMNS = {
+    "TransactionID": "transaction_id",
+    "Revenue": "revenue",
+    "Profit_Margin": "profit_margin",
+    "Cost_Ratio": "cost_ratio",
+    "Health_Score": "health_score",
+    "Health_Status": "health_status",
+    "Confidence": "confidence",
+}
+
+
+def _column_values(df, name):
+    """
+    Column as a list of plain Python values with NaN mapped to None, or
+    all-None when the upload does not have it (same as row.get(name)).
+    """
+    if name not in df.columns:
+        return [None] * len(df)
+    series = df[name]
+    return series.astype(object).where(series.notna(), None).tolist()
+
+
+# =========================
+# ORM Path (one object per row)
+# =========================
+def add_snapshots_orm(db, df, batch_id, created_at=None):
+    for _, row in df.iterrows():
+        db.add(SMESnapshot(
+            batch_id=batch_id,
+            transaction_id=row.get("TransactionID"),
+            revenue=row.get("Revenue"),
+            profit_margin=row.get("Profit_Margin"),
+            cost_ratio=row.get("Cost_Ratio"),
+            health_score=row["Health_Score"],
+            health_status=row["Health_Status"],
+            confidence=row["Confidence"],
+            created_at=created_at
+        ))
+    return len(df)
+
+
+# =========================
+# Bulk Path (Core executemany)
+# =========================
+def snapshot_batches(df, batch_id, batch_size=None, created_at=None):
+    """
+    sme_snapshots parameter dicts for every DataFrame row, in lists of
+    batch_size.
+    """
+    batch_size = batch_size or SNAPSHOT_BATCH_SIZE
+    total = len(df)
+
+    keys = list(SNAPSHOT_COLUMNS.values()) + ["batch_id", "created_at"]
+    columns = [_column_values(df, name) for name in SNAPSHOT_COLUMNS]
+    columns.append([batch_id] * total)
+    columns.append([created_at or datetime.utcnow()] * total)
+    rows = zip(*columns)
+
+    for _ in range(0, total, batch_size):
+        yield [dict(zip(keys, values)) for _, values in zip(range(batch_size), rows)]
+
+
+def bulk_insert_snapshots(db, df, batch_id, batch_size=None, commit_every=None, on_progress=None,
+                          created_at=None):
+    """
+    Insert one sme_snapshots row per DataFrame row without building ORM
+    objects. Rows are sent in executemany batches of batch_size; when
+    commit_every is set the session commits after that many batches.
+    on_progress(written, total) is called after every batch.
+
+    Returns the number of rows written.
+    """
+    commit_every = SNAPSHOT_COMMIT_EVERY if commit_every is None else commit_every
+
+    total = len(df)
+    if total == 0:
+        return 0
+
+    stmt = SMESnapshot.__table__.insert()
+    written = 0
+    batches = 0
+
+    for batch in snapshot_batches(df, batch_id, batch_size, created_at):
+        db.execute(stmt, batch)
+        written += len(batch)
+        batches += 1
+
+        if commit_every and batches % commit_every == 0:
+            db.commit()
+        if on_progress:
+            on_progress(written, total)
+
+    logger.debug("Inserted %d snapshots in %d batches", written, batches)
+    return written
+
+
+def insert_snapshots(db, df, batch_id, on_progress=None, created_at=None, commit_every=0):
+    """
+    Snapshot rows only, using the configured SNAPSHOT_WRITE_MODE; no
+    rollups or trends.
+    """
+    if SNAPSHOT_WRITE_MODE == "orm":
+        return add_snapshots_orm(db, df, batch_id, created_at=created_at)
+    return bulk_insert_snapshots(db, df, batch_id, commit_every=commit_every,
+                                 on_progress=on_progress, created_at=created_at)
+
+
+def commit_slices(df, commit_every=None, batch_size=None):
+    """
+    df split into the row ranges committed together: commit_every batches
+    of batch_size rows each, or all of df when commit_every is 0.
+    """
+    commit_every = SNAPSHOT_COMMIT_EVERY if commit_every is None else commit_every
+    rows = commit_every * (batch_size or SNAPSHOT_BATCH_SIZE) if commit_every else len(df)
+    return [df.iloc[start:start + rows] for start in range(0, len(df), max(rows, 1))]
+
+
+def write_snapshots(db, df, batch_id, on_progress=None, commit_every=None):
+    """
+    Persist scored rows of assessment batch batch_id and fold them into
+    the portfolio rollups and SME trends.
+
+    With SNAPSHOT_COMMIT_EVERY set the rows are committed in slices of that
+    many batches, each slice together with its own rollup and trend deltas,
+    so committed snapshots and aggregates never disagree. The caller owns
+    the final commit.
+    """
+    created_at = datetime.utcnow()
+    total, written = len(df), 0
+    for number, part in enumerate(commit_slices(df, commit_every)):
+        if number:
+            db.commit()
+        progress = None
+        if on_progress:
+            progress = lambda done, _, offset=written: on_progress(offset + done, total)
+        written += insert_snapshots(db, part, batch_id, progress, created_at)
+        update_rollups(db, part, created_at.date())
+        update_trends(db, part)
+    return written
+
+
+# =========================
+# Async Path (AsyncSession)
+# =========================
+async def bulk_insert_snapshots_async(db, df, batch_id, batch_size=None, commit_every=None,
+                                      on_progress=None, created_at=None):
+    """
+    bulk_insert_snapshots() on an AsyncSession. Each batch's parameter
+    dicts are built in a worker thread just before it is sent, so a large
+    upload neither stalls the event loop nor holds every row's dict at
+    once.
+    """
+    commit_every = SNAPSHOT_COMMIT_EVERY if commit_every is None else commit_every
+    total = len(df)
+    if total == 0:
+        return 0
+
+    batches = snapshot_batches(df, batch_id, batch_size, created_at)
+    stmt = SMESnapshot.__table__.insert()
+    written = 0
+    number = 0
+
+    while (batch := await asyncio.to_thread(next, batches, None)) is not None:
+        await db.execute(stmt, batch)
+        written += len(batch)
+        number += 1
+
+        if commit_every and number % commit_every == 0:
+            await db.commit()
+        if on_progress:
+            on_progress(written, total)
+
+    logger.debug("Inserted %d snapshots in %d batches", written, number)
+    return written
+
+
+async def write_snapshots_async(db, df, batch_id, on_progress=None, commit_every=None):
+    """
+    write_snapshots() on an AsyncSession. The caller owns the final commit.
+    """
+    created_at = datetime.utcnow()
+    total, written = len(df), 0
+    for number, part in enumerate(commit_slices(df, commit_every)):
+        if number:
+            await db.commit()
+        if SNAPSHOT_WRITE_MODE == "orm":
+            written += await db.run_sync(add_snapshots_orm, part, batch_id, created_at)
+        else:
+            progress = None
+            if on_progress:
+                progress = lambda done, _, offset=written: on_progress(offset + done, total)
+            written += await bulk_insert_snapshots_async(db, part, batch_id, commit_every=0,
+                                                         on_progress=progress, created_at=created_at)
+        await update_rollups_async(db, part, created_at.date())
+        await update_trends_async(db, part)
+    return written
+
+
+# =========================
+# History Queries
+# =========================
+HISTORY_COLUMNS = (
+    SMESnapshot.id,
+    SMESnapshot.batch_id,
+    SMESnapshot.transaction_id,
+    SMESnapshot.revenue,
+    SMESnapshot.profit_margin,
+    SMESnapshot.cost_ratio,
+    SMESnapshot.health_score,
+    SMESnapshot.health_status,
+    SMESnapshot.confidence,
+    SMESnapshot.created_at,
+)
+
+
+class InvalidCursor(ValueError):
+    pass
+
+
+def encode_cursor(created_at, snapshot_id):
+    raw = f"{created_at.isoformat()}|{snapshot_id}".encode("utf-8")
+    return base64.urlsafe_b64encode(raw).decode("ascii")
+
+
+def decode_cursor(cursor):
+    try:
+        created_at, snapshot_id = base64.urlsafe_b64decode(cursor.encode("ascii")).decode("utf-8").split("|")
+        return datetime.fromisoformat(created_at), int(snapshot_id)
+    except (ValueError, UnicodeError) as exc:
+        raise InvalidCursor("Malformed history cursor") from exc
+
+
+def history_statement(limit=50, cursor=None, status=None, min_score=None,
+                      max_score=None, start=None, end=None):
+    """
+    Newest-first select of one history page plus one row, which tells
+    whether another page follows.
+    """
+    stmt = select(*HISTORY_COLUMNS)
+
+    if status:
+        stmt = stmt.where(SMESnapshot.health_status == status)
+    if min_score is not None:
+        stmt = stmt.where(SMESnapshot.health_score >= min_score)
+    if max_score is not None:
+        stmt = stmt.where(SMESnapshot.health_score <= max_score)
+    if start is not None:
+        stmt = stmt.where(SMESnapshot.created_at >= start)
+    if end is not None:
+        stmt = stmt.where(SMESnapshot.created_at < end)
+    if cursor:
+        stmt = stmt.where(tuple_(SMESnapshot.created_at, SMESnapshot.id) < decode_cursor(cursor))
+
+    return stmt.order_by(SMESnapshot.created_at.desc(), SMESnapshot.id.desc()).limit(limit + 1)
+
+
+def history_page(rows, limit):
+    items = [dict(row) for row in rows[:limit]]
+    next_cursor = None
+    if len(rows) > limit:
+        last = items[-1]
+        next_cursor = encode_cursor(last["created_at"], last["id"])
+    return items, next_cursor
+
+
+def query_history(db, limit=50, cursor=None, **filters):
+    """
+    Newest-first page of snapshots as plain dicts; the insight is on the
+    batch (GET /batches/{batch_id}).
+
+    Paging is keyset-based on (created_at, id): the cursor is the position
+    of the last row returned, so every page is an index range scan no matter
+    how deep it is. Filters: status, min_score, max_score, start, end.
+    Returns (items, next_cursor).
+    """
+    stmt = history_statement(limit, cursor, **filters)
+    rows = db.execute(stmt).mappings().all()
+    return history_page(rows, limit)
+
+
+async def query_history_async(db, limit=50, cursor=None, **filters):
+    """
+    query_history() on an AsyncSession.
+    """
+    stmt = history_statement(limit, cursor, **filters)
+    rows = (await db.execute(stmt)).mappings().all()
+    return history_page(rows, limit)
@@ -0,0 +1,335 @@
+"""
+SME trends: per SME x calendar month aggregates of uploaded rows.
+
+write_snapshots() folds every upload that names its SMEs (a
+TREND_SME_COLUMNS column) into sme_period_metrics inside its own
+transaction; the cost depends on the new rows, never on history. Batches
+written chunk by chunk are added once complete. Rolling features
+(revenue growth, margin change, loss months, ...) are computed from an
+SME's last TREND_WINDOW_MONTHS months of aggregates.
+"""
+import numbers
+
+from sqlalchemy import func, select
+
+from .models import SMEPeriodMetric
+from .rollups import numeric_column
+from settings import TREND_SME_COLUMNS, TREND_WINDOW_MONTHS
+
+PERIOD_FIELDS = (
+    "row_count", "revenue_sum", "net_profit_sum", "loss_count",
+    "profit_margin_sum", "profit_margin_count", "cost_ratio_sum", "cost_ratio_count",
+)
+# SME ids per IN (...) query, well below SQLite's bound-parameter limit
+LOOKUP_CHUNK = 500
+
+
+def sme_column(df):
+    return next((col for col in TREND_SME_COLUMNS if col in df.columns), None)
+
+
+def _sme_key(value):
+    if isinstance(value, numbers.Real) and float(value).is_integer():
+        return str(int(value))
+    key = str(value).strip()
+    return key or None
+
+
+def sme_keys(series):
+    """
+    SME ids as strings (None when blank). An integer id column that pandas
+    read as floats because of one blank cell keys 1.0 as "1", the same SME
+    as in uploads without blanks.
+    """
+    keys = {value: _sme_key(value) for value in series.dropna().unique()}
+    return series.map(keys)
+
+
+def _month_keys(df):
+    """
+    YYYYMM per row as floats (NaN when the row has no usable date), from
+    Year/Month when preprocessing added them, else TransactionDate.
+    """
+    import numpy as np
+    import pandas as pd
+
+    if {"Year", "Month"}.issubset(df.columns):
+        year = numeric_column(df, "Year")
+        month = numeric_column(df, "Month").where(lambda m: m.between(1, 12))
+        return year * 100 + month
+    if "TransactionDate" in df.columns:
+        dates = pd.to_datetime(df["TransactionDate"], errors="coerce")
+        return dates.dt.year * 100 + dates.dt.month
+    return pd.Series(np.nan, index=df.index)
+
+
+def aggregate_periods(df):
+    """
+    sme_period_metrics rows for one batch of uploaded rows. Rows without
+    an SME id or a date are skipped.
+    """
+    column = sme_column(df) if not df.empty else None
+    if column is None:
+        return []
+
+    import pandas as pd
+
+    net_profit = numeric_column(df, "NetProfit")
+    frame = pd.DataFrame({
+        "sme": sme_keys(df[column]).to_numpy(),
+        "month": _month_keys(df).to_numpy(),
+        "revenue": numeric_column(df, "Revenue").to_numpy(),
+        "net": net_profit.to_numpy(),
+        "loss": (net_profit < 0).to_numpy(),
+        "pm": numeric_column(df, "Profit_Margin").to_numpy(),
+        "cr": numeric_column(df, "Cost_Ratio").to_numpy(),
+    }).dropna(subset=["sme", "month"])
+    if frame.empty:
+        return []
+
+    grouped = frame.groupby(["sme", "month"], sort=False).agg(
+        row_count=("revenue", "size"),
+        revenue_sum=("revenue", "sum"),
+        net_profit_sum=("net", "sum"),
+        loss_count=("loss", "sum"),
+        profit_margin_sum=("pm", "sum"),
+        profit_margin_count=("pm", "count"),
+        cost_ratio_sum=("cr", "sum"),
+        cost_ratio_count=("cr", "count"),
+    )
+
+    # Plain Python values, column by column: one dict per (SME, month)
+    months = grouped.index.get_level_values("month").astype(int)
+    columns = {
+        "sme_id": grouped.index.get_level_values("sme").tolist(),
+        "period": [f"{month // 100:04d}-{month % 100:02d}" for month in months],
+    }
+    for field in PERIOD_FIELDS:
+        values = grouped[field].to_numpy()
+        columns[field] = (values.astype(int) if field.endswith("count") else values.astype(float)).tolist()
+    return [dict(zip(columns, values)) for values in zip(*columns.values())]
+
+
+def _upsert_statement(dialect):
+    if dialect == "sqlite":
+        from sqlalchemy.dialects.sqlite import insert
+    elif dialect == "postgresql":
+        from sqlalchemy.dialects.postgresql import insert
+    else:
+        return None
+
+    table = SMEPeriodMetric.__table__
+    stmt = insert(table)
+    return stmt.on_conflict_do_update(
+        index_elements=["sme_id", "period"],
+        set_={field: table.c[field] + stmt.excluded[field] for field in PERIOD_FIELDS},
+    )
+
+
+def update_trends(db, df):
+    """
+    Add a batch of uploaded rows to the per-month aggregates. Runs in the
+    caller's transaction; cost depends on the rows in df, not on history.
+    """
+    add_periods(db, aggregate_periods(df))
+
+
+def add_periods(db, rows):
+    """
+    Upsert sme_period_metrics rows (see aggregate_periods) into the
+    caller's transaction.
+    """
+    if not rows:
+        return
+
+    stmt = _upsert_statement(db.get_bind().dialect.name)
+    if stmt is not None:
+        db.execute(stmt, rows)
+        return
+
+    # Dialects without ON CONFLICT: read-modify-write inside the transaction
+    for row in rows:
+        current = db.get(SMEPeriodMetric, (row["sme_id"], row["period"]))
+        if current is None:
+            db.add(SMEPeriodMetric(**row))
+            continue
+        for field in PERIOD_FIELDS:
+            setattr(current, field, getattr(current, field) + row[field])
+
+
+def merge_periods(totals, rows):
+    """
+    Fold period rows into totals ({(sme_id, period): row}) in memory, for
+    batches whose trends are applied only once they complete.
+    """
+    for row in rows:
+        key = (row["sme_id"], row["period"])
+        current = totals.get(key)
+        if current is None:
+            totals[key] = dict(row)
+            continue
+        for field in PERIOD_FIELDS:
+            current[field] += row[field]
+    return totals
+
+
+async def update_trends_async(db, df):
+    """
+    update_trends() on an AsyncSession.
+    """
+    await db.run_sync(update_trends, df)
+
+
+# =========================
+# Rolling Features
+# =========================
+def _month_index(period):
+    year, month = period.split("-")
+    return int(year) * 12 + int(month) - 1
+
+
+def _ratio(total, count, places=4):
+    return round(total / count, places) if count else None
+
+
+def combine_periods(stored, rows):
+    """
+    stored ({sme_id: [period rows]}) plus an upload's aggregate rows,
+    summed per period; returns {sme_id: [period rows, newest first]}.
+    """
+    combined = {sme: {row["period"]: dict(row) for row in periods} for sme, periods in stored.items()}
+    for row in rows:
+        periods = combined.setdefault(row["sme_id"], {})
+        current = periods.get(row["period"])
+        if current is None:
+            periods[row["period"]] = dict(row)
+            continue
+        for field in PERIOD_FIELDS:
+            current[field] += row[field]
+    return {
+        sme: sorted(periods.values(), key=lambda row: row["period"], reverse=True)
+        for sme, periods in combined.items()
+    }
+
+
+def trend_features(periods, window=TREND_WINDOW_MONTHS):
+    """
+    Rolling features over the `window` calendar months ending at the
+    newest of `periods` (period rows, newest first). Growth and change
+    compare the latest month with the earlier months of the window and
+    are None when it holds a single month.
+    """
+    latest = _month_index(periods[0]["period"])
+    months = [row for row in periods if latest - _month_index(row["period"]) < window]
+    months.reverse()  # oldest first
+    last = months[-1]
+
+    def margin(row):
+        return _ratio(row["profit_margin_sum"], row["profit_margin_count"])
+
+    revenue = sum(row["revenue_sum"] for row in months)
+    earlier = months[:-1]
+    earlier_revenue = sum(row["revenue_sum"] for row in earlier) / len(earlier) if earlier else 0
+    growth = last["revenue_sum"] / earlier_revenue - 1 if earlier_revenue > 0 else None
+    first_margin, last_margin = margin(months[0]), margin(last)
+    margin_change = (
+        last_margin - first_margin
+        if earlier and first_margin is not None and last_margin is not None else None
+    )
+
+    return {
+        "latest_period": last["period"],
+        "window_months": window,
+        "months": len(months),
+        "rows": sum(row["row_count"] for row in months),
+        "revenue_total": round(revenue, 2),
+        "revenue_avg_month": round(revenue / len(months), 2),
+        "revenue_growth": round(growth, 4) if growth is not None else None,
+        "avg_profit_margin": _ratio(sum(r["profit_margin_sum"] for r in months),
+                                    sum(r["profit_margin_count"] for r in months)),
+        "margin_change": round(margin_change, 4) if margin_change is not None else None,
+        "avg_cost_ratio": _ratio(sum(r["cost_ratio_sum"] for r in months),
+                                 sum(r["cost_ratio_count"] for r in months)),
+        "loss_months": sum(1 for row in months if row["net_profit_sum"] < 0),
+    }
+
+
+def describe_period(row):
+    return {
+        "period": row["period"],
+        "rows": row["row_count"],
+        "revenue": round(row["revenue_sum"], 2),
+        "net_profit": round(row["net_profit_sum"], 2),
+        "loss_rows": row["loss_count"],
+        "avg_profit_margin": _ratio(row["profit_margin_sum"], row["profit_margin_count"]),
+        "avg_cost_ratio": _ratio(row["cost_ratio_sum"], row["cost_ratio_count"]),
+    }
+
+
+# =========================
+# Queries
+# =========================
+def load_periods(db, sme_ids, window=TREND_WINDOW_MONTHS):
+    """
+    {sme_id: [period rows, newest first]} with at most `window` rows per
+    SME, read through the primary key index.
+    """
+    table = SMEPeriodMetric.__table__
+    rank = func.row_number().over(partition_by=table.c.sme_id, order_by=table.c.period.desc())
+    sme_ids = list(dict.fromkeys(sme_ids))
+
+    periods = {}
+    for start in range(0, len(sme_ids), LOOKUP_CHUNK):
+        ranked = (
+            select(table, rank.label("rank"))
+            .where(table.c.sme_id.in_(sme_ids[start:start + LOOKUP_CHUNK]))
+            .subquery()
+        )
+        stmt = (
+            select(*(ranked.c[name] for name in ("sme_id", "period", *PERIOD_FIELDS)))
+            .where(ranked.c.rank <= window)
+            .order_by(ranked.c.sme_id, ranked.c.period.desc())
+        )
+        for row in db.execute(stmt).mappings():
+            periods.setdefault(row["sme_id"], []).append(dict(row))
+    return periods
+
+
+def list_trends(db, limit=50, after=None, window=TREND_WINDOW_MONTHS):
+    """
+    Rolling features for a page of SMEs ordered by id. Pass the returned
+    next_after to get the following page.
+    """
+    stmt = select(SMEPeriodMetric.sme_id).distinct()
+    if after is not None:
+        stmt = stmt.where(SMEPeriodMetric.sme_id > after)
+    sme_ids = db.execute(stmt.order_by(SMEPeriodMetric.sme_id).limit(limit + 1)).scalars().all()
+
+    page = sme_ids[:limit]
+    periods = load_periods(db, page, window)
+    items = [{"sme_id": sme, **trend_features(periods[sme], window)} for sme in page]
+    next_after = page[-1] if len(sme_ids) > limit else None
+    return items, next_after
+
+
+def get_trend(db, sme_id, window=TREND_WINDOW_MONTHS):
+    """
+    Rolling features of one SME plus the months of its window, oldest
+    first; None when nothing was uploaded for it.
+    """
+    periods = load_periods(db, [sme_id], window).get(sme_id)
+    if not periods:
+        return None
+    features = trend_features(periods, window)
+    latest = _month_index(features["latest_period"])
+    series = [describe_period(row) for row in reversed(periods)
+              if latest - _month_index(row["period"]) < window]
+    return {"sme_id": sme_id, **features, "series": series}
+
+
+async def list_trends_async(db, limit=50, after=None, window=TREND_WINDOW_MONTHS):
+    return await db.run_sync(list_trends, limit=limit, after=after, window=window)
+
+
+async def get_trend_async(db, sme_id, window=TREND_WINDOW_MONTHS):
+    return await db.run_sync(get_trend, sme_id, window=window)
@@ -0,0 +1,175 @@
+import numpy as np
+
+# =========================
+# Compiled Forest Engine
+# =========================
+# Flattens a fitted sklearn RandomForestClassifier into a handful of
+# contiguous NumPy arrays and evaluates every tree for a batch of rows with
+# array operations, avoiding sklearn's per-call overhead on small requests.
+#
+# The compiled form is a plain dict of arrays, so training.py (run from the
+# repository root) and the API (run from backend/) can both read it, and
+# joblib can memory-map it.
+#
+# Array evaluation wins on small batches, where sklearn's fixed per-call
+# cost dominates; on large batches sklearn's compiled tree walk is faster.
+# RoutedForest picks between the two by batch size.
+
+FORMAT_VERSION = 1
+
+# Rows evaluated together; bounds the (rows x trees) index matrices
+EVAL_BATCH_ROWS = 1024
+
+
+def _sibling_order(tree):
+    """
+    Breadth-first node order in which the two children of every split sit
+    next to each other, so the right child is always left child + 1.
+    """
+    order = [0]
+    i = 0
+    while i < len(order):
+        node = order[i]
+        if tree.children_left[node] != -1:
+            order.append(tree.children_left[node])
+            order.append(tree.children_right[node])
+        i += 1
+    return np.asarray(order, dtype=np.intp)
+
+
+def compile_forest(model):
+    """
+    Convert a fitted RandomForestClassifier into the compiled array layout.
+
+    Nodes are renumbered so siblings are adjacent and a single "child" array
+    (the left child) is enough to walk a tree. Leaves point to themselves and
+    carry an infinite threshold, so walking max_depth steps from every root
+    always ends on a leaf.
+    """
+    features, thresholds, children, values, missing_left, roots = [], [], [], [], [], []
+    offset = 0
+    max_depth = 0
+
+    for estimator in model.estimators_:
+        tree = estimator.tree_
+        order = _sibling_order(tree)
+        position = np.empty(tree.node_count, dtype=np.intp)
+        position[order] = np.arange(tree.node_count)
+
+        leaf = tree.children_left[order] == -1
+        left = tree.children_left[order]
+
+        features.append(np.where(leaf, 0, tree.feature[order]))
+        thresholds.append(np.where(leaf, np.inf, tree.threshold[order]))
+        children.append(np.where(leaf, np.arange(tree.node_count), position[left]) + offset)
+
+        # Per-node class distribution, normalised like DecisionTreeClassifier.predict_proba
+        value = tree.value[order, 0, :].astype(np.float64)
+        values.append(value / value.sum(axis=1, keepdims=True))
+
+        mgl = getattr(tree, "missing_go_to_left", None)
+        missing_left.append(
+            np.zeros(tree.node_count, dtype=bool) if mgl is None else mgl[order].astype(bool)
+        )
+
+        roots.append(offset)
+        offset += tree.node_count
+        max_depth = max(max_depth, tree.max_depth)
+
+    return {
+        "format_version": FORMAT_VERSION,
+        "feature": np.concatenate(features).astype(np.int32),
+        "threshold": np.concatenate(thresholds).astype(np.float64),
+        "child": np.concatenate(children).astype(np.int32),
+        "value": np.ascontiguousarray(np.concatenate(values)),
+        "missing_go_to_left": np.concatenate(missing_left),
+        "roots": np.asarray(roots, dtype=np.int32),
+        "max_depth": int(max_depth),
+        "classes": np.asarray(model.classes_),
+        "n_features": int(model.n_features_in_),
+    }
+
+
+class CompiledForest:
+    """
+    Drop-in replacement for the predict/predict_proba surface of a
+    RandomForestClassifier, backed by compile_forest() arrays.
+    """
+
+    def __init__(self, arrays):
+        if arrays.get("format_version") != FORMAT_VERSION:
+            raise ValueError(
+                f"Unsupported compiled forest format: {arrays.get('format_version')}"
+            )
+        self.feature = arrays["feature"]
+        self.threshold = arrays["threshold"]
+        self.child = arrays["child"]
+        self.value = arrays["value"]
+        self.missing_go_to_left = arrays["missing_go_to_left"]
+        self.roots = arrays["roots"]
+        self.max_depth = arrays["max_depth"]
+        self.classes_ = arrays["classes"]
+        self.n_features_in_ = arrays["n_features"]
+        self.n_estimators = len(self.roots)
+        # sklearn sends NaN to the right child wherever missing_go_to_left
+        # is 0. Leaves (which point to themselves) must keep NaN rows in
+        # place, so they never move a row.
+        is_leaf = self.child == np.arange(len(self.child))
+        self.missing_go_right = ~self.missing_go_to_left.astype(bool) & ~is_leaf
+
+    def _leaf_indices(self, X):
+        n_rows, n_features = X.shape
+        flat = X.ravel()
+        row_offset = (np.arange(n_rows, dtype=np.int32) * n_features)[:, None]
+        idx = np.broadcast_to(self.roots, (n_rows, self.n_estimators)).copy()
+
+        for _ in range(self.max_depth):
+            x = flat.take(row_offset + self.feature.take(idx))
+            go_right = (x > self.threshold.take(idx)) | (np.isnan(x) & self.missing_go_right.take(idx))
+            idx = self.child.take(idx) + go_right
+
+        return idx
+
+    def predict_proba(self, X):
+        # sklearn trees round inputs to float32 before comparing them with
+        # float64 thresholds; doing the rounding once up front keeps the
+        # per-step comparisons in float64.
+        X = np.asarray(X, dtype=np.float32)
+        if X.ndim != 2 or X.shape[1] != self.n_features_in_:
+            raise ValueError(
+                f"Expected {self.n_features_in_} features, got shape {X.shape}"
+            )
+        X = X.astype(np.float64)
+
+        proba = np.empty((X.shape[0], len(self.classes_)), dtype=np.float64)
+        for start in range(0, X.shape[0], EVAL_BATCH_ROWS):
+            batch = X[start:start + EVAL_BATCH_ROWS]
+            leaves = self._leaf_indices(batch)
+            proba[start:start + len(batch)] = self.value[leaves].sum(axis=1) / self.n_estimators
+        return proba
+
+    def predict(self, X):
+        return self.classes_.take(np.argmax(self.predict_proba(X), axis=1))
+
+
+class RoutedForest:
+    """
+    Sends batches of up to max_compiled_rows rows to the compiled forest and
+    larger ones to the original sklearn estimator.
+    """
+
+    def __init__(self, compiled, model, max_compiled_rows):
+        self.compiled = compiled
+        self.model = model
+        self.max_compiled_rows = max_compiled_rows
+        self.classes_ = model.classes_
+        self.n_features_in_ = model.n_features_in_
+
+    def _engine(self, X):
+        return self.compiled if len(X) <= self.max_compiled_rows else self.model
+
+    def predict_proba(self, X):
+        return self._engine(X).predict_proba(X)
+
+    def predict(self, X):
+        return self._engine(X).predict(X)
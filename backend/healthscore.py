@@ -1,28 +1,161 @@
+import numpy as np
+
+# =========================
+# Health Scoring Rules
+# =========================
+# Single scoring engine shared by the API (backend/main.py) and the
+# Streamlit dashboard (app.py). Rules are applied to whole columns at once;
+# the row-wise functions below are kept as the reference implementation
+# that the vectorized path is benchmarked against.
+
+# Bump whenever a rule below changes; cached /predict results are keyed on it
+SCORING_RULES_VERSION = "1"
+
+BASE_SCORE = 30
+MAX_SCORE = 100
+
+# (threshold, points) bands, checked in order; the last entry is the default
+PROFIT_MARGIN_BANDS = ((0.2, 35), (0.1, 25), (None, 15))  # margin > threshold
+COST_RATIO_BANDS = ((0.6, 35), (0.8, 25), (None, 15))     # ratio < threshold
+
+HEALTHY_THRESHOLD = 85
+MODERATE_THRESHOLD = 60
+
+STATUS_HEALTHY = "Healthy"
+STATUS_MODERATE = "Moderate"
+STATUS_RISKY = "Risky"
+
+
+# =========================
+# Row-wise Reference
+# =========================
 def calculate_health_score(row):
-    revenue = row.get("Revenue", 0)
-    profit_margin = row.get("Profit_Margin", 0)
-    cost_ratio = row.get("Cost_Ratio", 0)
-    net_profit = row.get("NetProfit", 0)
-
-    score = 50  # base score
-
-    # Profit Margin contribution
-    if profit_margin >= 0.30:
-        score += 25
-    elif profit_margin >= 0.15:
-        score += 15
-    else:
-        score -= 10
-
-    # Cost efficiency
-    if cost_ratio < 0.6:
-        score += 15
-    elif cost_ratio > 0.8:
-        score -= 10
-
-    # Net profit check
-    if net_profit < 0:
-        score -= 20
-
-    # Clamp score between 0–100
-    return max(0, min(100, score))
\ No newline at end of file
+    score = 0
+    pm = row.get("Profit_Margin", 0)
+    cr = row.get("Cost_Ratio", 1)
+
+    score += 35 if pm > 0.2 else 25 if pm > 0.1 else 15
+    score += 35 if cr < 0.6 else 25 if cr < 0.8 else 15
+    score += BASE_SCORE
+
+    return min(score, MAX_SCORE)
+
+
+def assign_health_status(score):
+    if score >= HEALTHY_THRESHOLD:
+        return STATUS_HEALTHY
+    elif score >= MODERATE_THRESHOLD:
+        return STATUS_MODERATE
+    return STATUS_RISKY
+
+
+# =========================
+# Vectorized Engine
+# =========================
+def _column(df, name, default):
+    """
+    Return a column as a float array, or a constant array when it is absent
+    (mirrors row.get(name, default) in the row-wise rules).
+    """
+    if name in df.columns:
+        return df[name].to_numpy(dtype=np.float64, na_value=np.nan)
+    return np.full(len(df), default, dtype=np.float64)
+
+
+def _band_points(values, bands, above):
+    conditions, points = [], []
+    for threshold, pts in bands[:-1]:
+        conditions.append(values > threshold if above else values < threshold)
+        points.append(pts)
+    return np.select(conditions, points, default=bands[-1][1])
+
+
+def calculate_health_scores(df):
+    """
+    Score every row of a DataFrame in one pass. Returns an int64 array with
+    the same values as df.apply(calculate_health_score, axis=1).
+    """
+    pm = _column(df, "Profit_Margin", 0)
+    cr = _column(df, "Cost_Ratio", 1)
+
+    # NaN compares False everywhere, so it falls through to the lowest band
+    # exactly like the row-wise rules do.
+    with np.errstate(invalid="ignore"):
+        score = (
+            _band_points(pm, PROFIT_MARGIN_BANDS, above=True)
+            + _band_points(cr, COST_RATIO_BANDS, above=False)
+            + BASE_SCORE
+        )
+
+    return np.minimum(score, MAX_SCORE).astype(np.int64)
+
+
+_STATUS_LABELS = np.array([STATUS_RISKY, STATUS_MODERATE, STATUS_HEALTHY], dtype=object)
+
+
+def assign_health_statuses(scores):
+    scores = np.asarray(scores)
+    # 0 = Risky, 1 = Moderate, 2 = Healthy; a lookup avoids building strings per row
+    codes = (scores >= MODERATE_THRESHOLD).astype(np.int8) + (scores >= HEALTHY_THRESHOLD)
+    return _STATUS_LABELS[codes]
+
+
+def apply_health_scores(df):
+    """
+    Add Health_Score and Health_Status columns to df in place.
+    """
+    scores = calculate_health_scores(df)
+    df["Health_Score"] = scores
+    df["Health_Status"] = assign_health_statuses(scores)
+    return df
+
+
+# =========================
+# Trend Adjustment
+# =========================
+# Used when TREND_SCORING is on: points added to every row of an SME from
+# its rolling trend (database/trends.py), then clipped to [0, MAX_SCORE].
+TREND_LOSS_MONTH_PENALTY = 3   # per loss-making month in the window
+TREND_MAX_LOSS_PENALTY = 15
+# Latest month's revenue vs the average of the earlier months
+TREND_REVENUE_GROWTH = 0.1
+TREND_REVENUE_POINTS = 5
+# Change in average profit margin between the first and latest month
+TREND_MARGIN_CHANGE = 0.02
+TREND_MARGIN_POINTS = 5
+
+
+def trend_adjustment(features):
+    """
+    Score points for one SME's trend features; missing growth or margin
+    change (a single month of history) counts as flat.
+    """
+    points = -min(features["loss_months"] * TREND_LOSS_MONTH_PENALTY, TREND_MAX_LOSS_PENALTY)
+
+    growth = features.get("revenue_growth")
+    if growth is not None:
+        if growth > TREND_REVENUE_GROWTH:
+            points += TREND_REVENUE_POINTS
+        elif growth < -TREND_REVENUE_GROWTH:
+            points -= TREND_REVENUE_POINTS
+
+    change = features.get("margin_change")
+    if change is not None:
+        if change > TREND_MARGIN_CHANGE:
+            points += TREND_MARGIN_POINTS
+        elif change < -TREND_MARGIN_CHANGE:
+            points -= TREND_MARGIN_POINTS
+    return points
+
+
+def apply_trend_adjustments(df, adjustments):
+    """
+    Shift Health_Score by each row's trend points (an array aligned with
+    df, 0 for rows without a trend) and recompute Health_Status in place.
+    """
+    adjustments = np.asarray(adjustments, dtype=np.int64)
+    scores = np.clip(df["Health_Score"].to_numpy(dtype=np.int64) + adjustments, 0, MAX_SCORE)
+    df["Trend_Adjustment"] = adjustments
+    df["Health_Score"] = scores
+    df["Health_Status"] = assign_health_statuses(scores)
+    return df
@@ -1,36 +1,352 @@
-from google import genai
-import os
+"""
+Async Gemini client shared by the whole API.
+
+Calls go to the generateContent REST endpoint through one pooled
+httpx.AsyncClient. Every call has a deadline (LLM_TIMEOUT) covering the
+wait for one of LLM_MAX_CONCURRENCY slots, the request and its retries.
+A circuit breaker opens after LLM_BREAKER_FAILURES consecutive failures;
+while it is open calls raise LLMUnavailable at once, so callers fall
+back to rule-based insights instead of waiting on a degraded provider.
+
+The client runs on its own event loop thread. Async code awaits it from
+any loop, and threads (streamed uploads, jobs) use call_blocking(); both
+share the same pool, slots and breaker.
+"""
+import asyncio
+import json
+import logging
+import threading
+import time
+
+import httpx
+
+from llm.prompts import INSIGHT_PROMPT_TEMPLATE
+from llm.schemas import FINANCIAL_REPORT_SCHEMA
+from settings import (
+    GEMINI_API_KEY,
+    LLM_BASE_URL,
+    LLM_MODEL,
+    LLM_TIMEOUT,
+    LLM_CONNECT_TIMEOUT,
+    LLM_MAX_RETRIES,
+    LLM_MAX_CONCURRENCY,
+    LLM_MAX_CONNECTIONS,
+    LLM_BREAKER_FAILURES,
+    LLM_BREAKER_RESET,
+)
+
+logger = logging.getLogger(__name__)
+
+RETRY_STATUSES = {429, 500, 502, 503, 504}
+RETRY_BACKOFF = 0.25  # seconds, doubled per attempt
+
+
+class LLMError(Exception):
+    pass
+
+
+class LLMUnavailable(LLMError):
+    """
+    No call was made: the client is disabled or the circuit is open.
+    """
+
+
+class LLMTimeout(LLMError):
+    pass
+
+
+# =========================
+# Circuit Breaker
+# =========================
+class CircuitBreaker:
+    """
+    closed -> open after `failures` consecutive failures; open -> half_open
+    once `reset_after` seconds have passed, letting one trial call through;
+    its outcome closes or re-opens the circuit.
+    """
+
+    CLOSED, OPEN, HALF_OPEN = "closed", "open", "half_open"
+
+    def __init__(self, failures=LLM_BREAKER_FAILURES, reset_after=LLM_BREAKER_RESET, clock=time.monotonic):
+        self.failures = failures
+        self.reset_after = reset_after
+        self.clock = clock
+        self._consecutive = 0
+        self._opened_at = None
+        self._trial_running = False
+        self._lock = threading.Lock()
+        self.trips = 0
+
+    @property
+    def state(self):
+        with self._lock:
+            return self._state()
+
+    def _state(self):
+        if self._opened_at is None:
+            return self.CLOSED
+        if self.clock() - self._opened_at >= self.reset_after:
+            return self.HALF_OPEN
+        return self.OPEN
+
+    def allow(self):
+        with self._lock:
+            state = self._state()
+            if state == self.CLOSED:
+                return True
+            if state == self.HALF_OPEN and not self._trial_running:
+                self._trial_running = True
+                return True
+            return False
+
+    def record_success(self):
+        with self._lock:
+            self._consecutive = 0
+            self._opened_at = None
+            self._trial_running = False
+
+    def release_trial(self):
+        """
+        The trial call was cancelled by its caller; let the next one try.
+        """
+        with self._lock:
+            self._trial_running = False
+
+    def record_failure(self):
+        with self._lock:
+            self._consecutive += 1
+            if self._trial_running or (self._opened_at is None and self._consecutive >= self.failures):
+                if self._opened_at is None:
+                    self.trips += 1
+                self._opened_at = self.clock()
+            self._trial_running = False
 
+
+# =========================
+# Client
+# =========================
 class GeminiClient:
-    def __init__(self):
-        api_key = os.getenv("GEMINI_API_KEY")
-        if not api_key:
-            raise ValueError("GEMINI_API_KEY not found in environment")
+    def __init__(self, api_key=GEMINI_API_KEY, base_url=LLM_BASE_URL, model=LLM_MODEL,
+                 timeout=LLM_TIMEOUT, max_retries=LLM_MAX_RETRIES,
+                 max_concurrency=LLM_MAX_CONCURRENCY, max_connections=LLM_MAX_CONNECTIONS,
+                 breaker=None):
+        self.api_key = api_key
+        self.base_url = base_url.rstrip("/")
+        self.model = model
+        self.timeout = timeout
+        self.max_retries = max_retries
+        self.max_concurrency = max_concurrency
+        self.max_connections = max_connections
+        self.breaker = breaker or CircuitBreaker()
+        self.enabled = bool(api_key)
+
+        self._loop = None
+        self._thread = None
+        self._http = None
+        self._slots = None
+        self._start_lock = threading.Lock()
+        self.in_flight = 0
+        self.counters = {"calls": 0, "failures": 0, "timeouts": 0, "retries": 0, "rejected": 0}
+
+    # -------- event loop thread --------
+    def _ensure_started(self):
+        with self._start_lock:
+            if self._loop is not None:
+                return
+            loop = asyncio.new_event_loop()
+            ready = threading.Event()
+
+            def run():
+                asyncio.set_event_loop(loop)
+                self._http = httpx.AsyncClient(
+                    base_url=self.base_url,
+                    limits=httpx.Limits(max_connections=self.max_connections,
+                                        max_keepalive_connections=self.max_connections),
+                    timeout=httpx.Timeout(self.timeout, connect=LLM_CONNECT_TIMEOUT),
+                )
+                self._slots = asyncio.Semaphore(self.max_concurrency)
+                ready.set()
+                loop.run_forever()
 
-        self.client = genai.Client(api_key=api_key)
-        self.model = "gemini-1.5-flash"
+            self._thread = threading.Thread(target=run, name="llm-client", daemon=True)
+            self._thread.start()
+            ready.wait()
+            self._loop = loop
 
-    def generate_insights(self, summary: dict) -> str:
+    def submit(self, coro):
         """
-        Generate financial insights text from summary
+        Schedule a coroutine on the client's loop; returns a
+        concurrent.futures.Future.
         """
-        prompt = f"""
-You are a financial analyst.
+        self._ensure_started()
+        return asyncio.run_coroutine_threadsafe(coro, self._loop)
 
-Given this SME financial summary:
-{summary}
+    async def _on_client_loop(self, coro):
+        try:
+            running = asyncio.get_running_loop()
+        except RuntimeError:
+            running = None
+        if running is not None and running is self._loop:
+            return await coro
+        return await asyncio.wrap_future(self.submit(coro))
 
-Provide:
-1. Overall financial health
-2. Key risks
-3. Clear actionable recommendations
+    def call_blocking(self, coro, timeout=None):
+        """
+        Run a coroutine on the client's loop from a thread and wait for it.
+        """
+        return self.submit(coro).result(timeout)
 
-Keep it simple and business-friendly.
-"""
+    def close(self):
+        if self._loop is None:
+            return
+        self.submit(self._http.aclose()).result(5)
+        self._loop.call_soon_threadsafe(self._loop.stop)
+        self._thread.join(5)
+        self._loop = self._thread = self._http = None
+
+    # -------- requests --------
+    def _payload(self, prompt, schema, max_output_tokens=None):
+        payload = {"contents": [{"role": "user", "parts": [{"text": prompt}]}]}
+        config = {}
+        if schema is not None:
+            config["responseMimeType"] = "application/json"
+            config["responseSchema"] = schema
+        if max_output_tokens:
+            config["maxOutputTokens"] = max_output_tokens
+        if config:
+            payload["generationConfig"] = config
+        return payload
+
+    @staticmethod
+    def _text(response):
+        """
+        Output text of a generateContent response; LLMError for anything
+        that is not the expected JSON (an HTML error page behind a proxy,
+        a truncated body, ...).
+        """
+        try:
+            body = response.json()
+        except ValueError as exc:
+            raise LLMError("Response is not valid JSON") from exc
+        try:
+            parts = body["candidates"][0]["content"]["parts"]
+            return "".join(part.get("text", "") for part in parts)
+        except (KeyError, IndexError, TypeError, AttributeError) as exc:
+            raise LLMError("Response has no candidates") from exc
+
+    async def _post(self, payload):
+        attempt = 0
+        while True:
+            try:
+                response = await self._http.post(
+                    f"/v1beta/models/{self.model}:generateContent",
+                    headers={"x-goog-api-key": self.api_key},  # keeps the key out of logged URLs
+                    json=payload,
+                )
+                if response.status_code not in RETRY_STATUSES:
+                    response.raise_for_status()
+                    return self._text(response)
+                error = LLMError(f"Provider returned HTTP {response.status_code}")
+            except httpx.TimeoutException as exc:
+                error = exc
+            except httpx.TransportError as exc:
+                error = exc
+            except httpx.HTTPStatusError as exc:
+                raise LLMError(f"Provider returned HTTP {exc.response.status_code}") from exc
+
+            if attempt >= self.max_retries:
+                raise error
+            attempt += 1
+            self.counters["retries"] += 1
+            await asyncio.sleep(RETRY_BACKOFF * 2 ** (attempt - 1))
+
+    async def _generate(self, prompt, schema, timeout, max_output_tokens=None):
+        if not self.enabled:
+            raise LLMUnavailable("LLM client is disabled (no API key)")
+        if not self.breaker.allow():
+            self.counters["rejected"] += 1
+            raise LLMUnavailable("LLM circuit is open")
+
+        self.counters["calls"] += 1
+        sent = False
+        outcome = None  # "success" or "failure"; anything else releases a trial
+        try:
+            async with asyncio.timeout(timeout or self.timeout):
+                async with self._slots:
+                    sent = True
+                    self.in_flight += 1
+                    try:
+                        text = await self._post(self._payload(prompt, schema, max_output_tokens))
+                    finally:
+                        self.in_flight -= 1
+            outcome = "success"
+        except TimeoutError as exc:
+            self.counters["timeouts"] += 1
+            if sent:  # otherwise it expired waiting for a slot: our backlog
+                self.counters["failures"] += 1
+                outcome = "failure"
+            raise LLMTimeout(f"No LLM response within {timeout or self.timeout:.1f}s") from exc
+        except (LLMError, httpx.HTTPError) as exc:
+            self.counters["failures"] += 1
+            outcome = "failure"
+            if isinstance(exc, LLMError):
+                raise
+            raise LLMError(str(exc) or type(exc).__name__) from exc
+        finally:
+            # Always settle the breaker, so a half-open trial never stays taken
+            if outcome == "success":
+                self.breaker.record_success()
+            elif outcome == "failure":
+                self.breaker.record_failure()
+            else:
+                # cancelled by the caller, a slot wait that expired or an
+                # unexpected error: neither a success nor the provider's fault
+                self.breaker.release_trial()
+        return text
+
+    async def generate(self, prompt, schema=None, timeout=None, max_output_tokens=None):
+        """
+        Model output text for prompt (JSON text when a schema is given).
+        """
+        return await self._on_client_loop(self._generate(prompt, schema, timeout, max_output_tokens))
+
+    async def generate_insights(self, summary):
+        return await self.generate(INSIGHT_PROMPT_TEMPLATE.format(summary=summary))
+
+    async def generate_financial_report(self, prompt, schema=FINANCIAL_REPORT_SCHEMA, timeout=None,
+                                        max_output_tokens=None):
+        """
+        Structured report following schema, as a dict.
+        """
+        text = await self.generate(prompt, schema=schema, timeout=timeout,
+                                   max_output_tokens=max_output_tokens)
+        try:
+            return json.loads(text)
+        except ValueError as exc:
+            raise LLMError("Report is not valid JSON") from exc
+
+    def stats(self):
+        return {
+            "enabled": self.enabled,
+            "model": self.model,
+            "circuit": self.breaker.state,
+            "circuit_trips": self.breaker.trips,
+            "in_flight": self.in_flight,
+            "max_concurrency": self.max_concurrency,
+            **self.counters,
+        }
+
+
+_client = None
+_client_lock = threading.Lock()
 
-        response = self.client.models.generate_content(
-            model=self.model,
-            contents=prompt
-        )
 
-        return response.text
+def get_client():
+    """
+    The process-wide client, so every caller shares one pool and breaker.
+    """
+    global _client
+    with _client_lock:
+        if _client is None:
+            _client = GeminiClient()
+        return _client
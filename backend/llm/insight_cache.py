@@ -0,0 +1,224 @@
+import asyncio
+import hashlib
+import json
+import logging
+import threading
+import time
+from collections import OrderedDict
+from datetime import datetime, timedelta
+
+from sqlalchemy import delete
+
+from database.database import SessionLocal
+from database.models import InsightCacheEntry
+from settings import (
+    INSIGHT_CACHE_SIZE,
+    INSIGHT_CACHE_TTL,
+    INSIGHT_CACHE_DB_TTL,
+    INSIGHT_CACHE_BUCKETS,
+)
+
+logger = logging.getLogger(__name__)
+
+
+def parse_buckets(spec):
+    """
+    "avg_health_score=0.5,healthy=10" -> {"avg_health_score": 0.5, "healthy": 10}
+    """
+    buckets = {}
+    for part in filter(None, (p.strip() for p in spec.split(","))):
+        name, _, step = part.partition("=")
+        step = float(step)
+        buckets[name.strip()] = int(step) if step.is_integer() else step
+    return buckets
+
+
+def prompt_fingerprint(template):
+    return hashlib.sha256(template.encode("utf-8")).hexdigest()[:16]
+
+
+def canonical_summary(summary, buckets=None):
+    """
+    Summary with numeric fields snapped to their bucket and serialised with
+    sorted keys, so equal portfolios always produce the same string.
+    """
+    buckets = buckets or {}
+    canonical = {}
+    for name, value in summary.items():
+        if isinstance(value, (int, float)) and not isinstance(value, bool):
+            step = buckets.get(name)
+            if step:
+                value = round(value / step) * step
+            value = int(value) if float(value).is_integer() else round(float(value), 6)
+        canonical[name] = value
+    return json.dumps(canonical, sort_keys=True, separators=(",", ":"))
+
+
+# =========================
+# Two-Level Insight Cache
+# =========================
+class InsightCache:
+    """
+    L1: in-process LRU with a TTL. L2: the insight_cache table, shared by all
+    workers and kept across restarts. Keys combine the canonical summary with
+    the prompt template's fingerprint, so a new template never serves old
+    insights; invalidate() also purges them.
+    """
+
+    def __init__(self, prompt_template, size=INSIGHT_CACHE_SIZE, ttl=INSIGHT_CACHE_TTL,
+                 db_ttl=INSIGHT_CACHE_DB_TTL, buckets=None, session_factory=SessionLocal):
+        self.prompt_version = prompt_fingerprint(prompt_template)
+        self.size = size
+        self.ttl = ttl
+        self.db_ttl = db_ttl
+        self.buckets = parse_buckets(INSIGHT_CACHE_BUCKETS) if buckets is None else buckets
+        self.session_factory = session_factory
+
+        self._memory = OrderedDict()  # key -> (expires_at, insight)
+        self._lock = threading.Lock()
+        self.counters = {"memory_hits": 0, "db_hits": 0, "misses": 0, "stores": 0}
+
+    def key_for(self, summary):
+        canonical = canonical_summary(summary, self.buckets)
+        digest = hashlib.sha256(f"{self.prompt_version}:{canonical}".encode("utf-8")).hexdigest()
+        return digest, canonical
+
+    # -------- L1 --------
+    def _memory_get(self, key):
+        with self._lock:
+            entry = self._memory.get(key)
+            if entry is None:
+                return None
+            expires_at, insight = entry
+            if expires_at < time.monotonic():
+                del self._memory[key]
+                return None
+            self._memory.move_to_end(key)
+            return insight
+
+    def _memory_put(self, key, insight):
+        with self._lock:
+            self._memory[key] = (time.monotonic() + self.ttl, insight)
+            self._memory.move_to_end(key)
+            while len(self._memory) > self.size:
+                self._memory.popitem(last=False)
+
+    # -------- L2 --------
+    def _db_get(self, key):
+        db = self.session_factory()
+        try:
+            entry = db.get(InsightCacheEntry, key)
+            if entry is None:
+                return None
+            if entry.created_at < datetime.utcnow() - timedelta(seconds=self.db_ttl):
+                return None
+            return entry.insight
+        finally:
+            db.close()
+
+    def _db_put(self, key, canonical, insight):
+        db = self.session_factory()
+        try:
+            db.merge(InsightCacheEntry(
+                key=key,
+                prompt_version=self.prompt_version,
+                summary=canonical,
+                insight=insight,
+                created_at=datetime.utcnow(),
+            ))
+            db.commit()
+        finally:
+            db.close()
+
+    def _count(self, name):
+        with self._lock:
+            self.counters[name] += 1
+
+    # -------- public --------
+    def get(self, summary):
+        key, _ = self.key_for(summary)
+
+        insight = self._memory_get(key)
+        if insight is not None:
+            self._count("memory_hits")
+            return insight
+
+        try:
+            insight = self._db_get(key)
+        except Exception:
+            logger.exception("Insight cache lookup failed")
+            insight = None
+        if insight is not None:
+            self._count("db_hits")
+            self._memory_put(key, insight)
+            return insight
+
+        self._count("misses")
+        return None
+
+    def put(self, summary, insight):
+        key, canonical = self.key_for(summary)
+        self._memory_put(key, insight)
+        try:
+            self._db_put(key, canonical, insight)
+        except Exception:
+            logger.exception("Insight cache store failed")
+        self._count("stores")
+
+    def invalidate(self, everything=False):
+        """
+        Drop the in-process layer and delete persisted insights produced by
+        other prompt templates (or all of them with everything=True).
+        Returns the number of persisted rows removed.
+        """
+        with self._lock:
+            self._memory.clear()
+
+        stmt = delete(InsightCacheEntry)
+        if not everything:
+            stmt = stmt.where(InsightCacheEntry.prompt_version != self.prompt_version)
+        db = self.session_factory()
+        try:
+            removed = db.execute(stmt).rowcount
+            db.commit()
+        finally:
+            db.close()
+        return removed
+
+    def stats(self):
+        lookups = self.counters["memory_hits"] + self.counters["db_hits"] + self.counters["misses"]
+        hits = lookups - self.counters["misses"]
+        return {
+            **self.counters,
+            "hit_ratio": round(hits / lookups, 3) if lookups else None,
+            "memory_entries": len(self._memory),
+            "prompt_version": self.prompt_version,
+            "buckets": self.buckets,
+        }
+
+
+class CachedInsights:
+    """
+    Wraps an insight generator (anything with an async
+    generate_insights(summary)) with an InsightCache. Only real LLM output
+    is cached; empty results and errors are passed through so the caller
+    still falls back to rule-based insights. Cache lookups run in a thread.
+    """
+
+    def __init__(self, generator, cache, enabled=True):
+        self.generator = generator
+        self.cache = cache
+        self.enabled = enabled
+
+    async def generate_insights(self, summary):
+        if not self.enabled or not getattr(self.generator, "enabled", True):
+            return await self.generator.generate_insights(summary)
+
+        insight = await asyncio.to_thread(self.cache.get, summary)
+        if insight is not None:
+            return insight
+
+        insight = await self.generator.generate_insights(summary)
+        if insight:
+            await asyncio.to_thread(self.cache.put, summary, insight)
+        return insight
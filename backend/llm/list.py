@@ -1,14 +1,16 @@
 import os
-import google.genai as genai
+import httpx
 from dotenv import load_dotenv
 load_dotenv()
-client = genai.Client(
-    api_key=os.getenv("GEMINI_API_KEY")
-)
 
-models = client.models.list()
+base_url = os.getenv("LLM_BASE_URL", "https://generativelanguage.googleapis.com")
+response = httpx.get(
+    f"{base_url}/v1beta/models",
+    headers={"x-goog-api-key": os.getenv("GEMINI_API_KEY", "")},
+)
+response.raise_for_status()
 
-for m in models:
-    print("MODEL NAME:", m.name)
+for m in response.json().get("models", []):
+    print("MODEL NAME:", m["name"])
     print("RAW MODEL DATA:", m)
     print("-" * 60)
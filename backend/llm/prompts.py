@@ -1,3 +1,5 @@
+import json
+
 FINANCIAL_ANALYSIS_SYSTEM_PROMPT = """
 You are a World-Class SME Financial Consultant and Credit Underwriter.
 
@@ -30,3 +32,54 @@ Your tone must be:
 Do NOT hallucinate data.
 Base all conclusions on provided metrics and raw financial inputs.
 """
+
+INSIGHT_PROMPT_TEMPLATE = """
+You are an SME financial advisor.
+
+Portfolio Summary:
+{summary}
+
+Provide:
+1. Overall financial health
+2. Key risks
+3. Actionable recommendations
+"""
+
+
+def get_analysis_prompt(industry, raw_data, calculated_metrics, lang="en"):
+    """
+    FINANCIAL_ANALYSIS_SYSTEM_PROMPT followed by the business's inputs.
+    """
+    return f"""{FINANCIAL_ANALYSIS_SYSTEM_PROMPT}
+Industry: {industry}
+Respond in language: {lang}
+
+Calculated metrics:
+{calculated_metrics}
+
+Raw financial data:
+{raw_data}
+"""
+
+
+SEGMENT_ANALYSIS_TEMPLATE = """{system}
+Below are {count} segments of one SME portfolio, grouped by health status
+and industry. Write one report per segment, in language: {lang}.
+Each report must carry the segment_id it describes.
+
+Segments (JSON lines):
+{segments}
+"""
+
+
+def get_segment_analysis_prompt(segments, lang="en"):
+    """
+    One request covering several segment summaries (dicts with a
+    segment_id), one JSON line each.
+    """
+    return SEGMENT_ANALYSIS_TEMPLATE.format(
+        system=FINANCIAL_ANALYSIS_SYSTEM_PROMPT,
+        count=len(segments),
+        lang=lang,
+        segments="\n".join(json.dumps(segment, sort_keys=True) for segment in segments),
+    )
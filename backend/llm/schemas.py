@@ -27,3 +27,22 @@ FINANCIAL_REPORT_SCHEMA = {
         }
     }
 }
+
+# Several segment reports in one response, matched back by segment_id
+SEGMENT_REPORTS_SCHEMA = {
+    "type": "object",
+    "properties": {
+        "reports": {
+            "type": "array",
+            "items": {
+                "type": "object",
+                "properties": {
+                    "segment_id": {"type": "string"},
+                    **FINANCIAL_REPORT_SCHEMA["properties"]
+                },
+                "required": ["segment_id"]
+            }
+        }
+    },
+    "required": ["reports"]
+}
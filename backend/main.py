@@ -1,44 +1,67 @@
-from fastapi import FastAPI, UploadFile, File, Depends
+from fastapi import APIRouter, FastAPI, UploadFile, File, Depends, Request, HTTPException, Query
 from fastapi.middleware.cors import CORSMiddleware
-from sqlalchemy.orm import Session
-from datetime import datetime
-import pandas as pd
-import joblib
-import os
+from sqlalchemy.ext.asyncio import AsyncSession
+from fastapi.responses import StreamingResponse, JSONResponse, FileResponse, PlainTextResponse
+from starlette.background import BackgroundTask
+from contextlib import asynccontextmanager
+from datetime import datetime, date
+import asyncio
+import json
+import logging
+import time
+
+from api.analyze import router as analyze_router
+from database.database import SessionLocal, AsyncSessionLocal, engine, async_engine
+from database.models import Base
+from llm.fallback import fallback_ai_insights
+from llm.gemini_client import get_client, LLMUnavailable, LLMTimeout
+from llm.insight_cache import InsightCache, CachedInsights
+from llm.prompts import INSIGHT_PROMPT_TEMPLATE
+from database.migrations import upgrade
+from database.batches import create_batch_async, list_batches_async, get_batch_async
+from database.rollups import portfolio_stats_async
+from database.snapshots import write_snapshots_async, query_history_async, InvalidCursor
+from database.trends import list_trends_async, get_trend_async
+from services.model_registry import registry, ChecksumMismatch
+from services.assessment import ChunkedAssessment
+from services.executor import ExecutionLayer, Overloaded, assess_csv_bytes
+from services.warmup import Warmup
+from services.jobs import JobManager, job_status, SUCCEEDED
+from services.metrics import (
+    StageTimer, FALLBACK_INSIGHTS, LLM_ERRORS, LLM_IN_FLIGHT, LLM_CIRCUIT_OPEN, DB_POOL, ASSESSMENTS_IN_FLIGHT,
+    CONTENT_TYPE as METRICS_CONTENT_TYPE, render as render_metrics,
+)
+from services.pipeline import build_summary, to_ndjson
+from services.segment_analysis import analyze_segments
+from services.trends import adjust_for_trends, tag_sme
+from services.result_cache import ResultCache, hash_upload, result_key
+from services.serialization import (
+    UnsupportedFormat, negotiate_format, render_body, compress, encoded_response,
+    cache_payload, frame_from_payload,
+)
+from settings import (
+    OVERLOAD_RETRY_AFTER, INSIGHT_CACHE_ENABLED, RESULT_CACHE_ENABLED, WARMUP_ENABLED,
+    TREND_SCORING, TREND_WINDOW_MONTHS,
+)
 
-from database.database import SessionLocal, engine
-from database.models import Base, SMESnapshot
+logger = logging.getLogger(__name__)
 
-# =========================
-# Optional Gemini Import
-# =========================
-try:
-    from google import genai
-    GEMINI_AVAILABLE = True
-except:
-    GEMINI_AVAILABLE = False
-
-# =========================
-# FastAPI Setup
-# =========================
-app = FastAPI(title="SME Financial Health API")
-
-app.add_middleware(
-    CORSMiddleware,
-    allow_origins=["*"],
-    allow_credentials=True,
-    allow_methods=["*"],
-    allow_headers=["*"],
-)
+# Routes are collected here and mounted by create_app() at the bottom;
+# importing this module does no database or model work
+router = APIRouter()
 
 # =========================
 # Create Tables
 # =========================
-Base.metadata.create_all(bind=engine)
+def prepare_database():
+    Base.metadata.create_all(bind=engine)
+    upgrade(engine)
 
 # =========================
-# DB Dependency
+# DB Dependencies
 # =========================
+# Async routes use get_async_db so waiting on the database never blocks the
+# event loop or holds a threadpool slot; get_db stays for sync callers.
 def get_db():
     db = SessionLocal()
     try:
@@ -46,170 +69,516 @@ def get_db():
     finally:
         db.close()
 
+async def get_async_db():
+    async with AsyncSessionLocal() as db:
+        yield db
+
 # =========================
-# Load ML Artifacts
+# Execution Layer
 # =========================
-model = joblib.load("financial_health_model.pkl")
-feature_cols = joblib.load("feature_columns.pkl")
+# Model artifacts are loaded lazily through services.model_registry
+execution = ExecutionLayer()
+
+async def overloaded_handler(request: Request, exc: Overloaded):
+    return JSONResponse(
+        status_code=503,
+        content={"detail": "Server is busy with other assessments, please retry shortly."},
+        headers={"Retry-After": str(OVERLOAD_RETRY_AFTER)},
+    )
 
 # =========================
-# Gemini Client
+# LLM Client
 # =========================
-class GeminiClient:
-    def __init__(self):
-        api_key = os.getenv("GEMINI_API_KEY")
-        if not api_key or not GEMINI_AVAILABLE:
-            self.enabled = False
-            return
-        self.client = genai.Client(api_key=api_key)
-        self.model = "gemini-1.5-flash"
-        self.enabled = True
+# One client per process: pooled connections, per-call deadlines, a cap on
+# in-flight requests and a circuit breaker (see llm.gemini_client)
+llm = get_client()
+
+# Repeated portfolio summaries are answered from the insight cache
+insight_cache = InsightCache(INSIGHT_PROMPT_TEMPLATE)
+insights = CachedInsights(llm, insight_cache, enabled=INSIGHT_CACHE_ENABLED)
+
+async def generate_insight(summary: dict, endpoint: str) -> str:
+    """
+    LLM insight for a portfolio summary, or the rule-based fallback when
+    the LLM is disabled, its circuit is open, or it times out, fails or
+    returns nothing.
+    """
+    try:
+        insight = await insights.generate_insights(summary)
+        reason = "empty"
+    except LLMUnavailable:
+        insight, reason = None, "circuit_open" if llm.enabled else "disabled"
+    except Exception as exc:
+        logger.warning("Insight generation failed on %s: %s", endpoint, exc)
+        LLM_ERRORS.inc(endpoint=endpoint, error=type(exc).__name__)
+        insight, reason = None, "timeout" if isinstance(exc, LLMTimeout) else "error"
+
+    if insight:
+        return insight
+    FALLBACK_INSIGHTS.inc(endpoint=endpoint, reason=reason)
+    return fallback_ai_insights(summary)
+
+def generate_insight_blocking(summary: dict, endpoint: str) -> str:
+    """
+    generate_insight() for code running in threads (streamed uploads, jobs).
+    """
+    return llm.call_blocking(generate_insight(summary, endpoint))
 
-    def generate_insights(self, summary: dict) -> str:
-        if not self.enabled:
-            return None
+# =========================
+# Predict API
+# =========================
+# Re-uploads of the same file under the same model and scoring rules are
+# answered from the result cache without inference or an LLM call.
+# Trend-adjusted scores depend on stored history, so they are never cached.
+result_cache = ResultCache() if RESULT_CACHE_ENABLED and not TREND_SCORING else None
+
+@router.post("/predict")
+async def predict(
+    request: Request,
+    file: UploadFile = File(...),
+    reinsert: bool = False,
+    fmt: str = Query(None, alias="format"),
+    sme_id: str = None,
+    db: AsyncSession = Depends(get_async_db),
+):
+    """
+    Score an uploaded CSV.
+
+    Rows are added to their SME's trend when the upload has an SME id
+    column, or sme_id names the one business it covers. With
+    TREND_SCORING on, health scores include each SME's trend points.
+
+    format: json (rows as objects, default), columnar, arrow (Arrow IPC,
+    also chosen by Accept: application/vnd.apache.arrow.stream) or summary
+    (no row data). Bodies are gzip/brotli compressed per Accept-Encoding.
+
+    A cached result (X-Result-Cache: hit) is not written to the history
+    again unless reinsert=true. Server-Timing breaks the request down by stage.
+    """
+    try:
+        fmt = negotiate_format(fmt, request.headers.get("accept"))
+    except UnsupportedFormat as exc:
+        raise HTTPException(status_code=406, detail=str(exc))
+
+    timer = StageTimer("predict")
+    with execution.admit():
+        with timer.stage("upload"):
+            # hashed from the spooled file; the bytes are read only on a miss
+            content_hash = await execution.run_io(hash_upload, file.file)
+        with timer.stage("model"):
+            version = (await execution.run_io(registry.get)).version
+        key = result_key(content_hash, version)
+
+        if result_cache is not None:
+            with timer.stage("cache_lookup"):
+                cached = await execution.run_io(result_cache.get, key)
+            if cached is not None:
+                df = tag_sme(frame_from_payload(cached), sme_id)
+                if reinsert:
+                    with timer.stage("persist"):
+                        await persist_assessment(db, df, cached["summary"], cached["ai_insights"],
+                                                 version, file.filename, content_hash, timer)
+                return await render_assessment(request, fmt, cached["summary"], cached["ai_insights"],
+                                               df, timer, {"X-Result-Cache": "hit"})
+
+        # parse/features/inference/scoring are timed inside the CPU worker;
+        # "dispatch" is the rest (queueing and moving data between processes)
+        with timer.stage("upload"):
+            content = await file.read()
+        start = time.perf_counter()
+        df, timings = await execution.run_cpu(assess_csv_bytes, content, version)
+        timer.update(timings)
+        timer.add("dispatch", time.perf_counter() - start - sum(timings.values()))
+        tag_sme(df, sme_id)
+        if TREND_SCORING:
+            with timer.stage("trends"):
+                await db.run_sync(adjust_for_trends, df)
+        summary = build_summary(df)
+
+        with timer.stage("llm"):
+            ai_insights = await generate_insight(summary, "predict")
+
+        with timer.stage("persist"):
+            await persist_assessment(db, df, summary, ai_insights, version, file.filename,
+                                     content_hash, timer)
+
+        headers = {}
+        if result_cache is not None:
+            headers["X-Result-Cache"] = "miss"
+            with timer.stage("cache_store"):
+                await execution.run_io(result_cache.put, key, cache_payload(summary, ai_insights, df))
+
+        return await render_assessment(request, fmt, summary, ai_insights, df, timer, headers)
+
+async def render_assessment(request, fmt, summary, insight, df, timer, headers):
+    with timer.stage("render"):
+        body, media_type = await execution.run_io(render_body, summary, insight, df, fmt)
+    with timer.stage("compress"):
+        body, encoding = await execution.run_io(compress, body, request.headers.get("accept-encoding"))
+    timer.finish(len(df))
+    headers["Server-Timing"] = timer.server_timing()
+    return encoded_response(body, media_type, encoding, headers)
+
+async def persist_assessment(db, df, summary, insight, version, filename, content_hash, timer):
+    """
+    One assessment batch (summary, insight, timings so far) plus its
+    snapshot rows, in a single transaction unless SNAPSHOT_COMMIT_EVERY
+    splits the rows (see write_snapshots).
+    """
+    batch = await create_batch_async(
+        db, "predict", model_version=version, filename=filename, content_hash=content_hash,
+        summary=summary, insight=insight, timings=dict(timer.stages), row_count=len(df),
+    )
+    await write_snapshots_async(db, df, batch.id)
+    await db.commit()
+
+@router.get("/predict/cache")
+def result_cache_stats():
+    if result_cache is None:
+        return {"enabled": False}
+    return {"enabled": True, **result_cache.stats()}
+
+@router.post("/predict/cache/clear")
+def result_cache_clear():
+    if result_cache is None:
+        return {"removed": 0}
+    return {"removed": result_cache.clear()}
 
-        prompt = f"""
-You are an SME financial advisor.
+# =========================
+# Streaming Predict API
+# =========================
+@router.post("/predict/stream")
+def predict_stream(file: UploadFile = File(...)):
+    """
+    Chunked variant of /predict for large portfolios. The CSV is read
+    STREAM_CHUNK_ROWS rows at a time and every scored row is streamed back
+    as one NDJSON line; the last line carries the portfolio summary and
+    insight. Peak memory is bounded by the chunk size, not the upload size.
+    """
+    def generate():
+        with execution.admit():
+            yield ""  # admitted; see the priming next() below
+            yield from assess_stream(file, registry.get().version)
+
+    stream = generate()
+    next(stream)  # raises Overloaded here, before any response bytes are sent
+    # The background task also runs when the client disconnects mid-stream;
+    # closing the generator there deletes the unfinished batch right away
+    return StreamingResponse(stream, media_type="application/x-ndjson", background=BackgroundTask(stream.close))
+
+def assess_stream(file, version):
+    """
+    Chunks are committed as they are streamed; the batch is finalized
+    after the last one, or deleted if the stream fails or the client goes
+    away first.
+    """
+    db = SessionLocal()
+    timer = StageTimer("predict_stream")
+    assessment = None
+    try:
+        assessment = ChunkedAssessment(execution, db, version, "predict_stream", filename=file.filename)
+        with timer.stage("chunks"):
+            for chunk in assessment.chunks(file.file):
+                yield to_ndjson(chunk)
+
+        summary = assessment.summary()
+        with timer.stage("llm"):
+            ai_insights = generate_insight_blocking(summary, "predict_stream")
+        with timer.stage("persist"):
+            assessment.finish(ai_insights, dict(timer.stages))
+        timer.finish(assessment.totals.rows)
+
+        yield json.dumps({
+            "summary": summary,
+            "ai_insights": ai_insights,
+            "rows": assessment.totals.rows,
+            "batch_id": assessment.batch_id,
+        }) + "\n"
+    finally:
+        if assessment is not None and not assessment.finished:
+            try:
+                assessment.abort()
+            except Exception:
+                logger.exception("Could not delete partial batch %s", assessment.batch_id)
+        db.close()
 
-Portfolio Summary:
-{summary}
+# =========================
+# Batch Jobs API
+# =========================
+def generate_job_insight(summary):
+    return generate_insight_blocking(summary, "jobs")
+
+jobs = JobManager(execution, generate_job_insight)
+
+@router.post("/jobs", status_code=202)
+async def create_job(file: UploadFile = File(...)):
+    """
+    Queue a portfolio for background assessment and return immediately.
+    Poll GET /jobs/{job_id} for progress.
+    """
+    job = await execution.run_io(jobs.submit, file.file, file.filename)
+    return {
+        "job_id": job.id,
+        "status": job.status,
+        "status_url": f"/jobs/{job.id}",
+    }
 
-Provide:
-1. Overall financial health
-2. Key risks
-3. Actionable recommendations
-"""
-        response = self.client.models.generate_content(
-            model=self.model,
-            contents=prompt
-        )
-        return response.text
-
-gemini = GeminiClient()
-
-# =========================
-# Health Logic
-# =========================
-def calculate_health_score(row):
-    score = 0
-    pm = row.get("Profit_Margin", 0)
-    cr = row.get("Cost_Ratio", 1)
-
-    score += 35 if pm > 0.2 else 25 if pm > 0.1 else 15
-    score += 35 if cr < 0.6 else 25 if cr < 0.8 else 15
-    score += 30
-
-    return min(score, 100)
-
-def assign_health_status(score):
-    if score >= 85:
-        return "Healthy"
-    elif score >= 60:
-        return "Moderate"
-    return "Risky"
-
-# =========================
-# Fallback Recommendations
-# =========================
-def fallback_ai_insights(summary: dict) -> str:
-    score = summary.get("avg_health_score", 0)
-
-    if score >= 85:
-        status = "STRONG"
-        actions = [
-            "Maintain cost discipline",
-            "Reinvest profits into growth",
-            "Expand cautiously",
-            "Monitor margins regularly"
-        ]
-    elif score >= 60:
-        status = "MODERATE"
-        actions = [
-            "Reduce operating expenses",
-            "Improve receivable collections",
-            "Renegotiate vendor contracts",
-            "Increase profit margins"
-        ]
-    else:
-        status = "AT RISK"
-        actions = [
-            "Immediate cost reduction",
-            "Improve liquidity",
-            "Restructure debts",
-            "Avoid high-risk spending"
-        ]
-
-    return f"""
-FINANCIAL HEALTH REPORT
-----------------------
-Overall Status : {status}
-Average Score  : {score}
-
-RECOMMENDATIONS
----------------
-• {actions[0]}
-• {actions[1]}
-• {actions[2]}
-• {actions[3]}
-"""
+@router.get("/jobs/{job_id}")
+def get_job(job_id: str):
+    job = jobs.get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Job not found")
+    return job_status(job, jobs.progress(job_id))
+
+@router.get("/jobs/{job_id}/result")
+def get_job_result(job_id: str):
+    job = jobs.get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Job not found")
+    if job.status != SUCCEEDED:
+        raise HTTPException(status_code=409, detail=f"Job is {job.status}")
+    return FileResponse(job.result_path, media_type="application/x-ndjson",
+                        filename=f"{job_id}.ndjson")
 
 # =========================
-# Predict API
+# Metrics API
 # =========================
-@app.post("/predict")
-async def predict(file: UploadFile = File(...), db: Session = Depends(get_db)):
-    df = pd.read_csv(file.file)
-    df.columns = df.columns.str.strip()
+for name, pool in (("sync", engine.pool), ("async", async_engine.sync_engine.pool)):
+    DB_POOL.set_function(pool.checkedout, engine=name, state="checked_out")
+    if hasattr(pool, "size"):
+        DB_POOL.set_function(pool.checkedin, engine=name, state="idle")
+        DB_POOL.set_function(pool.size, engine=name, state="size")
+ASSESSMENTS_IN_FLIGHT.set_function(lambda: execution.in_flight)
+LLM_IN_FLIGHT.set_function(lambda: llm.in_flight)
+LLM_CIRCUIT_OPEN.set_function(lambda: int(llm.breaker.state != llm.breaker.CLOSED))
+
+@router.get("/metrics", response_class=PlainTextResponse)
+def metrics():
+    return PlainTextResponse(render_metrics(), media_type=METRICS_CONTENT_TYPE)
 
-    # Feature engineering (safe)
-    if "Cost_Ratio" not in df.columns and {"COGS", "Revenue"}.issubset(df.columns):
-        df["Cost_Ratio"] = df["COGS"] / df["Revenue"].replace(0, 1)
+# =========================
+# Model API
+# =========================
+@router.get("/model")
+def model_info():
+    return registry.get().info()
+
+@router.post("/model/reload")
+async def model_reload(version: str = None):
+    """
+    Load a model version (default: the registry's ACTIVE pointer) and swap it
+    in without dropping in-flight requests.
+    """
+    try:
+        loaded = await execution.run_io(registry.reload, version)
+    except FileNotFoundError as exc:
+        raise HTTPException(status_code=404, detail=str(exc))
+    except ChecksumMismatch as exc:
+        raise HTTPException(status_code=409, detail=str(exc))
+    return loaded.info()
 
-    if "Profit_Margin" not in df.columns and {"NetProfit", "Revenue"}.issubset(df.columns):
-        df["Profit_Margin"] = df["NetProfit"] / df["Revenue"].replace(0, 1)
+# =========================
+# LLM API
+# =========================
+@router.get("/llm")
+def llm_stats():
+    return llm.stats()
 
-    X = df[feature_cols].fillna(0)
-    probs = model.predict_proba(X).max(axis=1)
+# =========================
+# Analyze API
+# =========================
+@router.post("/analyze/segments")
+async def analyze_portfolio_segments(file: UploadFile = File(...), lang: str = "en"):
+    """
+    Score an uploaded CSV and return one structured report per segment
+    (health status x industry). Segments are packed several to an LLM
+    request within SEGMENT_TOKEN_BUDGET; "requests" is how many were made
+    and "fallbacks" how many segments got the rule-based report.
+    """
+    timer = StageTimer("analyze_segments")
+    with execution.admit():
+        with timer.stage("upload"):
+            raw = await file.read()
+        with timer.stage("model"):
+            version = (await execution.run_io(registry.get)).version
+
+        start = time.perf_counter()
+        df, timings = await execution.run_cpu(assess_csv_bytes, raw, version)
+        timer.update(timings)
+        timer.add("dispatch", time.perf_counter() - start - sum(timings.values()))
+
+        with timer.stage("llm"):
+            analysis = await analyze_segments(df, llm, lang=lang)
+
+    timer.finish(len(df))
+    return JSONResponse(
+        {"summary": build_summary(df), **analysis},
+        headers={"Server-Timing": timer.server_timing()},
+    )
 
-    df["Health_Score"] = df.apply(calculate_health_score, axis=1)
-    df["Health_Status"] = df["Health_Score"].apply(assign_health_status)
-    df["Confidence"] = probs.round(2)
+# =========================
+# Insight Cache API
+# =========================
+@router.get("/insights/cache")
+def insight_cache_stats():
+    return insight_cache.stats()
+
+@router.post("/insights/cache/invalidate")
+def insight_cache_invalidate(everything: bool = False):
+    """
+    Call after changing INSIGHT_PROMPT_TEMPLATE (or with everything=true to
+    start from an empty cache).
+    """
+    return {"removed": insight_cache.invalidate(everything=everything)}
 
-    summary = {
-        "avg_health_score": round(df["Health_Score"].mean(), 1),
-        "healthy": int((df["Health_Status"] == "Healthy").sum()),
-        "moderate": int((df["Health_Status"] == "Moderate").sum()),
-        "risky": int((df["Health_Status"] == "Risky").sum()),
-    }
+# =========================
+# Portfolio Stats API
+# =========================
+@router.get("/portfolio/stats")
+async def get_portfolio_stats(
+    start: date = None,
+    end: date = None,
+    by_day: bool = False,
+    db: AsyncSession = Depends(get_async_db),
+):
+    """
+    Portfolio-wide counts, score and ratio averages per health status,
+    served from the per-day rollups rather than the snapshot table.
+    """
+    return await portfolio_stats_async(db, start=start, end=end, by_day=by_day)
 
-    ai_insights = gemini.generate_insights(summary) or fallback_ai_insights(summary)
+# =========================
+# Batches API
+# =========================
+@router.get("/batches")
+async def batches(
+    limit: int = Query(50, ge=1, le=500),
+    before: int = None,
+    source: str = None,
+    db: AsyncSession = Depends(get_async_db),
+):
+    """
+    Newest uploads first with their summaries (no insight text). Pass the
+    returned next_before to fetch the next page; source filters by predict,
+    predict_stream, jobs or backfill.
+    """
+    items, next_before = await list_batches_async(db, limit=limit, before=before, source=source)
+    return {"items": items, "next_before": next_before}
+
+@router.get("/batches/{batch_id}")
+async def batch_detail(batch_id: int, db: AsyncSession = Depends(get_async_db)):
+    batch = await get_batch_async(db, batch_id)
+    if batch is None:
+        raise HTTPException(status_code=404, detail="Batch not found")
+    return batch
 
-    for _, row in df.iterrows():
-        db.add(SMESnapshot(
-            transaction_id=row.get("TransactionID"),
-            revenue=row.get("Revenue"),
-            profit_margin=row.get("Profit_Margin"),
-            cost_ratio=row.get("Cost_Ratio"),
-            health_score=row["Health_Score"],
-            health_status=row["Health_Status"],
-            confidence=row["Confidence"],
-            insight=ai_insights
-        ))
+# =========================
+# Trends API
+# =========================
+@router.get("/trends")
+async def trends(
+    limit: int = Query(50, ge=1, le=500),
+    after: str = None,
+    window: int = Query(TREND_WINDOW_MONTHS, ge=1, le=120),
+    db: AsyncSession = Depends(get_async_db),
+):
+    """
+    Rolling trend features per SME over the last `window` months, served
+    from the per-month aggregates. Pass the returned next_after to fetch
+    the next page.
+    """
+    items, next_after = await list_trends_async(db, limit=limit, after=after, window=window)
+    return {"items": items, "next_after": next_after}
+
+@router.get("/trends/{sme_id}")
+async def trend_detail(
+    sme_id: str,
+    window: int = Query(TREND_WINDOW_MONTHS, ge=1, le=120),
+    db: AsyncSession = Depends(get_async_db),
+):
+    trend = await get_trend_async(db, sme_id, window=window)
+    if trend is None:
+        raise HTTPException(status_code=404, detail="No uploads for this SME")
+    return trend
+
+# =========================
+# History API
+# =========================
+@router.get("/history")
+async def history(
+    limit: int = Query(50, ge=1, le=500),
+    cursor: str = None,
+    status: str = None,
+    min_score: int = None,
+    max_score: int = None,
+    start: datetime = None,
+    end: datetime = None,
+    db: AsyncSession = Depends(get_async_db),
+):
+    """
+    Newest snapshots first. Pass the returned next_cursor to fetch the next
+    page; filters: status, min_score/max_score, start/end (created_at, UTC).
+    """
+    try:
+        items, next_cursor = await query_history_async(
+            db, limit=limit, cursor=cursor, status=status,
+            min_score=min_score, max_score=max_score, start=start, end=end,
+        )
+    except InvalidCursor as exc:
+        raise HTTPException(status_code=400, detail=str(exc))
+    return {"items": items, "next_cursor": next_cursor}
 
-    db.commit()
+# =========================
+# Health API
+# =========================
+# Live as soon as the process serves requests; ready once the warm-up has
+# loaded the model and started the CPU pool. Point the platform's health
+# check at /health/ready so traffic waits for a warm instance.
+warmup = Warmup(execution, enabled=WARMUP_ENABLED)
 
-    return {
-        "summary": summary,
-        "ai_insights": ai_insights,
-        "data": df.to_dict(orient="records")
-    }
+@router.get("/health/live")
+def health_live():
+    return {"status": "alive"}
+
+@router.get("/health/ready")
+def health_ready():
+    status = warmup.status()
+    return JSONResponse(status, status_code=200 if warmup.ready else 503)
 
 # =========================
-# History API
+# App Factory
 # =========================
-@app.get("/history")
-def history(db: Session = Depends(get_db)):
-    return db.query(SMESnapshot)\
-        .order_by(SMESnapshot.created_at.desc())\
-        .limit(50).all()
+@asynccontextmanager
+async def lifespan(app):
+    await asyncio.to_thread(prepare_database)
+    jobs.recover()
+    warmup.start()
+    yield
+    await warmup.stop()
+    jobs.shutdown()
+    execution.shutdown()
+    llm.close()
+    await async_engine.dispose()
+
+def create_app():
+    """
+    Build the API. Database setup and the warm-up run at startup, not at
+    import (uvicorn main:create_app --factory, or main:app).
+    """
+    app = FastAPI(title="SME Financial Health API", lifespan=lifespan)
+    app.add_middleware(
+        CORSMiddleware,
+        allow_origins=["*"],
+        allow_credentials=True,
+        allow_methods=["*"],
+        allow_headers=["*"],
+        # let the dashboard read the per-request stage breakdown
+        expose_headers=["Server-Timing", "X-Result-Cache"],
+    )
+    app.add_exception_handler(Overloaded, overloaded_handler)
+    app.include_router(router)
+    # POST /analyze: one structured report for one business
+    app.include_router(analyze_router)
+    return app
+
+app = create_app()
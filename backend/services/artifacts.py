@@ -0,0 +1,32 @@
+from forest_engine import CompiledForest, RoutedForest
+from settings import INFERENCE_ENGINE, COMPILED_MAX_ROWS
+
+
+def load_model(model_path, compiled_path, engine=INFERENCE_ENGINE, mmap_mode=None):
+    """
+    Build the configured inference engine from artifact files. Only the
+    files the engine needs are read.
+    """
+    import joblib  # brings in sklearn when the pickles are read
+
+    if engine == "sklearn":
+        return joblib.load(model_path, mmap_mode=mmap_mode)
+    if engine == "compiled":
+        return CompiledForest(joblib.load(compiled_path, mmap_mode=mmap_mode))
+    if engine == "auto":
+        compiled = CompiledForest(joblib.load(compiled_path, mmap_mode=mmap_mode))
+        return RoutedForest(compiled, joblib.load(model_path, mmap_mode=mmap_mode), COMPILED_MAX_ROWS)
+    raise ValueError(
+        f"Unknown INFERENCE_ENGINE: {engine!r} (expected 'sklearn', 'compiled' or 'auto')"
+    )
+
+
+def engine_files(engine=INFERENCE_ENGINE):
+    """
+    Artifact roles an engine reads, besides the feature column list.
+    """
+    return {
+        "sklearn": ["model"],
+        "compiled": ["compiled"],
+        "auto": ["model", "compiled"],
+    }[engine]
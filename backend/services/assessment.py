@@ -0,0 +1,72 @@
+from datetime import datetime
+
+from database.batches import create_batch, delete_batch, finish_batch
+from database.rollups import add_rollup_rows, aggregate_frame, merge_rollup_rows
+from database.snapshots import insert_snapshots
+from database.trends import add_periods, aggregate_periods, merge_periods
+from services.executor import assess_chunk
+from services.pipeline import PortfolioSummary, iter_csv_chunks
+from settings import SNAPSHOT_COMMIT_EVERY, STREAM_CHUNK_ROWS
+
+
+class ChunkedAssessment:
+    """
+    Scores and persists an upload chunk by chunk, keeping only running
+    totals. Used by /predict/stream and by background jobs.
+
+    The batch row is committed up front with complete=False and every
+    chunk's snapshots are committed as soon as they are written (and every
+    SNAPSHOT_COMMIT_EVERY batches within a chunk), so no write transaction
+    outlives a chunk. Rollup and trend deltas are
+    summed in memory (one row per day x status and per SME x month) and
+    applied by finish() together with the summary, insight and
+    complete=True in one short transaction. abort(), or
+    database.batches.delete_batch() after a crash, removes an unfinished
+    batch without touching the aggregates.
+    """
+
+    def __init__(self, execution, db, version, source, filename=None, chunk_rows=STREAM_CHUNK_ROWS):
+        self.execution = execution
+        self.db = db
+        self.version = version
+        self.chunk_rows = chunk_rows
+        self.totals = PortfolioSummary()
+        self.rollups = {}
+        self.periods = {}
+        self.finished = False
+        self.batch_id = create_batch(db, source, model_version=version, filename=filename,
+                                     complete=False).id
+        db.commit()
+
+    def chunks(self, source):
+        for chunk in iter_csv_chunks(source, self.chunk_rows):
+            if chunk.empty:
+                continue
+            chunk = self.execution.call_cpu(assess_chunk, chunk, self.version)
+            self.totals.update(chunk)
+
+            created_at = datetime.utcnow()
+            insert_snapshots(self.db, chunk, self.batch_id, created_at=created_at,
+                             commit_every=SNAPSHOT_COMMIT_EVERY)
+            self.db.commit()
+            merge_rollup_rows(self.rollups, aggregate_frame(chunk, created_at.date()))
+            merge_periods(self.periods, aggregate_periods(chunk))
+            yield chunk
+
+    def summary(self):
+        return self.totals.as_dict()
+
+    def finish(self, insight, timings=None):
+        add_rollup_rows(self.db, list(self.rollups.values()))
+        add_periods(self.db, list(self.periods.values()))
+        finish_batch(self.db, self.batch_id, self.summary(), insight, self.totals.rows, timings)
+        self.db.commit()
+        self.finished = True
+
+    def abort(self):
+        """
+        Delete the batch and the snapshots committed for it so far.
+        """
+        self.db.rollback()
+        delete_batch(self.db, self.batch_id)
+        self.db.commit()
@@ -0,0 +1,145 @@
+import asyncio
+import io
+import logging
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from contextlib import contextmanager
+from functools import partial
+
+from services.model_registry import registry
+from services.pipeline import assess_frame
+from settings import (
+    EXECUTION_MODE,
+    CPU_WORKERS,
+    IO_WORKERS,
+    MAX_CONCURRENT_ASSESSMENTS,
+)
+
+logger = logging.getLogger(__name__)
+
+
+class Overloaded(Exception):
+    """
+    Raised when MAX_CONCURRENT_ASSESSMENTS assessments are already running.
+    """
+
+
+# =========================
+# Worker Side
+# =========================
+# Jobs carry the model version they were admitted under. Each worker keeps
+# that version loaded in its own registry (memory-mapped, so workers share
+# the array pages) and switches when a job names a newer one after a hot
+# reload.
+def init_worker():
+    registry.get()
+
+
+def assess_csv_bytes(raw, version):
+    """
+    Parse and score a whole upload. Returns (df, timings), the seconds
+    spent in each stage inside the worker.
+    """
+    import pandas as pd
+
+    loaded = registry.get(version)
+    start = time.perf_counter()
+    df = pd.read_csv(io.BytesIO(raw))
+    timings = {"parse": time.perf_counter() - start}
+    return assess_frame(df, loaded.model, loaded.feature_cols, timings), timings
+
+
+def assess_chunk(df, version):
+    loaded = registry.get(version)
+    return assess_frame(df, loaded.model, loaded.feature_cols)
+
+
+# =========================
+# Execution Layer
+# =========================
+class ExecutionLayer:
+    """
+    Routes CPU-bound work (parsing, inference, scoring) to a process pool and
+    blocking I/O (LLM calls, database commits) to a thread pool, and caps the
+    number of assessments in flight.
+    """
+
+    def __init__(self, mode=EXECUTION_MODE, cpu_workers=CPU_WORKERS,
+                 io_workers=IO_WORKERS, max_in_flight=MAX_CONCURRENT_ASSESSMENTS):
+        self.mode = mode
+        self.cpu_workers = cpu_workers
+        self.io_workers = io_workers
+        self.max_in_flight = max_in_flight
+
+        self._in_flight = 0
+        self._lock = threading.Lock()
+        self._cpu = None
+        self._io = None
+
+    # -------- pools --------
+    def _cpu_pool(self):
+        if self._cpu is None and self.mode != "inline":
+            with self._lock:
+                if self._cpu is None:
+                    if self.mode == "process":
+                        self._cpu = ProcessPoolExecutor(self.cpu_workers, initializer=init_worker)
+                    else:
+                        self._cpu = ThreadPoolExecutor(self.cpu_workers, thread_name_prefix="cpu")
+                    logger.info("Started %s CPU pool with %d workers", self.mode, self.cpu_workers)
+        return self._cpu
+
+    def _io_pool(self):
+        if self._io is None:
+            with self._lock:
+                if self._io is None:
+                    self._io = ThreadPoolExecutor(self.io_workers, thread_name_prefix="io")
+        return self._io
+
+    def shutdown(self):
+        for pool in (self._cpu, self._io):
+            if pool is not None:
+                pool.shutdown(wait=True)
+        self._cpu = self._io = None
+
+    # -------- backpressure --------
+    @property
+    def in_flight(self):
+        return self._in_flight
+
+    @contextmanager
+    def admit(self):
+        """
+        Reserve an assessment slot for the duration of the block, or raise
+        Overloaded straight away if none is free.
+        """
+        with self._lock:
+            if self._in_flight >= self.max_in_flight:
+                raise Overloaded(f"{self._in_flight} assessments already in flight")
+            self._in_flight += 1
+        try:
+            yield
+        finally:
+            with self._lock:
+                self._in_flight -= 1
+
+    # -------- submission --------
+    async def run_cpu(self, fn, *args):
+        pool = self._cpu_pool()
+        if pool is None:
+            return fn(*args)
+        return await asyncio.wrap_future(pool.submit(fn, *args))
+
+    def call_cpu(self, fn, *args):
+        """
+        Blocking variant of run_cpu for code already running off the event
+        loop (e.g. streaming generators).
+        """
+        pool = self._cpu_pool()
+        if pool is None:
+            return fn(*args)
+        return pool.submit(fn, *args).result()
+
+    async def run_io(self, fn, *args, **kwargs):
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self._io_pool(), partial(fn, *args, **kwargs))
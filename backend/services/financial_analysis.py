@@ -1,20 +1,30 @@
-from ..llm.gemini_client import GeminiClient 
-from ..llm.schemas import FINANCIAL_REPORT_SCHEMA
-from ..llm.prompts import FINANCIAL_ANALYSIS_SYSTEM_PROMPT
+import logging
+
+from llm.fallback import fallback_financial_report
+from llm.gemini_client import get_client, LLMError
+from llm.schemas import FINANCIAL_REPORT_SCHEMA
+from llm.prompts import get_analysis_prompt
+
+logger = logging.getLogger(__name__)
 
-async def run_llm_analysis(industry, raw_data, metrics, language):
-    client = GeminiClient()
 
-    prompt = FINANCIAL_ANALYSIS_SYSTEM_PROMPT(
+async def run_llm_analysis(industry, raw_data, metrics, language):
+    """
+    Structured financial report from the shared LLM client, or a rule-based
+    stand-in (marked "fallback": true) when the LLM is unavailable or fails.
+    """
+    prompt = get_analysis_prompt(
         industry=industry,
         raw_data=raw_data,
         calculated_metrics=metrics,
         lang=language
     )
 
-    response = await client.generate_financial_report(
-        prompt=prompt,
-        schema=FINANCIAL_REPORT_SCHEMA
-    )
-
-    return response
+    try:
+        return await get_client().generate_financial_report(
+            prompt=prompt,
+            schema=FINANCIAL_REPORT_SCHEMA
+        )
+    except LLMError as exc:
+        logger.warning("Financial analysis fell back to rules: %s", exc)
+        return fallback_financial_report(metrics)
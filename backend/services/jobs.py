@@ -0,0 +1,226 @@
+import json
+import logging
+import os
+import shutil
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+
+from database.batches import delete_batch
+from database.database import SessionLocal
+from database.models import AssessmentJob
+from services.assessment import ChunkedAssessment
+from services.model_registry import registry
+from services.pipeline import to_ndjson
+from settings import JOBS_DIR, JOB_WORKERS
+
+logger = logging.getLogger(__name__)
+
+QUEUED = "queued"
+RUNNING = "running"
+SUCCEEDED = "succeeded"
+FAILED = "failed"
+
+
+class JobManager:
+    """
+    Runs uploaded portfolios in the background. Job state lives in the
+    assessment_jobs table, so a restart re-queues whatever was queued or
+    interrupted; uploads and results are plain files under JOBS_DIR.
+
+    A run commits its snapshots chunk by chunk into an assessment batch
+    that stays incomplete until the end (see ChunkedAssessment), so other
+    writers are never blocked for longer than one chunk. The job records
+    that batch's id; a run that fails or is interrupted has its partial
+    batch deleted before the job finishes or is re-queued. Live progress
+    is kept in memory rather than written per chunk.
+
+    generate_insight(summary) must always return text (LLM or fallback).
+    """
+
+    def __init__(self, execution, generate_insight, workers=JOB_WORKERS, root=JOBS_DIR):
+        self.execution = execution
+        self.generate_insight = generate_insight
+        self.workers = workers
+        self.upload_dir = os.path.join(root, "uploads")
+        self.result_dir = os.path.join(root, "results")
+        self._pool = None
+        self._progress = {}  # job_id -> (rows_processed, bytes_processed)
+
+    def _executor(self):
+        if self._pool is None:
+            os.makedirs(self.upload_dir, exist_ok=True)
+            os.makedirs(self.result_dir, exist_ok=True)
+            self._pool = ThreadPoolExecutor(self.workers, thread_name_prefix="job")
+        return self._pool
+
+    def shutdown(self):
+        if self._pool is not None:
+            self._pool.shutdown(wait=False, cancel_futures=True)
+            self._pool = None
+
+    # -------- state --------
+    def _update(self, job_id, **fields):
+        db = SessionLocal()
+        try:
+            db.query(AssessmentJob).filter(AssessmentJob.id == job_id).update(fields)
+            db.commit()
+        finally:
+            db.close()
+
+    def get(self, job_id):
+        db = SessionLocal()
+        try:
+            return db.get(AssessmentJob, job_id)
+        finally:
+            db.close()
+
+    def progress(self, job_id):
+        return self._progress.get(job_id)
+
+    # -------- submission --------
+    def submit(self, fileobj, filename=None):
+        """
+        Store the upload and queue it. Blocking; call from a worker thread.
+        """
+        self._executor()
+        job_id = uuid.uuid4().hex
+        upload_path = os.path.join(self.upload_dir, f"{job_id}.csv")
+
+        started = time.perf_counter()
+        with open(upload_path, "wb") as out:
+            shutil.copyfileobj(fileobj, out, length=1 << 20)
+        store_time = time.perf_counter() - started
+
+        db = SessionLocal()
+        try:
+            job = AssessmentJob(
+                id=job_id,
+                status=QUEUED,
+                filename=filename,
+                upload_path=upload_path,
+                upload_bytes=os.path.getsize(upload_path),
+                timings=json.dumps({"store_upload": round(store_time, 4)}),
+            )
+            db.add(job)
+            db.commit()
+            db.refresh(job)
+        finally:
+            db.close()
+
+        self._executor().submit(self._run, job_id)
+        return job
+
+    def recover(self):
+        """
+        Re-queue jobs left queued or running by a previous process. The
+        partial batch of an interrupted run is deleted by its batch_id
+        first, so the job restarts cleanly.
+        """
+        db = SessionLocal()
+        try:
+            pending = db.query(AssessmentJob.id, AssessmentJob.batch_id)\
+                .filter(AssessmentJob.status.in_([QUEUED, RUNNING]))\
+                .order_by(AssessmentJob.created_at).all()
+            for _, batch_id in pending:
+                if batch_id is not None:
+                    delete_batch(db, batch_id)
+            db.commit()
+        finally:
+            db.close()
+
+        for job_id, _ in pending:
+            self._update(job_id, status=QUEUED, rows_processed=0, bytes_processed=0, batch_id=None)
+            self._executor().submit(self._run, job_id)
+        return len(pending)
+
+    # -------- worker --------
+    def _run(self, job_id):
+        job = self.get(job_id)
+        if job is None or job.status not in (QUEUED, RUNNING):
+            return
+
+        timings = json.loads(job.timings or "{}")
+        result_path = os.path.join(self.result_dir, f"{job_id}.ndjson")
+        version = registry.get().version
+        self._update(job_id, status=RUNNING, started_at=datetime.utcnow(),
+                     model_version=version, result_path=result_path)
+
+        db = SessionLocal()
+        started = time.perf_counter()
+        assessment = None
+        try:
+            assessment = ChunkedAssessment(self.execution, db, version, "jobs", filename=job.filename)
+            self._update(job_id, batch_id=assessment.batch_id)
+            with open(job.upload_path, "rb") as source, open(result_path, "w") as out:
+                for chunk in assessment.chunks(source):
+                    out.write(to_ndjson(chunk))
+                    self._progress[job_id] = (assessment.totals.rows, source.tell())
+                timings["assess"] = round(time.perf_counter() - started, 4)
+
+                summary = assessment.summary()
+                mark = time.perf_counter()
+                insight = self.generate_insight(summary)
+                timings["insight"] = round(time.perf_counter() - mark, 4)
+
+                mark = time.perf_counter()
+                assessment.finish(insight, timings)
+                timings["commit"] = round(time.perf_counter() - mark, 4)
+
+                out.write(json.dumps({
+                    "summary": summary,
+                    "ai_insights": insight,
+                    "rows": assessment.totals.rows,
+                    "batch_id": assessment.batch_id,
+                }) + "\n")
+
+            timings["total"] = round(time.perf_counter() - started, 4)
+            self._update(
+                job_id,
+                status=SUCCEEDED,
+                rows_processed=assessment.totals.rows,
+                bytes_processed=job.upload_bytes,
+                summary=json.dumps(summary),
+                insight=insight,
+                timings=json.dumps(timings),
+                finished_at=datetime.utcnow(),
+            )
+        except Exception as exc:
+            db.rollback()
+            logger.exception("Job %s failed", job_id)
+            failed = {"status": FAILED, "error": str(exc), "finished_at": datetime.utcnow()}
+            if assessment is not None and not assessment.finished:
+                try:
+                    assessment.abort()
+                    failed["batch_id"] = None
+                except Exception:
+                    logger.exception("Could not delete partial batch %s of job %s", assessment.batch_id, job_id)
+            timings["total"] = round(time.perf_counter() - started, 4)
+            self._update(job_id, timings=json.dumps(timings), **failed)
+        finally:
+            self._progress.pop(job_id, None)
+            db.close()
+
+
+def job_status(job, live_progress=None):
+    rows, consumed = live_progress or (job.rows_processed, job.bytes_processed)
+    progress = consumed / job.upload_bytes if job.upload_bytes else 0.0
+    return {
+        "job_id": job.id,
+        "status": job.status,
+        "filename": job.filename,
+        "model_version": job.model_version,
+        "progress": round(min(progress, 1.0), 4),
+        "rows_processed": rows,
+        "batch_id": job.batch_id,
+        "timings": json.loads(job.timings) if job.timings else {},
+        "summary": json.loads(job.summary) if job.summary else None,
+        "ai_insights": job.insight,
+        "error": job.error,
+        "result_path": job.result_path if job.status == SUCCEEDED else None,
+        "result_url": f"/jobs/{job.id}/result" if job.status == SUCCEEDED else None,
+        "created_at": job.created_at,
+        "started_at": job.started_at,
+        "finished_at": job.finished_at,
+    }
@@ -0,0 +1,247 @@
+"""
+Process-local metrics served at /metrics in the Prometheus text format
+(version 0.0.4).
+
+Only what the API needs is implemented: labelled counters, gauges (set
+directly or read from a callback at scrape time) and histograms. With
+several uvicorn workers every process keeps its own values; scrape each
+worker or run a single one behind the scraper.
+"""
+import bisect
+import threading
+import time
+from contextlib import contextmanager
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+# Seconds; covers a 1k-row upload (~ms) up to a 1M-row one (~minutes)
+DEFAULT_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120, 300)
+
+# Upper bounds of the "rows" label, so label cardinality stays fixed
+ROW_BUCKETS = ((1_000, "1k"), (10_000, "10k"), (100_000, "100k"), (1_000_000, "1M"))
+
+
+def rows_label(rows):
+    for limit, label in ROW_BUCKETS:
+        if rows <= limit:
+            return f"le_{label}"
+    return f"gt_{ROW_BUCKETS[-1][1]}"
+
+
+def _escape(value):
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_labels(names, values, extra=()):
+    pairs = [f'{n}="{_escape(v)}"' for n, v in zip(names, values)] + list(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+def _format_value(value):
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class _Metric:
+    kind = None
+
+    def __init__(self, name, documentation, labelnames=(), registry=None):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._values = {}
+        self._lock = threading.Lock()
+        (registry if registry is not None else REGISTRY).register(self)
+
+    def _key(self, labels):
+        if set(labels) != set(self.labelnames):
+            raise ValueError(f"{self.name} expects labels {self.labelnames}, got {tuple(labels)}")
+        return tuple(str(labels[name]) for name in self.labelnames)
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.kind}"]
+        lines.extend(self._samples())
+        return "\n".join(lines)
+
+
+class Counter(_Metric):
+    kind = "counter"
+
+    def inc(self, amount=1, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def value(self, **labels):
+        return self._values.get(self._key(labels), 0)
+
+    def _samples(self):
+        with self._lock:
+            items = sorted(self._values.items())
+        return [f"{self.name}{_format_labels(self.labelnames, k)} {_format_value(v)}" for k, v in items]
+
+
+class Gauge(_Metric):
+    kind = "gauge"
+
+    def __init__(self, name, documentation, labelnames=(), registry=None):
+        super().__init__(name, documentation, labelnames, registry)
+        self._callbacks = {}
+
+    def set(self, value, **labels):
+        with self._lock:
+            self._values[self._key(labels)] = value
+
+    def set_function(self, fn, **labels):
+        """
+        Read the value from fn() whenever metrics are scraped.
+        """
+        with self._lock:
+            self._callbacks[self._key(labels)] = fn
+
+    def _samples(self):
+        with self._lock:
+            values = dict(self._values)
+            callbacks = dict(self._callbacks)
+        for key, fn in callbacks.items():
+            try:
+                values[key] = fn()
+            except Exception:  # a broken callback must not break the scrape
+                continue
+        return [f"{self.name}{_format_labels(self.labelnames, k)} {_format_value(v)}"
+                for k, v in sorted(values.items())]
+
+
+class Histogram(_Metric):
+    kind = "histogram"
+
+    def __init__(self, name, documentation, labelnames=(), buckets=DEFAULT_BUCKETS, registry=None):
+        super().__init__(name, documentation, labelnames, registry)
+        self.buckets = tuple(sorted(buckets))
+
+    def observe(self, value, **labels):
+        key = self._key(labels)
+        with self._lock:
+            state = self._values.get(key)
+            if state is None:
+                state = self._values[key] = [[0] * (len(self.buckets) + 1), 0.0]
+            state[0][bisect.bisect_left(self.buckets, value)] += 1
+            state[1] += value
+
+    def _samples(self):
+        with self._lock:
+            items = sorted((k, (list(counts), total)) for k, (counts, total) in self._values.items())
+        lines = []
+        for key, (counts, total) in items:
+            cumulative = 0
+            for bound, count in zip(self.buckets + (float("inf"),), counts):
+                cumulative += count
+                le = f'le="{_format_value(float(bound))}"'
+                lines.append(f"{self.name}_bucket{_format_labels(self.labelnames, key, [le])} {cumulative}")
+            labels = _format_labels(self.labelnames, key)
+            lines.append(f"{self.name}_sum{labels} {_format_value(total)}")
+            lines.append(f"{self.name}_count{labels} {cumulative}")
+        return lines
+
+
+class Registry:
+    def __init__(self):
+        self._metrics = {}
+
+    def register(self, metric):
+        if metric.name in self._metrics:
+            raise ValueError(f"Metric {metric.name} registered twice")
+        self._metrics[metric.name] = metric
+
+    def render(self):
+        return "\n".join(m.render() for m in self._metrics.values()) + "\n"
+
+
+REGISTRY = Registry()
+
+
+# =========================
+# API Metrics
+# =========================
+STAGE_SECONDS = Histogram(
+    "sme_stage_duration_seconds",
+    "Time spent in each assessment stage.",
+    ["endpoint", "stage", "rows"],
+)
+ROWS_ASSESSED = Counter(
+    "sme_rows_assessed_total",
+    "Rows scored, by endpoint.",
+    ["endpoint"],
+)
+FALLBACK_INSIGHTS = Counter(
+    "sme_fallback_insights_total",
+    "Responses that used the rule-based insight instead of the LLM.",
+    ["endpoint", "reason"],
+)
+LLM_ERRORS = Counter(
+    "sme_llm_errors_total",
+    "Exceptions raised by the LLM insight call.",
+    ["endpoint", "error"],
+)
+LLM_IN_FLIGHT = Gauge(
+    "sme_llm_in_flight",
+    "LLM requests currently holding a concurrency slot.",
+)
+LLM_CIRCUIT_OPEN = Gauge(
+    "sme_llm_circuit_open",
+    "1 while the LLM circuit breaker is open or half-open.",
+)
+DB_POOL = Gauge(
+    "sme_db_pool_connections",
+    "Database connection pool usage.",
+    ["engine", "state"],
+)
+ASSESSMENTS_IN_FLIGHT = Gauge(
+    "sme_assessments_in_flight",
+    "Assessments currently admitted by the execution layer.",
+)
+
+
+# =========================
+# Stage Timing
+# =========================
+class StageTimer:
+    """
+    Collects the stage durations of one request. finish() records them in
+    STAGE_SECONDS; server_timing() renders them for the Server-Timing header.
+    """
+
+    def __init__(self, endpoint):
+        self.endpoint = endpoint
+        self.stages = {}
+        self._started = time.perf_counter()
+
+    @contextmanager
+    def stage(self, name):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.add(name, time.perf_counter() - start)
+
+    def add(self, name, seconds):
+        self.stages[name] = self.stages.get(name, 0.0) + seconds
+
+    def update(self, timings):
+        for name, seconds in timings.items():
+            self.add(name, seconds)
+
+    def finish(self, rows):
+        self.stages["total"] = time.perf_counter() - self._started
+        label = rows_label(rows)
+        for name, seconds in self.stages.items():
+            STAGE_SECONDS.observe(seconds, endpoint=self.endpoint, stage=name, rows=label)
+        ROWS_ASSESSED.inc(rows, endpoint=self.endpoint)
+
+    def server_timing(self):
+        return ", ".join(f"{name};dur={seconds * 1e3:.1f}" for name, seconds in self.stages.items())
+
+
+def render():
+    return REGISTRY.render()
@@ -0,0 +1,271 @@
+"""
+Versioned model artifacts with lazy loading and atomic hot reload.
+
+Layout on disk:
+
+    MODEL_REGISTRY_DIR/
+        ACTIVE                      <- name of the version being served
+        20261018T120000Z/
+            manifest.json           <- sha256 of every artifact file
+            financial_health_model.pkl
+            feature_columns.pkl
+            compiled_forest.pkl
+            label_encoder.pkl       (optional)
+
+Publish a training run with:
+
+    python -m services.model_registry publish --from .. --activate
+"""
+import argparse
+import hashlib
+import json
+import logging
+import os
+import shutil
+import threading
+from dataclasses import dataclass, field
+from datetime import datetime, timezone
+
+from services.artifacts import load_model, engine_files
+from settings import (
+    MODEL_PATH,
+    FEATURE_COLUMNS_PATH,
+    COMPILED_MODEL_PATH,
+    INFERENCE_ENGINE,
+    MODEL_REGISTRY_DIR,
+    MODEL_MMAP,
+)
+
+logger = logging.getLogger(__name__)
+
+ACTIVE_POINTER = "ACTIVE"
+MANIFEST = "manifest.json"
+LEGACY_PREFIX = "legacy"
+
+# Artifact role -> file name inside a version directory
+ARTIFACT_FILES = {
+    "model": os.path.basename(MODEL_PATH),
+    "feature_columns": os.path.basename(FEATURE_COLUMNS_PATH),
+    "compiled": os.path.basename(COMPILED_MODEL_PATH),
+    "label_encoder": "label_encoder.pkl",
+}
+OPTIONAL_ARTIFACTS = {"compiled", "label_encoder"}
+
+
+class ChecksumMismatch(Exception):
+    pass
+
+
+def sha256_file(path, block_size=1 << 20):
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(block_size), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+@dataclass
+class LoadedModel:
+    version: str
+    model: object
+    feature_cols: list
+    engine: str
+    checksums: dict
+    loaded_at: datetime = field(default_factory=lambda: datetime.now(timezone.utc))
+
+    def info(self):
+        return {
+            "version": self.version,
+            "engine": self.engine,
+            "loaded_at": self.loaded_at.isoformat(),
+            "checksums": self.checksums,
+        }
+
+
+class ModelRegistry:
+    """
+    Serves one active model version per process.
+
+    Nothing is read until the first get(). reload() builds the new version
+    completely before swapping a single reference, so requests that already
+    hold the previous LoadedModel finish on it undisturbed.
+    """
+
+    def __init__(self, root=MODEL_REGISTRY_DIR, engine=INFERENCE_ENGINE, mmap=MODEL_MMAP):
+        self.root = root
+        self.engine = engine
+        self.mmap_mode = "r" if mmap else None
+        self._active = None
+        self._lock = threading.Lock()
+
+    # -------- resolution --------
+    def active_version(self):
+        """
+        Version named by the ACTIVE pointer. Without a registry the flat
+        artifact paths are served as "legacy-<checksum>", so replacing those
+        files and reloading still produces a new version.
+        """
+        pointer = os.path.join(self.root, ACTIVE_POINTER)
+        if os.path.exists(pointer):
+            with open(pointer) as f:
+                return f.read().strip()
+        primary = self._paths(LEGACY_PREFIX)[engine_files(self.engine)[0]]
+        return f"{LEGACY_PREFIX}-{sha256_file(primary)[:12]}"
+
+    def versions(self):
+        if not os.path.isdir(self.root):
+            return []
+        return sorted(
+            name for name in os.listdir(self.root)
+            if os.path.isfile(os.path.join(self.root, name, MANIFEST))
+        )
+
+    def _paths(self, version):
+        if version.startswith(LEGACY_PREFIX):
+            return {
+                "model": MODEL_PATH,
+                "feature_columns": FEATURE_COLUMNS_PATH,
+                "compiled": COMPILED_MODEL_PATH,
+            }
+        directory = os.path.join(self.root, version)
+        return {role: os.path.join(directory, name) for role, name in ARTIFACT_FILES.items()}
+
+    def _manifest(self, version):
+        if version.startswith(LEGACY_PREFIX):
+            return None
+        path = os.path.join(self.root, version, MANIFEST)
+        if not os.path.exists(path):
+            raise FileNotFoundError(f"Model version {version!r} not found in {self.root}")
+        with open(path) as f:
+            return json.load(f)
+
+    # -------- loading --------
+    def _load(self, version):
+        paths = self._paths(version)
+        manifest = self._manifest(version)
+        roles = ["feature_columns"] + engine_files(self.engine)
+
+        checksums = {}
+        for role in roles:
+            digest = sha256_file(paths[role])
+            if manifest is not None and manifest["files"].get(ARTIFACT_FILES[role]) != digest:
+                raise ChecksumMismatch(f"{paths[role]} does not match the manifest of {version}")
+            checksums[ARTIFACT_FILES[role]] = digest
+
+        model = load_model(paths["model"], paths["compiled"], self.engine, self.mmap_mode)
+        import joblib
+
+        feature_cols = joblib.load(paths["feature_columns"])
+        logger.info("Loaded model version %s (%s engine)", version, self.engine)
+        return LoadedModel(version, model, feature_cols, self.engine, checksums)
+
+    def get(self, version=None):
+        """
+        The active LoadedModel, loading it on first use. Passing a version
+        (as jobs sent to worker processes do) makes that version active in
+        this process if it is not already.
+        """
+        active = self._active
+        if active is not None and (version is None or active.version == version):
+            return active
+
+        with self._lock:
+            active = self._active
+            if active is None or (version is not None and active.version != version):
+                active = self._load(version or self.active_version())
+                self._active = active
+            return active
+
+    def reload(self, version=None):
+        """
+        Load version (default: the ACTIVE pointer) and swap it in atomically.
+        """
+        version = version or self.active_version()
+        loaded = self._load(version)
+        with self._lock:
+            self._active = loaded
+        return loaded
+
+    @property
+    def loaded(self):
+        return self._active
+
+    # -------- publishing --------
+    def publish(self, source_dir, version=None, activate=False):
+        """
+        Copy a training run's artifacts into a new version directory and
+        record their checksums.
+        """
+        version = version or datetime.now(timezone.utc).strftime("%Y%m%dT%H%M%SZ")
+        if version.startswith(LEGACY_PREFIX):
+            raise ValueError(f"Version names starting with {LEGACY_PREFIX!r} are reserved")
+        target = os.path.join(self.root, version)
+        if os.path.exists(target):
+            raise FileExistsError(f"Model version {version!r} already exists")
+
+        staging = target + ".tmp"
+        os.makedirs(staging)
+        files = {}
+        for role, name in ARTIFACT_FILES.items():
+            source = os.path.join(source_dir, name)
+            if not os.path.exists(source):
+                if role in OPTIONAL_ARTIFACTS:
+                    continue
+                shutil.rmtree(staging)
+                raise FileNotFoundError(f"Missing artifact: {source}")
+            shutil.copy2(source, os.path.join(staging, name))
+            files[name] = sha256_file(os.path.join(staging, name))
+
+        with open(os.path.join(staging, MANIFEST), "w") as f:
+            json.dump({
+                "version": version,
+                "created_at": datetime.now(timezone.utc).isoformat(),
+                "files": files,
+            }, f, indent=2)
+        os.replace(staging, target)
+
+        if activate:
+            self.activate(version)
+        return version
+
+    def activate(self, version):
+        self._manifest(version)  # must exist
+        pointer = os.path.join(self.root, ACTIVE_POINTER)
+        tmp = pointer + ".tmp"
+        with open(tmp, "w") as f:
+            f.write(version)
+        os.replace(tmp, pointer)
+
+
+registry = ModelRegistry()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Manage versioned model artifacts")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    pub = sub.add_parser("publish", help="Register a training run's artifacts")
+    pub.add_argument("--from", dest="source", default=".", help="Directory with the .pkl files")
+    pub.add_argument("--version")
+    pub.add_argument("--activate", action="store_true")
+
+    act = sub.add_parser("activate", help="Point ACTIVE at an existing version")
+    act.add_argument("version")
+
+    sub.add_parser("list", help="Show registered versions")
+
+    args = parser.parse_args()
+    if args.command == "publish":
+        version = registry.publish(args.source, args.version, args.activate)
+        print(f"✅ Published {version}" + (" (active)" if args.activate else ""))
+    elif args.command == "activate":
+        registry.activate(args.version)
+        print(f"✅ Active version: {args.version}")
+    else:
+        active = registry.active_version()
+        for version in registry.versions():
+            print(("* " if version == active else "  ") + version)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,103 @@
+import time
+
+from healthscore import apply_health_scores, STATUS_HEALTHY, STATUS_MODERATE, STATUS_RISKY
+
+# =========================
+# Assessment Pipeline
+# =========================
+# Steps shared by the buffered /predict and the chunked /predict/stream
+# paths. Each step works on one DataFrame, which may be a whole upload or a
+# single chunk of it.
+
+
+def engineer_features(df):
+    df.columns = df.columns.str.strip()
+
+    # Feature engineering (safe)
+    if "Cost_Ratio" not in df.columns and {"COGS", "Revenue"}.issubset(df.columns):
+        df["Cost_Ratio"] = df["COGS"] / df["Revenue"].replace(0, 1)
+
+    if "Profit_Margin" not in df.columns and {"NetProfit", "Revenue"}.issubset(df.columns):
+        df["Profit_Margin"] = df["NetProfit"] / df["Revenue"].replace(0, 1)
+
+    return df
+
+
+def score_frame(df, model, feature_cols, timings=None):
+    start = time.perf_counter()
+    X = df[feature_cols].fillna(0)
+    probs = model.predict_proba(X).max(axis=1)
+    mark = time.perf_counter()
+
+    apply_health_scores(df)
+    df["Confidence"] = probs.round(2)
+
+    if timings is not None:
+        timings["inference"] = mark - start
+        timings["scoring"] = time.perf_counter() - mark
+    return df
+
+
+def assess_frame(df, model, feature_cols, timings=None):
+    """
+    Features, inference and scoring for one frame. When a timings dict is
+    passed, the seconds spent in each step are recorded in it.
+    """
+    start = time.perf_counter()
+    df = engineer_features(df)
+    if timings is not None:
+        timings["features"] = time.perf_counter() - start
+    return score_frame(df, model, feature_cols, timings)
+
+
+def build_summary(df):
+    return {
+        "avg_health_score": round(float(df["Health_Score"].mean()), 1),
+        "healthy": int((df["Health_Status"] == STATUS_HEALTHY).sum()),
+        "moderate": int((df["Health_Status"] == STATUS_MODERATE).sum()),
+        "risky": int((df["Health_Status"] == STATUS_RISKY).sum()),
+    }
+
+
+class PortfolioSummary:
+    """
+    Running version of build_summary() for chunked uploads. Only totals are
+    kept, so memory does not depend on how many chunks are fed in.
+    """
+
+    def __init__(self):
+        self.rows = 0
+        self.score_sum = 0.0
+        self.counts = {STATUS_HEALTHY: 0, STATUS_MODERATE: 0, STATUS_RISKY: 0}
+
+    def update(self, df):
+        self.rows += len(df)
+        self.score_sum += float(df["Health_Score"].sum())
+        counts = df["Health_Status"].value_counts()
+        for status in self.counts:
+            self.counts[status] += int(counts.get(status, 0))
+
+    def as_dict(self):
+        avg = self.score_sum / self.rows if self.rows else 0.0
+        return {
+            "avg_health_score": round(avg, 1),
+            "healthy": self.counts[STATUS_HEALTHY],
+            "moderate": self.counts[STATUS_MODERATE],
+            "risky": self.counts[STATUS_RISKY],
+        }
+
+
+def iter_csv_chunks(source, chunk_rows):
+    import pandas as pd
+
+    yield from pd.read_csv(source, chunksize=chunk_rows)
+
+
+def to_ndjson(df):
+    """
+    Serialize a scored frame as newline-delimited JSON records.
+    """
+    if df.empty:
+        return ""
+    text = df.to_json(orient="records", lines=True, date_format="iso")
+    return text if text.endswith("\n") else text + "\n"
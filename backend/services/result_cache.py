@@ -0,0 +1,156 @@
+"""
+On-disk cache of /predict responses keyed by upload content.
+
+The key combines the SHA-256 of the uploaded bytes with the model version
+and healthscore.SCORING_RULES_VERSION, so publishing a model or changing the
+scoring rules never serves stale results. Entries are gzip-compressed JSON
+files under RESULT_CACHE_DIR; once their total size passes
+RESULT_CACHE_MAX_MB the least recently used ones are deleted. Payloads are
+built by serialization.cache_payload().
+
+The directory is the only index: every uvicorn worker sharing it sees the
+entries the others wrote, and the size limit applies to their total.
+"""
+import gzip
+import hashlib
+import logging
+import os
+import threading
+
+from healthscore import SCORING_RULES_VERSION
+from services.serialization import dumps, loads
+from settings import RESULT_CACHE_DIR, RESULT_CACHE_MAX_MB
+
+logger = logging.getLogger(__name__)
+
+SUFFIX = ".json.gz"
+
+
+def hash_upload(fileobj, chunk_size=1 << 20):
+    """
+    SHA-256 hex digest of a (spooled) upload file, read in chunks from the
+    start; the file is left rewound, so its bytes are only held in memory
+    once they are actually needed.
+    """
+    digest = hashlib.sha256()
+    fileobj.seek(0)
+    while chunk := fileobj.read(chunk_size):
+        digest.update(chunk)
+    fileobj.seek(0)
+    return digest.hexdigest()
+
+
+def result_key(content_hash, model_version, rules_version=SCORING_RULES_VERSION):
+    raw = f"{content_hash}|{model_version}|{rules_version}".encode("utf-8")
+    return hashlib.sha256(raw).hexdigest()
+
+
+class ResultCache:
+    """
+    Size-bounded LRU of JSON payloads on disk. Recency is the file
+    modification time (a hit touches the file), so it is shared by every
+    process using the directory and survives restarts. After each store
+    the directory is scanned and the least recently used entries are
+    deleted until the total fits max_bytes.
+    """
+
+    def __init__(self, directory=RESULT_CACHE_DIR, max_bytes=RESULT_CACHE_MAX_MB * 1024 * 1024):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        self.counters = {"hits": 0, "misses": 0, "stores": 0, "evictions": 0}
+
+        os.makedirs(directory, exist_ok=True)
+
+    def _path(self, key):
+        return os.path.join(self.directory, key + SUFFIX)
+
+    def _scan(self):
+        """
+        (mtime, key, size) of every entry on disk, oldest first.
+        """
+        files = []
+        with os.scandir(self.directory) as entries:
+            for entry in entries:
+                if not entry.name.endswith(SUFFIX):
+                    continue
+                try:
+                    stat = entry.stat()
+                except FileNotFoundError:  # evicted by another process meanwhile
+                    continue
+                files.append((stat.st_mtime, entry.name[:-len(SUFFIX)], stat.st_size))
+        return sorted(files)
+
+    # -------- lookups --------
+    def get(self, key):
+        path = self._path(key)
+        try:
+            with gzip.open(path, "rb") as f:
+                payload = loads(f.read())
+            os.utime(path)
+        except FileNotFoundError:
+            self.counters["misses"] += 1
+            return None
+        except (OSError, ValueError):
+            logger.warning("Dropping unreadable result cache entry %s", key)
+            self._forget(key)
+            self.counters["misses"] += 1
+            return None
+
+        self.counters["hits"] += 1
+        return payload
+
+    def put(self, key, payload):
+        data = gzip.compress(dumps(payload), compresslevel=1)
+        if len(data) > self.max_bytes:
+            logger.info("Result of %d bytes exceeds the cache budget, not cached", len(data))
+            return False
+
+        path = self._path(key)
+        tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        with open(tmp_path, "wb") as f:
+            f.write(data)
+        os.replace(tmp_path, path)
+
+        with self._lock:
+            evicted = self._evict_locked(keep=key)
+        self.counters["stores"] += 1
+        self.counters["evictions"] += len(evicted)
+        return True
+
+    # -------- eviction --------
+    def _evict_locked(self, keep=None):
+        files = self._scan()
+        total = sum(size for _, _, size in files)
+        evicted = []
+        for _, key, size in files:
+            if total <= self.max_bytes:
+                break
+            if key == keep:
+                continue
+            self._forget(key)
+            total -= size
+            evicted.append(key)
+        return evicted
+
+    def _forget(self, key):
+        try:
+            os.remove(self._path(key))
+        except FileNotFoundError:
+            pass
+
+    def clear(self):
+        keys = [key for _, key, _ in self._scan()]
+        for key in keys:
+            self._forget(key)
+        return len(keys)
+
+    def stats(self):
+        files = self._scan()
+        return {
+            **self.counters,
+            "entries": len(files),
+            "bytes": sum(size for _, _, size in files),
+            "max_bytes": self.max_bytes,
+            "scoring_rules_version": SCORING_RULES_VERSION,
+        }
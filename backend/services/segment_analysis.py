@@ -0,0 +1,178 @@
+"""
+Per-segment LLM reports for a scored portfolio.
+
+The portfolio is grouped into segments (health status x industry) and
+each segment is reduced to a compact summary. Summaries are packed into as
+few schema-constrained requests as the token budget allows, the requests
+run concurrently through the shared LLM client, and the reports are
+matched back to their segments by segment_id. A segment whose request
+fails, or whose report is missing from the response, gets the rule-based
+report instead.
+"""
+import asyncio
+import json
+import logging
+import math
+
+from llm.fallback import fallback_financial_report, fallback_segment_insights
+from llm.gemini_client import LLMError, LLMTimeout, LLMUnavailable
+from llm.prompts import get_segment_analysis_prompt
+from llm.schemas import SEGMENT_REPORTS_SCHEMA
+from services.metrics import FALLBACK_INSIGHTS, LLM_ERRORS
+from settings import (
+    SEGMENT_INDUSTRY_COLUMNS,
+    SEGMENT_TOKEN_BUDGET,
+    SEGMENT_REPORT_TOKENS,
+    SEGMENT_MAX_PER_REQUEST,
+)
+
+logger = logging.getLogger(__name__)
+
+ALL_INDUSTRIES = "all"
+# Rough size of a token in characters, for budgeting without a tokenizer
+CHARS_PER_TOKEN = 4
+# Rounded to 4 places; the other averages to 1
+RATIO_FIELDS = {"avg_confidence", "loss_making_share", "avg_profit_margin", "avg_cost_ratio"}
+
+
+# =========================
+# Segments
+# =========================
+def industry_column(df):
+    return next((col for col in SEGMENT_INDUSTRY_COLUMNS if col in df.columns), None)
+
+
+def segment_summaries(df):
+    """
+    One summary dict per (health status, industry) segment of a scored
+    frame, largest segments first.
+    """
+    industry = industry_column(df)
+    frame = df.assign(
+        _industry=df[industry].fillna("unknown").astype(str) if industry else ALL_INDUSTRIES,
+        _loss=df["NetProfit"] < 0 if "NetProfit" in df.columns else False,
+    )
+
+    columns = {
+        "rows": ("Health_Score", "size"),
+        "avg_health_score": ("Health_Score", "mean"),
+        "avg_confidence": ("Confidence", "mean"),
+        "loss_making_share": ("_loss", "mean"),
+    }
+    for name, source, how in (
+        ("total_revenue", "Revenue", "sum"),
+        ("median_revenue", "Revenue", "median"),
+        ("avg_profit_margin", "Profit_Margin", "mean"),
+        ("avg_cost_ratio", "Cost_Ratio", "mean"),
+    ):
+        if source in frame.columns:
+            columns[name] = (source, how)
+
+    grouped = frame.groupby(["Health_Status", "_industry"], sort=False).agg(**columns)
+    grouped = grouped.sort_values("rows", ascending=False)
+
+    segments = []
+    for (status, industry_name), row in grouped.iterrows():
+        segment = {
+            "segment_id": f"{status}/{industry_name}",
+            "health_status": status,
+            "industry": industry_name,
+            "rows": int(row["rows"]),
+        }
+        for name in columns:
+            if name != "rows":
+                value = float(row[name])
+                # A segment with no valid values in the source column averages to NaN
+                segment[name] = round(value, 4 if name in RATIO_FIELDS else 1) if math.isfinite(value) else None
+        segments.append(segment)
+    return segments
+
+
+# =========================
+# Token Budget
+# =========================
+def estimate_tokens(text):
+    return -(-len(text) // CHARS_PER_TOKEN)
+
+
+def pack_segments(segments, lang="en", budget=SEGMENT_TOKEN_BUDGET,
+                  report_tokens=SEGMENT_REPORT_TOKENS, max_per_request=SEGMENT_MAX_PER_REQUEST):
+    """
+    Split segments into request groups. A group's prompt plus the output
+    reserved for its reports stays within budget; a single segment larger
+    than the budget still gets a request of its own.
+    """
+    base = estimate_tokens(get_segment_analysis_prompt([], lang))
+    groups, current, used = [], [], base
+    for segment in segments:
+        cost = estimate_tokens(json.dumps(segment, sort_keys=True)) + 1 + report_tokens
+        if current and (used + cost > budget or len(current) >= max_per_request):
+            groups.append(current)
+            current, used = [], base
+        current.append(segment)
+        used += cost
+    if current:
+        groups.append(current)
+    return groups
+
+
+# =========================
+# Analysis
+# =========================
+async def analyze_group(client, group, lang, report_tokens=SEGMENT_REPORT_TOKENS):
+    """
+    ({segment_id: report}, sent) for one request group; segments without
+    an LLM report get the rule-based one. sent is False when the client
+    refused the call without contacting the provider.
+    """
+    prompt = get_segment_analysis_prompt(group, lang)
+    sent = True
+    try:
+        body = await client.generate_financial_report(
+            prompt, schema=SEGMENT_REPORTS_SCHEMA, max_output_tokens=report_tokens * len(group)
+        )
+        if not isinstance(body, dict):
+            raise LLMError(f"Expected a JSON object, got {type(body).__name__}")
+        returned = {
+            report.get("segment_id"): report
+            for report in body.get("reports", []) if isinstance(report, dict)
+        }
+        reason = "missing"
+    except LLMUnavailable:
+        sent = False
+        returned, reason = {}, "circuit_open" if client.enabled else "disabled"
+    except LLMError as exc:
+        logger.warning("Segment analysis request failed: %s", exc)
+        LLM_ERRORS.inc(endpoint="analyze_segments", error=type(exc).__name__)
+        returned, reason = {}, "timeout" if isinstance(exc, LLMTimeout) else "error"
+
+    reports = {}
+    for segment in group:
+        report = returned.get(segment["segment_id"])
+        if report is None:
+            FALLBACK_INSIGHTS.inc(endpoint="analyze_segments", reason=reason)
+            report = fallback_financial_report(segment, fallback_segment_insights)
+        else:
+            report = {key: value for key, value in report.items() if key != "segment_id"}
+        reports[segment["segment_id"]] = report
+    return reports, sent
+
+
+async def analyze_segments(df, client, lang="en", budget=SEGMENT_TOKEN_BUDGET,
+                           report_tokens=SEGMENT_REPORT_TOKENS, max_per_request=SEGMENT_MAX_PER_REQUEST):
+    """
+    Segment summaries of a scored frame, each with its report, plus how
+    many LLM requests were sent and how many reports are fallbacks.
+    """
+    segments = segment_summaries(df)
+    groups = pack_segments(segments, lang, budget, report_tokens, max_per_request)
+    results = await asyncio.gather(*(analyze_group(client, group, lang, report_tokens) for group in groups))
+
+    reports = {}
+    for result, _ in results:
+        reports.update(result)
+    return {
+        "segments": [{**segment, "report": reports[segment["segment_id"]]} for segment in segments],
+        "requests": sum(1 for _, sent in results if sent),
+        "fallbacks": sum(1 for report in reports.values() if report.get("fallback")),
+    }
@@ -0,0 +1,184 @@
+"""
+Response rendering for assessment results.
+
+Scored frames are written straight to bytes instead of going through
+to_dict(orient="records") and FastAPI's jsonable_encoder:
+
+    json      {"summary", "ai_insights", "data": [row, ...]}     (default)
+    columnar  {"summary", "ai_insights", "rows", "columns": {name: [values]}}
+    arrow     Arrow IPC stream; summary and insight in the schema metadata
+    summary   {"summary", "ai_insights", "rows"} without any row data
+
+Bodies are gzip- or brotli-compressed when the client accepts it.
+"""
+import gzip
+import importlib.util
+import json
+
+import numpy as np
+from fastapi import Response
+
+from settings import RESPONSE_COMPRESSION_MIN_BYTES, RESPONSE_GZIP_LEVEL, RESPONSE_BROTLI_QUALITY
+
+# =========================
+# Optional Encoders
+# =========================
+try:
+    import orjson
+    ORJSON_AVAILABLE = True
+except ImportError:
+    ORJSON_AVAILABLE = False
+
+try:
+    import brotli
+    BROTLI_AVAILABLE = True
+except ImportError:
+    BROTLI_AVAILABLE = False
+
+# pyarrow is only imported for the first Arrow response
+ARROW_AVAILABLE = importlib.util.find_spec("pyarrow") is not None
+
+JSON_TYPE = "application/json"
+ARROW_TYPE = "application/vnd.apache.arrow.stream"
+FORMATS = ("json", "columnar", "arrow", "summary")
+
+# Full float precision (pandas defaults to 10 significant digits)
+DOUBLE_PRECISION = 15
+
+
+class UnsupportedFormat(ValueError):
+    pass
+
+
+def dumps(obj):
+    if ORJSON_AVAILABLE:
+        return orjson.dumps(obj, option=orjson.OPT_SERIALIZE_NUMPY)
+    return json.dumps(obj, separators=(",", ":")).encode("utf-8")
+
+
+def loads(data):
+    return orjson.loads(data) if ORJSON_AVAILABLE else json.loads(data)
+
+
+# =========================
+# Frame Encoders
+# =========================
+def records_json(df):
+    """
+    Rows as a JSON array of objects, NaN as null (pandas' C encoder).
+    """
+    return df.to_json(orient="records", date_format="iso",
+                      double_precision=DOUBLE_PRECISION).encode("utf-8")
+
+
+def frame_columns(df):
+    """
+    {column: values} with numeric columns left as NumPy arrays when orjson
+    can encode them directly, everything else as lists with None for NaN.
+    """
+    columns = {}
+    for name, series in df.items():
+        kind = series.dtype.kind
+        if kind in "iubf" and ORJSON_AVAILABLE:
+            # orjson writes float NaN as null
+            columns[name] = np.ascontiguousarray(series.to_numpy())
+        elif kind == "M":
+            columns[name] = series.dt.strftime("%Y-%m-%dT%H:%M:%S").where(series.notna(), None).tolist()
+        else:
+            columns[name] = series.astype(object).where(series.notna(), None).tolist()
+    return columns
+
+
+def arrow_stream(df, metadata):
+    import pyarrow as pa
+
+    table = pa.Table.from_pandas(df, preserve_index=False)
+    schema_metadata = dict(table.schema.metadata or {})
+    schema_metadata.update({key.encode("utf-8"): value.encode("utf-8") for key, value in metadata.items()})
+    table = table.replace_schema_metadata(schema_metadata)
+
+    sink = pa.BufferOutputStream()
+    with pa.ipc.new_stream(sink, table.schema) as writer:
+        writer.write_table(table)
+    return sink.getvalue().to_pybytes()
+
+
+# =========================
+# Negotiation
+# =========================
+def negotiate_format(requested=None, accept=None):
+    """
+    Explicit ?format= wins; otherwise an Accept header naming Arrow selects
+    it, and anything else gets row-oriented JSON.
+    """
+    fmt = requested or ("arrow" if accept and ARROW_TYPE in accept else "json")
+    if fmt not in FORMATS:
+        raise UnsupportedFormat(f"Unknown format {fmt!r}; expected one of {', '.join(FORMATS)}")
+    if fmt == "arrow" and not ARROW_AVAILABLE:
+        raise UnsupportedFormat("Arrow output needs pyarrow installed on the server")
+    return fmt
+
+
+def _accepted_encodings(accept_encoding):
+    accepted = set()
+    for part in (accept_encoding or "").split(","):
+        name, _, params = part.strip().partition(";")
+        if name and params.replace(" ", "") not in ("q=0", "q=0.0"):
+            accepted.add(name.lower())
+    return accepted
+
+
+def compress(body, accept_encoding):
+    """
+    (body, content-encoding or None). Small bodies are sent as they are.
+    """
+    if len(body) < RESPONSE_COMPRESSION_MIN_BYTES:
+        return body, None
+    accepted = _accepted_encodings(accept_encoding)
+    if BROTLI_AVAILABLE and "br" in accepted:
+        return brotli.compress(body, quality=RESPONSE_BROTLI_QUALITY), "br"
+    if "gzip" in accepted:
+        return gzip.compress(body, compresslevel=RESPONSE_GZIP_LEVEL), "gzip"
+    return body, None
+
+
+# =========================
+# Rendering
+# =========================
+def render_body(summary, insight, df, fmt):
+    """
+    (body bytes, media type) of an assessment result in the given format.
+    """
+    if fmt == "arrow":
+        metadata = {"summary": dumps(summary).decode("utf-8"), "ai_insights": insight or ""}
+        return arrow_stream(df, metadata), ARROW_TYPE
+
+    head = b'{"summary":' + dumps(summary) + b',"ai_insights":' + dumps(insight)
+    if fmt == "summary":
+        return head + b',"rows":' + dumps(len(df)) + b"}", JSON_TYPE
+    if fmt == "columnar":
+        return head + b',"rows":' + dumps(len(df)) + b',"columns":' + dumps(frame_columns(df)) + b"}", JSON_TYPE
+    return head + b',"data":' + records_json(df) + b"}", JSON_TYPE
+
+
+def encoded_response(body, media_type, encoding=None, headers=None):
+    headers = dict(headers or {})
+    headers["Vary"] = "Accept, Accept-Encoding"
+    if encoding:
+        headers["Content-Encoding"] = encoding
+    return Response(content=body, media_type=media_type, headers=headers)
+
+
+# =========================
+# Result Cache Payloads
+# =========================
+def cache_payload(summary, insight, df):
+    return {"summary": summary, "ai_insights": insight, "columns": frame_columns(df)}
+
+
+def frame_from_payload(payload):
+    import pandas as pd
+
+    if "columns" in payload:
+        return pd.DataFrame(payload["columns"])
+    return pd.DataFrame(payload["data"])  # entries written before the columnar layout
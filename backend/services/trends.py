@@ -0,0 +1,41 @@
+"""
+Trend-aware scoring for /predict (TREND_SCORING).
+
+An SME's trend is its stored months plus the rows of the upload being
+scored, so only `window` months per SME in the upload are read.
+"""
+from database.trends import (
+    aggregate_periods, combine_periods, load_periods, sme_column, sme_keys, trend_features,
+)
+from healthscore import apply_trend_adjustments, trend_adjustment
+from settings import TREND_SME_COLUMNS, TREND_WINDOW_MONTHS
+
+
+def tag_sme(df, sme_id):
+    """
+    Attribute every row of a single-business upload to sme_id, unless the
+    upload already has an SME column.
+    """
+    if sme_id and sme_column(df) is None:
+        df[TREND_SME_COLUMNS[0]] = sme_id
+    return df
+
+
+def adjust_for_trends(db, df, window=TREND_WINDOW_MONTHS):
+    """
+    Shift each row's health score by its SME's trend points (see
+    healthscore.trend_adjustment). Returns {sme_id: features} for the SMEs
+    in the upload.
+    """
+    rows = aggregate_periods(df)
+    if not rows:
+        return {}
+
+    stored = load_periods(db, [row["sme_id"] for row in rows], window)
+    combined = combine_periods(stored, rows)
+    features = {sme: trend_features(periods, window) for sme, periods in combined.items()}
+
+    points = {sme: trend_adjustment(f) for sme, f in features.items()}
+    adjustments = sme_keys(df[sme_column(df)]).map(points).fillna(0)
+    apply_trend_adjustments(df, adjustments.to_numpy())
+    return features
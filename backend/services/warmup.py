@@ -0,0 +1,87 @@
+"""
+Background warm-up after startup.
+
+Loads the active model, scores a one-row upload in the API process and
+then once more through the CPU pool, so the first real request pays for
+none of it. The in-process pass comes first: pandas, sklearn and the
+model are then already in memory when the pool forks its workers.
+"""
+import asyncio
+import logging
+import time
+from contextlib import contextmanager
+
+from services.executor import assess_csv_bytes
+from services.model_registry import registry
+
+logger = logging.getLogger(__name__)
+
+PENDING, RUNNING, READY, FAILED = "pending", "running", "ready", "failed"
+
+# One row with the columns of a real upload
+WARMUP_CSV = (
+    b"TransactionID,TransactionDate,OrderID,Revenue,COGS,GrossProfit,OperatingExpenses,NetProfit\n"
+    b"WARMUP,2024-01-01,0,1000.0,600.0,400.0,150.0,250.0\n"
+)
+
+
+class Warmup:
+    def __init__(self, execution, enabled=True):
+        self.execution = execution
+        self.enabled = enabled
+        self.state = PENDING if enabled else READY
+        self.error = None
+        self.stages = {}
+        self._task = None
+
+    @property
+    def ready(self):
+        return self.state == READY
+
+    def start(self):
+        """
+        Schedule run() on the running loop and return straight away.
+        """
+        if self.enabled and self._task is None:
+            self._task = asyncio.create_task(self.run())
+
+    async def run(self):
+        self.state = RUNNING
+        try:
+            with self._stage("model"):
+                version = (await self.execution.run_io(registry.get)).version
+            with self._stage("in_process"):
+                await self.execution.run_io(assess_csv_bytes, WARMUP_CSV, version)
+            with self._stage("cpu_pool"):
+                await self.execution.run_cpu(assess_csv_bytes, WARMUP_CSV, version)
+        except Exception as exc:
+            # not ready, but live: requests still load the model on demand
+            logger.exception("Warm-up failed")
+            self.state, self.error = FAILED, f"{type(exc).__name__}: {exc}"
+            return
+        self.state = READY
+        logger.info("Warm-up finished in %.2fs", sum(self.stages.values()))
+
+    async def stop(self):
+        if self._task is not None and not self._task.done():
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+
+    @contextmanager
+    def _stage(self, name):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.stages[name] = time.perf_counter() - start
+
+    def status(self):
+        return {
+            "status": self.state,
+            "error": self.error,
+            "stages_ms": {name: round(seconds * 1000, 1) for name, seconds in self.stages.items()},
+        }
+
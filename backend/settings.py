@@ -0,0 +1,208 @@
+import os
+
+# =========================
+# Runtime Settings
+# =========================
+# Tunables are read from the environment once, at import time.
+
+
+def env_int(name, default):
+    value = os.getenv(name)
+    return int(value) if value not in (None, "") else default
+
+
+def env_float(name, default):
+    value = os.getenv(name)
+    return float(value) if value not in (None, "") else default
+
+
+def env_bool(name, default):
+    value = os.getenv(name)
+    if value in (None, ""):
+        return default
+    return value.strip().lower() in ("1", "true", "yes", "on")
+
+
+def env_list(name, default):
+    value = os.getenv(name)
+    if value in (None, ""):
+        return list(default)
+    return [item.strip() for item in value.split(",") if item.strip()]
+
+
+# =========================
+# Database
+# =========================
+DATABASE_URL = os.getenv("DATABASE_URL", "sqlite:///./app.db")
+# Used by the async API routes; empty derives it from DATABASE_URL
+# (sqlite -> sqlite+aiosqlite, postgresql -> postgresql+asyncpg)
+ASYNC_DATABASE_URL = os.getenv("ASYNC_DATABASE_URL", "")
+
+# SQLite connection tuning, applied as PRAGMAs on every new connection.
+# WAL lets readers run while one writer commits; NORMAL synchronous is
+# durable across application crashes and only risks the last commits on
+# power loss.
+SQLITE_JOURNAL_MODE = os.getenv("SQLITE_JOURNAL_MODE", "WAL")
+SQLITE_SYNCHRONOUS = os.getenv("SQLITE_SYNCHRONOUS", "NORMAL")
+# Page cache per connection, in KiB
+SQLITE_CACHE_SIZE_KB = env_int("SQLITE_CACHE_SIZE_KB", 64 * 1024)
+# Bytes of the database file read through mmap; 0 disables it
+SQLITE_MMAP_SIZE = env_int("SQLITE_MMAP_SIZE", 256 * 1024 * 1024)
+# How long a writer waits for the lock before "database is locked"
+SQLITE_BUSY_TIMEOUT_MS = env_int("SQLITE_BUSY_TIMEOUT_MS", 30_000)
+
+# Connection pool per process
+DB_POOL_SIZE = env_int("DB_POOL_SIZE", 10)
+DB_MAX_OVERFLOW = env_int("DB_MAX_OVERFLOW", 10)
+DB_POOL_TIMEOUT = env_int("DB_POOL_TIMEOUT", 30)
+
+
+# =========================
+# Snapshot Persistence
+# =========================
+# "bulk" writes straight from DataFrame columns with Core executemany;
+# "orm" builds one SMESnapshot object per row (the original behaviour).
+SNAPSHOT_WRITE_MODE = os.getenv("SNAPSHOT_WRITE_MODE", "bulk")
+SNAPSHOT_BATCH_SIZE = env_int("SNAPSHOT_BATCH_SIZE", 5000)
+# Commit after this many batches (with their rollup and trend deltas);
+# 0 keeps a single commit per upload
+SNAPSHOT_COMMIT_EVERY = env_int("SNAPSHOT_COMMIT_EVERY", 0)
+
+
+# =========================
+# SME Trends
+# =========================
+# Rows are attributed to an SME by the first of these columns an upload
+# has (or /predict?sme_id= for a single-business file); uploads with
+# neither are not tracked
+TREND_SME_COLUMNS = env_list("TREND_SME_COLUMNS", ["SME_ID", "BusinessID", "CompanyID"])
+# Calendar months in a rolling window, ending at an SME's latest month
+TREND_WINDOW_MONTHS = env_int("TREND_WINDOW_MONTHS", 6)
+# Adjust /predict health scores by each SME's trend (see healthscore.py).
+# Adjusted scores depend on stored history, so the result cache is off.
+TREND_SCORING = env_bool("TREND_SCORING", False)
+
+# =========================
+# Streaming Uploads
+# =========================
+# Rows read, scored and streamed per step by /predict/stream
+STREAM_CHUNK_ROWS = env_int("STREAM_CHUNK_ROWS", 50000)
+
+
+# =========================
+# Model Artifacts
+# =========================
+MODEL_PATH = os.getenv("MODEL_PATH", "financial_health_model.pkl")
+FEATURE_COLUMNS_PATH = os.getenv("FEATURE_COLUMNS_PATH", "feature_columns.pkl")
+# Written by training.py next to the model; see forest_engine.py
+COMPILED_MODEL_PATH = os.getenv("COMPILED_MODEL_PATH", "compiled_forest.pkl")
+# "sklearn" uses the pickled estimator, "compiled" the flattened NumPy forest,
+# "auto" the compiled forest for small batches and sklearn for large ones
+INFERENCE_ENGINE = os.getenv("INFERENCE_ENGINE", "sklearn")
+COMPILED_MAX_ROWS = env_int("COMPILED_MAX_ROWS", 256)
+
+# Versioned artifacts live in MODEL_REGISTRY_DIR/<version>/ with the active
+# version named in MODEL_REGISTRY_DIR/ACTIVE. Without a registry the flat
+# paths above are served as a single "legacy" version.
+MODEL_REGISTRY_DIR = os.getenv("MODEL_REGISTRY_DIR", "model_registry")
+# Memory-map artifact arrays so forked workers share the same pages
+MODEL_MMAP = env_bool("MODEL_MMAP", True)
+
+
+# =========================
+# Execution Layer
+# =========================
+# "process" runs parsing/inference/scoring in a process pool, "thread" in a
+# thread pool, "inline" on the calling thread (the original behaviour).
+EXECUTION_MODE = os.getenv("EXECUTION_MODE", "process")
+CPU_WORKERS = env_int("CPU_WORKERS", os.cpu_count() or 1)
+# Threads for blocking I/O: Gemini calls and database commits
+IO_WORKERS = env_int("IO_WORKERS", 8)
+# Assessments allowed in flight before new ones get a 503
+MAX_CONCURRENT_ASSESSMENTS = env_int("MAX_CONCURRENT_ASSESSMENTS", 2 * CPU_WORKERS)
+OVERLOAD_RETRY_AFTER = env_int("OVERLOAD_RETRY_AFTER", 5)
+
+
+# Load the model and start the CPU pool in the background at startup;
+# GET /health/ready answers 503 until it is done
+WARMUP_ENABLED = env_bool("WARMUP_ENABLED", True)
+
+
+# =========================
+# Insight Cache
+# =========================
+INSIGHT_CACHE_ENABLED = env_bool("INSIGHT_CACHE_ENABLED", True)
+# In-process LRU
+INSIGHT_CACHE_SIZE = env_int("INSIGHT_CACHE_SIZE", 1024)
+INSIGHT_CACHE_TTL = env_int("INSIGHT_CACHE_TTL", 3600)
+# Persistent layer in the app database
+INSIGHT_CACHE_DB_TTL = env_int("INSIGHT_CACHE_DB_TTL", 7 * 24 * 3600)
+# Optional bucketing of numeric summary fields before keying, e.g.
+# "avg_health_score=0.5,healthy=10" makes near-identical portfolios share
+# one insight. Empty means exact matches only.
+INSIGHT_CACHE_BUCKETS = os.getenv("INSIGHT_CACHE_BUCKETS", "")
+
+
+# =========================
+# LLM Client
+# =========================
+# Gemini's REST API; point LLM_BASE_URL at a stub server for testing.
+GEMINI_API_KEY = os.getenv("GEMINI_API_KEY", "")
+LLM_BASE_URL = os.getenv("LLM_BASE_URL", "https://generativelanguage.googleapis.com")
+LLM_MODEL = os.getenv("LLM_MODEL", "gemini-1.5-flash")
+# Deadline per call in seconds, covering the wait for a slot and retries
+LLM_TIMEOUT = env_float("LLM_TIMEOUT", 15.0)
+LLM_CONNECT_TIMEOUT = env_float("LLM_CONNECT_TIMEOUT", 3.0)
+# Extra attempts after a timeout, 429 or 5xx while the deadline allows
+LLM_MAX_RETRIES = env_int("LLM_MAX_RETRIES", 1)
+# Requests in flight to the provider per process; the rest wait for a slot
+LLM_MAX_CONCURRENCY = env_int("LLM_MAX_CONCURRENCY", 8)
+LLM_MAX_CONNECTIONS = env_int("LLM_MAX_CONNECTIONS", 16)
+# Consecutive failures that open the circuit, and how long it stays open
+# before one trial call is let through
+LLM_BREAKER_FAILURES = env_int("LLM_BREAKER_FAILURES", 5)
+LLM_BREAKER_RESET = env_float("LLM_BREAKER_RESET", 30.0)
+
+
+# =========================
+# Segment Analysis
+# =========================
+# Segments are health status x industry; the first of these columns found
+# in an upload is its industry
+SEGMENT_INDUSTRY_COLUMNS = env_list("SEGMENT_INDUSTRY_COLUMNS", ["Industry", "Sector"])
+# Tokens per LLM request (prompt plus the reports it asks for); segments
+# are packed into requests until the next one would exceed it
+SEGMENT_TOKEN_BUDGET = env_int("SEGMENT_TOKEN_BUDGET", 8000)
+# Output tokens reserved for each segment's report
+SEGMENT_REPORT_TOKENS = env_int("SEGMENT_REPORT_TOKENS", 500)
+SEGMENT_MAX_PER_REQUEST = env_int("SEGMENT_MAX_PER_REQUEST", 12)
+
+
+# =========================
+# Background Jobs
+# =========================
+# Uploads and NDJSON results of POST /jobs are kept under JOBS_DIR
+JOBS_DIR = os.getenv("JOBS_DIR", "job_data")
+# SQLite has a single writer, so more job workers mostly queue on the
+# database; raise this together with a server database.
+JOB_WORKERS = env_int("JOB_WORKERS", 1)
+
+
+# =========================
+# Result Cache
+# =========================
+# /predict responses keyed by upload hash + model version + scoring rules
+RESULT_CACHE_ENABLED = env_bool("RESULT_CACHE_ENABLED", True)
+RESULT_CACHE_DIR = os.getenv("RESULT_CACHE_DIR", "result_cache")
+# Total size of the compressed entries before least recently used ones go
+RESULT_CACHE_MAX_MB = env_int("RESULT_CACHE_MAX_MB", 512)
+
+
+# =========================
+# Response Encoding
+# =========================
+# Bodies smaller than this are never compressed
+RESPONSE_COMPRESSION_MIN_BYTES = env_int("RESPONSE_COMPRESSION_MIN_BYTES", 1024)
+# Low levels keep compression cheaper than the network time it saves
+RESPONSE_GZIP_LEVEL = env_int("RESPONSE_GZIP_LEVEL", 3)
+RESPONSE_BROTLI_QUALITY = env_int("RESPONSE_BROTLI_QUALITY", 4)
@@ -0,0 +1,89 @@
+"""
+Write/read time and file size of the preprocessing -> training artifact in
+CSV, Parquet and Arrow IPC, on a synthetic processed dataset.
+
+Run from the repository root:
+
+    python -m benchmarks.bench_dataset_io --rows 3000000
+"""
+import argparse
+import os
+import tempfile
+import time
+
+import numpy as np
+import pandas as pd
+
+import dataset_io
+from dataset_io import read_dataset, write_dataset
+
+TRAINING_COLUMNS = ["Revenue", "COGS", "OperatingExpenses", "GrossProfit",
+                    "Cost_Ratio", "NetProfit", "Profit_Margin"]
+
+
+def make_processed_frame(rows, seed=11):
+    """
+    Same columns and dtypes preprocessing.py produces.
+    """
+    rng = np.random.default_rng(seed)
+    revenue = rng.lognormal(10, 1, rows)
+    cogs = revenue * rng.uniform(0.3, 0.95, rows)
+    opex = revenue * rng.uniform(0.05, 0.4, rows)
+    gross = revenue - cogs
+    net = gross - opex
+    dates = pd.Timestamp("2022-01-01") + pd.to_timedelta(rng.integers(0, 1095, rows), unit="D")
+
+    df = pd.DataFrame({
+        "TransactionID": np.arange(rows),
+        "TransactionDate": dates,
+        "OrderID": rng.integers(1, 10**7, rows),
+        "Revenue": revenue,
+        "COGS": cogs,
+        "GrossProfit": gross,
+        "OperatingExpenses": opex,
+        "NetProfit": net,
+    })
+    df["Profit_Margin"] = net / revenue
+    df["Cost_Ratio"] = opex / revenue
+    df["Loss_Flag"] = (net < 0).astype(int)
+    df["Year"] = df["TransactionDate"].dt.year
+    df["Month"] = df["TransactionDate"].dt.month
+    df["Day"] = df["TransactionDate"].dt.day
+    return df
+
+
+def timed(fn):
+    start = time.perf_counter()
+    result = fn()
+    return result, time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Dataset artifact format benchmark")
+    parser.add_argument("--rows", type=int, default=3_000_000)
+    parser.add_argument("--formats", nargs="+", default=["csv", "parquet", "arrow"])
+    args = parser.parse_args()
+
+    df = make_processed_frame(args.rows)
+    print(f"Synthetic processed dataset: {args.rows:,} rows x {df.shape[1]} columns\n")
+    print(f"{'format':>8} {'write s':>9} {'read all s':>11} {'read train s':>13} {'size MB':>9} {'dates kept':>11}")
+
+    for fmt in args.formats:
+        with tempfile.TemporaryDirectory() as tmp:
+            base = os.path.join(tmp, "processed_data")
+            path, write_time = timed(lambda: write_dataset(df, base, fmt=fmt, producer="benchmark"))
+            (full, _), read_all = timed(lambda: read_dataset(base))
+            (subset, _), read_cols = timed(lambda: read_dataset(base, columns=TRAINING_COLUMNS))
+
+            assert len(full) == len(df) and list(subset.columns) == TRAINING_COLUMNS
+            np.testing.assert_allclose(subset["Revenue"].to_numpy(), df["Revenue"].to_numpy())
+            dates_kept = pd.api.types.is_datetime64_any_dtype(full["TransactionDate"])
+            size_mb = os.path.getsize(path) / 1e6
+
+        print(f"{fmt:>8} {write_time:>9.2f} {read_all:>11.2f} {read_cols:>13.2f} {size_mb:>9.1f} {str(dates_kept):>11}")
+
+    print(f"\nCompression for parquet/arrow: {dataset_io.COMPRESSION}")
+
+
+if __name__ == "__main__":
+    main()
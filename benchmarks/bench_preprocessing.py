@@ -0,0 +1,115 @@
+"""
+Chunked preprocessing (preprocessing.preprocess) against the original
+in-memory version on a synthetic raw ledger with duplicates, gaps and
+outliers: wall time, and parity of the rows kept and the scaled values.
+
+Run from the repository root:
+
+    python -m benchmarks.bench_preprocessing --rows 1000000 --workers 4
+"""
+import argparse
+import os
+import tempfile
+import time
+
+import numpy as np
+import pandas as pd
+
+from dataset_io import read_dataset
+from preprocessing import numeric_cols, preprocess
+
+# Scaled values are compared with this absolute tolerance; the IQR bounds
+# come from quantile sketches instead of exact quantiles.
+SCALED_TOLERANCE = 0.02
+
+
+def make_raw_csv(path, rows, seed=12):
+    rng = np.random.default_rng(seed)
+    revenue = rng.lognormal(10, 1, rows)
+    cogs = revenue * rng.uniform(0.3, 0.95, rows)
+    opex = revenue * rng.uniform(0.05, 0.4, rows)
+    dates = pd.Timestamp("2022-01-01") + pd.to_timedelta(rng.integers(0, 1095, rows), unit="D")
+
+    df = pd.DataFrame({
+        "TransactionID": rng.integers(1, rows // 2 + 2, rows),
+        "TransactionDate": dates.strftime("%Y-%m-%d"),
+        "OrderID": rng.integers(1, 10**7, rows),
+        "Revenue": revenue.round(2),
+        "COGS": cogs.round(2),
+        "GrossProfit": (revenue - cogs).round(2),
+        "OperatingExpenses": opex.round(2),
+        "NetProfit": (revenue - cogs - opex).round(2),
+    })
+
+    # exact duplicates, missing values, unparseable dates and outliers
+    dup = rng.choice(rows, rows // 10, replace=False).reshape(2, -1)
+    df.iloc[dup[1]] = df.iloc[dup[0]].to_numpy()
+    for col in ["Revenue", "OperatingExpenses", "TransactionDate"]:
+        df.loc[rng.random(rows) < 0.01, col] = None
+    df.loc[rng.random(rows) < 0.001, "Revenue"] *= 1000
+    df.loc[0, "TransactionDate"] = None
+    df.to_csv(path, index=False)
+
+
+def reference(path):
+    """
+    The original whole-file preprocessing, with exact quantiles.
+    """
+    df = pd.read_csv(path, dtype={"TransactionID": str, "OrderID": str})
+    df["TransactionDate"] = pd.to_datetime(df["TransactionDate"], errors="coerce")
+    for col in numeric_cols:
+        df[col] = pd.to_numeric(df[col], errors="coerce")
+    df[numeric_cols] = df[numeric_cols].fillna(0)
+    df["TransactionDate"] = df["TransactionDate"].ffill()
+    df = df.drop_duplicates().reset_index(drop=True)
+    for col in numeric_cols:
+        q1 = df[col].quantile(0.25)
+        q3 = df[col].quantile(0.75)
+        iqr = q3 - q1
+        df[col] = df[col].clip(q1 - 1.5 * iqr, q3 + 1.5 * iqr)
+        low, high = df[col].min(), df[col].max()
+        df[col] = (df[col] - low) / ((high - low) or 1.0)
+    return df
+
+
+def timed(fn):
+    start = time.perf_counter()
+    result = fn()
+    return result, time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--rows", type=int, default=200_000)
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1)
+    parser.add_argument("--chunk-mb", type=float, default=4)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        raw = os.path.join(tmp, "financial_data.csv")
+        make_raw_csv(raw, args.rows)
+        print(f"Raw CSV: {args.rows:,} rows, {os.path.getsize(raw) / 1e6:.1f} MB")
+
+        expected, t_ref = timed(lambda: reference(raw))
+        print(f"in-memory (exact quantiles): {t_ref:8.2f}s")
+
+        chunk_bytes = int(args.chunk_mb * 1024 * 1024)
+        for workers in sorted({1, args.workers}):
+            base = os.path.join(tmp, f"processed_{workers}")
+            (_, stats), elapsed = timed(lambda: preprocess(raw, base, workers, chunk_bytes))
+            got, _ = read_dataset(base)
+            print(f"chunked, {workers} worker(s):       {elapsed:8.2f}s "
+                  f"({stats.rows_in - stats.rows_out:,} duplicates removed)")
+
+            assert len(got) == len(expected), (len(got), len(expected))
+            for col in ["TransactionID", "OrderID", "TransactionDate"]:
+                pd.testing.assert_series_equal(got[col], expected[col], check_dtype=False)
+            worst = max(float(np.abs(got[col] - expected[col]).max()) for col in numeric_cols)
+            assert worst <= SCALED_TOLERANCE, worst
+            print(f"   max |scaled diff| vs exact: {worst:.4f}")
+
+    print("✅ Chunked preprocessing matches the in-memory pipeline")
+
+
+if __name__ == "__main__":
+    main()
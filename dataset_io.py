@@ -0,0 +1,182 @@
+# ==============================
+# Dataset I/O for the ML pipeline
+# ==============================
+# preprocessing.py and training.py exchange data through these helpers.
+# Parquet (or Arrow IPC) keeps dtypes such as the parsed TransactionDate,
+# compresses well and lets training read only the columns it needs. CSV is
+# still written/read when pyarrow is not installed or DATA_FORMAT=csv.
+
+import json
+import os
+from datetime import datetime, timezone
+
+import pandas as pd
+
+try:
+    import pyarrow as pa
+    import pyarrow.feather as feather
+    import pyarrow.parquet as pq
+    ARROW_AVAILABLE = True
+except ImportError:
+    ARROW_AVAILABLE = False
+
+DATA_FORMAT = os.getenv("DATA_FORMAT", "parquet")  # parquet | arrow | csv
+COMPRESSION = os.getenv("DATA_COMPRESSION", "zstd")
+
+EXTENSIONS = {"parquet": ".parquet", "arrow": ".arrow", "csv": ".csv"}
+METADATA_KEY = b"sme_health"
+
+
+def resolve_format(fmt=None):
+    fmt = fmt or DATA_FORMAT
+    if fmt not in EXTENSIONS:
+        raise ValueError(f"Unknown data format: {fmt!r}")
+    if fmt != "csv" and not ARROW_AVAILABLE:
+        print(f"⚠️ pyarrow not installed — writing CSV instead of {fmt}")
+        return "csv"
+    return fmt
+
+
+def describe(df, producer):
+    return {
+        "producer": producer,
+        "created_at": datetime.now(timezone.utc).isoformat(),
+        "rows": int(len(df)),
+        "dtypes": {col: str(dtype) for col, dtype in df.dtypes.items()},
+    }
+
+
+def to_arrow_table(df, producer, description=None):
+    table = pa.Table.from_pandas(df, preserve_index=False)
+    metadata = dict(table.schema.metadata or {})
+    metadata[METADATA_KEY] = json.dumps(description or describe(df, producer)).encode("utf-8")
+    return table.replace_schema_metadata(metadata)
+
+
+def write_dataset(df, base_path, fmt=None, producer="preprocessing.py"):
+    """
+    Write df to base_path + extension of the chosen format. Returns the path.
+    """
+    fmt = resolve_format(fmt)
+    path = base_path + EXTENSIONS[fmt]
+
+    if fmt == "parquet":
+        pq.write_table(to_arrow_table(df, producer), path, compression=COMPRESSION)
+    elif fmt == "arrow":
+        feather.write_feather(to_arrow_table(df, producer), path, compression=COMPRESSION)
+    else:
+        df.to_csv(path, index=False)
+    return path
+
+
+def find_dataset(base_path):
+    """
+    First existing artifact for base_path, preferring columnar formats.
+    """
+    for fmt in ("parquet", "arrow", "csv"):
+        path = base_path + EXTENSIONS[fmt]
+        if os.path.exists(path) and (fmt == "csv" or ARROW_AVAILABLE):
+            return path, fmt
+    raise FileNotFoundError(f"No dataset found for {base_path} (.parquet/.arrow/.csv)")
+
+
+def dataset_columns(path, fmt):
+    if fmt == "parquet":
+        return pq.read_schema(path).names
+    if fmt == "arrow":
+        return feather.read_table(path, memory_map=True).schema.names
+    return pd.read_csv(path, nrows=0).columns.str.strip().tolist()
+
+
+def read_dataset(base_path, columns=None):
+    """
+    Read a dataset written by write_dataset(). When columns is given only
+    those that exist are loaded (missing ones are left to the caller).
+    """
+    path, fmt = find_dataset(base_path)
+
+    if columns is not None:
+        available = set(dataset_columns(path, fmt))
+        columns = [c for c in columns if c in available]
+
+    if fmt == "parquet":
+        df = pq.read_table(path, columns=columns).to_pandas()
+    elif fmt == "arrow":
+        df = feather.read_table(path, columns=columns, memory_map=True).to_pandas()
+    else:
+        wanted = None if columns is None else set(columns)
+        df = pd.read_csv(path, usecols=None if wanted is None else lambda c: c.strip() in wanted)
+        df.columns = df.columns.str.strip()
+
+    if columns is not None:
+        df = df[columns]
+    return df, path
+
+
+def read_metadata(base_path):
+    path, fmt = find_dataset(base_path)
+    if fmt == "csv":
+        return None
+    if fmt == "parquet":
+        # File-level key/value metadata; DatasetWriter updates it on close
+        metadata = pq.read_metadata(path).metadata
+    else:
+        metadata = feather.read_table(path, memory_map=True).schema.metadata
+    raw = (metadata or {}).get(METADATA_KEY)
+    return json.loads(raw) if raw else None
+
+
+class DatasetWriter:
+    """
+    Incremental version of write_dataset() for data produced in chunks.
+    Every chunk must have the same columns; the first one fixes the schema.
+    The row count in the metadata is final for Parquet and null for Arrow,
+    whose schema (and metadata) is written before the first chunk.
+    """
+
+    def __init__(self, base_path, fmt=None, producer="preprocessing.py"):
+        self.fmt = resolve_format(fmt)
+        self.path = base_path + EXTENSIONS[self.fmt]
+        self.producer = producer
+        self.rows = 0
+        self._writer = None
+        self._schema = None
+        self._description = None
+
+    def write(self, df):
+        if self.fmt == "csv":
+            df.to_csv(self.path, mode="w" if self.rows == 0 else "a", header=self.rows == 0, index=False)
+        else:
+            if self._writer is None:
+                self._description = describe(df, self.producer)
+                self._description["rows"] = None
+                table = to_arrow_table(df, self.producer, self._description)
+                self._schema = table.schema
+                self._open(self._schema)
+            else:
+                table = pa.Table.from_pandas(df, preserve_index=False).cast(self._schema)
+            self._writer.write_table(table)
+        self.rows += len(df)
+
+    def _open(self, schema):
+        if self.fmt == "parquet":
+            self._writer = pq.ParquetWriter(self.path, schema, compression=COMPRESSION)
+        else:
+            options = pa.ipc.IpcWriteOptions(compression=COMPRESSION)
+            self._writer = pa.ipc.new_file(self.path, schema, options=options)
+
+    def close(self):
+        if self._writer is not None:
+            if self.fmt == "parquet":
+                self._description["rows"] = self.rows
+                self._writer.add_key_value_metadata(
+                    {METADATA_KEY: json.dumps(self._description).encode("utf-8")})
+            self._writer.close()
+            self._writer = None
+        return self.path
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
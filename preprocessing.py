@@ -1,35 +1,41 @@
-import pandas as pd
-import numpy as np
+import argparse
+import io
+import math
+import os
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
 
-# ==============================
-# 1️⃣ LOAD RAW DATA (SAFE MODE)
-# ==============================
-df = pd.read_csv("financial_data.csv")
-
-# 🚨 IF CSV LOADED AS SINGLE COLUMN, FIX IT
-if df.shape[1] == 1:
-    print("⚠️ CSV loaded as single column — fixing format")
-
-    df = df.iloc[:, 0].str.split(",", expand=True)
-    df.columns = [
-        "TransactionID",
-        "TransactionDate",
-        "OrderID",
-        "Revenue",
-        "COGS",
-        "GrossProfit",
-        "OperatingExpenses",
-        "NetProfit"
-    ]
+import numpy as np
+import pandas as pd
 
-print("✅ Dataset Loaded Correctly")
-print("Shape:", df.shape)
-print(df.head())
+from dataset_io import DatasetWriter
 
 # ==============================
-# 2️⃣ DATA TYPE CONVERSION
+# Out-of-core preprocessing pipeline
 # ==============================
-df["TransactionDate"] = pd.to_datetime(df["TransactionDate"], errors="coerce")
+# The raw CSV is split into byte ranges ("chunks") that are parsed
+# independently, so memory is bounded by the chunk size and chunks can be
+# handled in parallel by worker processes.
+#
+#   Pass 1 (scan):      parse chunks, drop duplicate rows with a hash set and
+#                       fold the remaining rows into mergeable statistics
+#                       (quantile sketches for the IQR bounds, min/max).
+#   Pass 2 (transform): parse chunks again, apply the same cleaning plus the
+#                       bounds/scaling from pass 1 and append to the output.
+#
+# IQR quantiles come from sketches with QUANTILE_ACCURACY relative error, so
+# clipping bounds can differ very slightly from the exact pandas quantiles.
+
+RAW_COLUMNS = [
+    "TransactionID",
+    "TransactionDate",
+    "OrderID",
+    "Revenue",
+    "COGS",
+    "GrossProfit",
+    "OperatingExpenses",
+    "NetProfit"
+]
 
 numeric_cols = [
     "Revenue",
@@ -39,68 +45,394 @@ numeric_cols = [
     "NetProfit"
 ]
 
-for col in numeric_cols:
-    df[col] = pd.to_numeric(df[col], errors="coerce")
+# Identifiers are kept as text so every chunk produces the same dtype
+ID_COLS = ["TransactionID", "OrderID"]
+
+CHUNK_BYTES = int(float(os.getenv("PREPROCESS_CHUNK_MB", "64")) * 1024 * 1024)
+WORKERS = int(os.getenv("PREPROCESS_WORKERS", "0")) or os.cpu_count() or 1
+QUANTILE_ACCURACY = float(os.getenv("PREPROCESS_QUANTILE_ACCURACY", "0.005"))
 
-# ==============================
-# 3️⃣ HANDLE MISSING VALUES
-# ==============================
-df[numeric_cols] = df[numeric_cols].fillna(0)
-df["TransactionDate"] = df["TransactionDate"].fillna(method="ffill")
 
 # ==============================
-# 4️⃣ REMOVE DUPLICATES
+# MERGEABLE STATISTICS
 # ==============================
-df.drop_duplicates(inplace=True)
+class QuantileSketch:
+    """
+    Relative-error quantile sketch (DDSketch-style). Values are counted in
+    logarithmic buckets, so any quantile is returned within `accuracy`
+    relative error, memory grows with the value range rather than the row
+    count, and sketches built on different chunks merge by adding counts.
+    """
+
+    def __init__(self, accuracy=QUANTILE_ACCURACY):
+        self.accuracy = accuracy
+        self.gamma = (1 + accuracy) / (1 - accuracy)
+        self._log_gamma = math.log(self.gamma)
+        self.positive = {}
+        self.negative = {}
+        self.zeros = 0
+        self.count = 0
+        self.min = math.inf
+        self.max = -math.inf
+
+    def _add_buckets(self, store, magnitudes):
+        keys, counts = np.unique(np.ceil(np.log(magnitudes) / self._log_gamma).astype(np.int64),
+                                 return_counts=True)
+        for key, count in zip(keys.tolist(), counts.tolist()):
+            store[key] = store.get(key, 0) + count
+
+    def update(self, values):
+        values = np.asarray(values, dtype=np.float64)
+        values = values[~np.isnan(values)]
+        if not len(values):
+            return self
+        self._add_buckets(self.positive, values[values > 0])
+        self._add_buckets(self.negative, -values[values < 0])
+        self.zeros += int(np.count_nonzero(values == 0))
+        self.count += len(values)
+        self.min = min(self.min, float(values.min()))
+        self.max = max(self.max, float(values.max()))
+        return self
+
+    def merge(self, other):
+        for store, incoming in ((self.positive, other.positive), (self.negative, other.negative)):
+            for key, count in incoming.items():
+                store[key] = store.get(key, 0) + count
+        self.zeros += other.zeros
+        self.count += other.count
+        self.min = min(self.min, other.min)
+        self.max = max(self.max, other.max)
+        return self
+
+    def _bucket_value(self, key):
+        return 2 * self.gamma ** key / (self.gamma + 1)
+
+    def quantile(self, q):
+        if not self.count:
+            return math.nan
+        rank = q * (self.count - 1)
+        seen = 0
+        # ascending order: most negative values first
+        for key in sorted(self.negative, reverse=True):
+            seen += self.negative[key]
+            if seen > rank:
+                return max(-self._bucket_value(key), self.min)
+        seen += self.zeros
+        if seen > rank:
+            return 0.0
+        for key in sorted(self.positive):
+            seen += self.positive[key]
+            if seen > rank:
+                return min(self._bucket_value(key), self.max)
+        return self.max
+
+
+class ScanStats:
+    """
+    Everything pass 1 learns about the deduplicated rows.
+    """
+
+    def __init__(self):
+        self.sketches = {col: QuantileSketch() for col in numeric_cols}
+        self.rows_in = 0
+        self.rows_out = 0
+
+    def update(self, numeric):
+        for col in numeric_cols:
+            self.sketches[col].update(numeric[col])
+        self.rows_out += len(numeric[numeric_cols[0]])
+
+    def bounds(self, col):
+        """
+        IQR clipping bounds, as in q1 - 1.5 * iqr / q3 + 1.5 * iqr.
+        """
+        sketch = self.sketches[col]
+        q1 = sketch.quantile(0.25)
+        q3 = sketch.quantile(0.75)
+        iqr = q3 - q1
+        return q1 - 1.5 * iqr, q3 + 1.5 * iqr
+
+    def scaling(self):
+        """
+        (lower, upper, min, scale) per column. Clipping is monotonic, so the
+        min/max after clipping are the clipped raw min/max; a constant column
+        is scaled by 1 like MinMaxScaler does.
+        """
+        params = {}
+        for col in numeric_cols:
+            lower, upper = self.bounds(col)
+            sketch = self.sketches[col]
+            low = float(np.clip(sketch.min, lower, upper))
+            high = float(np.clip(sketch.max, lower, upper))
+            params[col] = (lower, upper, low, (high - low) or 1.0)
+        return params
+
 
 # ==============================
-# 5️⃣ FEATURE ENGINEERING
+# 1️⃣ LOAD RAW DATA (CHUNKED)
 # ==============================
-df["Profit_Margin"] = np.where(
-    df["Revenue"] > 0,
-    df["NetProfit"] / df["Revenue"],
-    0
-)
+def plan_chunks(path, chunk_bytes=None):
+    """
+    Header line plus (start, end) byte ranges that each hold whole lines.
+    Assumes no quoted field spans a line break, as in the exported ledgers.
+    """
+    chunk_bytes = chunk_bytes or CHUNK_BYTES
+    size = os.path.getsize(path)
+    spans = []
+    with open(path, "rb") as f:
+        header = f.readline()
+        start = f.tell()
+        while start < size:
+            f.seek(min(start + chunk_bytes, size))
+            f.readline()  # move to the end of the current line
+            end = min(f.tell(), size)
+            spans.append((start, end))
+            start = end
+    return header, spans
+
+
+def read_chunk(path, header, span):
+    start, end = span
+    with open(path, "rb") as f:
+        f.seek(start)
+        data = f.read(end - start)
 
-df["Cost_Ratio"] = np.where(
-    df["Revenue"] > 0,
-    df["OperatingExpenses"] / df["Revenue"],
-    0
-)
+    dtype = {col: str for col in ID_COLS}
+    df = pd.read_csv(io.BytesIO(header + data), dtype=dtype)
+
+    # 🚨 IF CSV LOADED AS SINGLE COLUMN, FIX IT
+    if df.shape[1] == 1:
+        df = df.iloc[:, 0].str.split(",", expand=True)
+        df.columns = RAW_COLUMNS
+
+    return df
 
-df["Loss_Flag"] = (df["NetProfit"] < 0).astype(int)
 
 # ==============================
-# 6️⃣ TIME FEATURES
+# 2️⃣ DATA TYPE CONVERSION + 3️⃣ MISSING VALUES
 # ==============================
-df["Year"] = df["TransactionDate"].dt.year
-df["Month"] = df["TransactionDate"].dt.month
-df["Day"] = df["TransactionDate"].dt.day
+def clean_chunk(df):
+    """
+    Types and numeric fill. TransactionDate is forward-filled within the
+    chunk only; leading gaps are filled from the previous chunk by the caller.
+    """
+    df["TransactionDate"] = pd.to_datetime(df["TransactionDate"], errors="coerce").ffill()
+    for col in numeric_cols:
+        df[col] = pd.to_numeric(df[col], errors="coerce")
+    df[numeric_cols] = df[numeric_cols].fillna(0)
+    return df
+
+
+def fill_leading_dates(df, carry):
+    """
+    Forward-fill across the chunk boundary: the leading NaT rows take the
+    last valid date of the previous chunk.
+    """
+    if carry is not None:
+        leading = _leading_gaps(df["TransactionDate"])
+        if leading.any():
+            df.loc[leading, "TransactionDate"] = carry
+    return df
+
+
+def _leading_gaps(dates):
+    return dates.isna() & dates.notna().cumsum().eq(0)
+
+
+def row_hashes(df):
+    """
+    64-bit hash per row over all columns except the date, which is combined
+    by the parent once the cross-chunk date fill is known.
+    """
+    return pd.util.hash_pandas_object(df.drop(columns="TransactionDate"), index=False).to_numpy()
+
+
+def _combine_date_hash(partial, dates):
+    date_hash = pd.util.hash_pandas_object(pd.Series(dates), index=False).to_numpy()
+    return partial * np.uint64(0x9E3779B97F4A7C15) ^ date_hash
+
 
 # ==============================
-# 7️⃣ OUTLIER HANDLING
+# PASS 1 — SCAN
 # ==============================
-for col in numeric_cols:
-    q1 = df[col].quantile(0.25)
-    q3 = df[col].quantile(0.75)
-    iqr = q3 - q1
-    lower = q1 - 1.5 * iqr
-    upper = q3 + 1.5 * iqr
-    df[col] = df[col].clip(lower, upper)
+def scan_chunk(path, header, span):
+    """
+    Worker side of pass 1: parse and clean one chunk, return row hashes, the
+    (within-chunk filled) dates and the numeric columns for the parent.
+    """
+    df = clean_chunk(read_chunk(path, header, span))
+    dates = df["TransactionDate"]
+    return {
+        "hashes": row_hashes(df),
+        "dates": dates.to_numpy(),
+        "last_date": dates.dropna().iloc[-1] if dates.notna().any() else None,
+        "numeric": {col: df[col].to_numpy(dtype=np.float64) for col in numeric_cols},
+    }
+
+
+def _first_seen(hashes, seen):
+    """
+    Mask of rows whose hash was not seen before (in this chunk or earlier
+    ones), keeping the first occurrence like drop_duplicates(). Updates seen.
+    """
+    _, first_index = np.unique(hashes, return_index=True)
+    keep = np.zeros(len(hashes), dtype=bool)
+    keep[first_index] = True
+    for i in np.flatnonzero(keep):
+        h = int(hashes[i])
+        if h in seen:
+            keep[i] = False
+        else:
+            seen.add(h)
+    return keep
+
+
+def scan(path, header, spans, pool=None):
+    """
+    Pass 1. Returns the ScanStats plus, per chunk, the date carried in from
+    the previous chunk and the packed keep-mask of deduplicated rows.
+    """
+    stats = ScanStats()
+    seen = set()
+    carries, masks = [], []
+    carry = None
+
+    results = _ordered_map(pool, scan_chunk, [(path, header, span) for span in spans])
+    for result in results:
+        dates = pd.Series(result["dates"])
+        leading = _leading_gaps(dates)
+        if carry is not None and leading.any():
+            dates[leading] = carry
+        carries.append(carry)
+        if result["last_date"] is not None:
+            carry = result["last_date"]
+
+        keep = _first_seen(_combine_date_hash(result["hashes"], dates), seen)
+        masks.append(np.packbits(keep))
+        stats.rows_in += len(keep)
+        stats.update({col: values[keep] for col, values in result["numeric"].items()})
+
+    return stats, carries, masks
+
 
 # ==============================
-# 8️⃣ NORMALIZATION
+# PASS 2 — TRANSFORM
 # ==============================
-from sklearn.preprocessing import MinMaxScaler
+def transform_chunk(path, header, span, carry, packed_mask, params):
+    df = clean_chunk(read_chunk(path, header, span))
+    df = fill_leading_dates(df, carry)
+
+    # 4️⃣ REMOVE DUPLICATES (mask computed in pass 1)
+    keep = np.unpackbits(packed_mask, count=len(df)).astype(bool)
+    df = df[keep].reset_index(drop=True)
+
+    # 5️⃣ FEATURE ENGINEERING
+    df["Profit_Margin"] = np.where(
+        df["Revenue"] > 0,
+        df["NetProfit"] / df["Revenue"],
+        0
+    )
+
+    df["Cost_Ratio"] = np.where(
+        df["Revenue"] > 0,
+        df["OperatingExpenses"] / df["Revenue"],
+        0
+    )
+
+    df["Loss_Flag"] = (df["NetProfit"] < 0).astype(int)
+
+    # 6️⃣ TIME FEATURES (nullable ints so every chunk has the same schema)
+    df["Year"] = df["TransactionDate"].dt.year.astype("Int64")
+    df["Month"] = df["TransactionDate"].dt.month.astype("Int64")
+    df["Day"] = df["TransactionDate"].dt.day.astype("Int64")
+
+    # 7️⃣ OUTLIER HANDLING + 8️⃣ NORMALIZATION
+    for col in numeric_cols:
+        lower, upper, low, scale = params[col]
+        df[col] = (df[col].clip(lower, upper) - low) / scale
+
+    return df
+
+
+def transform(path, header, spans, carries, masks, params, output_base, pool=None, fmt=None):
+    """
+    Pass 2. Chunks are written in file order. Returns (output_path, rows).
+    """
+    tasks = [
+        (path, header, span, carry, mask, params)
+        for span, carry, mask in zip(spans, carries, masks)
+    ]
+    with DatasetWriter(output_base, fmt=fmt) as writer:
+        for df in _ordered_map(pool, transform_chunk, tasks):
+            writer.write(df)
+    return writer.path, writer.rows
 
-scaler = MinMaxScaler()
-df[numeric_cols] = scaler.fit_transform(df[numeric_cols])
 
 # ==============================
-# 9️⃣ SAVE OUTPUT
+# PARALLEL EXECUTION
 # ==============================
-df.to_csv("processed_data.csv", index=False)
+def _ordered_map(pool, fn, tasks, window=None):
+    """
+    Like pool.map() but with at most `window` chunks in flight, so results
+    waiting to be consumed never hold more than a few chunks in memory.
+    Runs inline when pool is None.
+    """
+    if pool is None:
+        for args in tasks:
+            yield fn(*args)
+        return
+
+    window = window or 2 * pool._max_workers
+    pending = deque()
+    for args in tasks:
+        pending.append(pool.submit(fn, *args))
+        if len(pending) >= window:
+            yield pending.popleft().result()
+    while pending:
+        yield pending.popleft().result()
+
+
+def preprocess(input_path="financial_data.csv", output_base="processed_data",
+               workers=None, chunk_bytes=None, fmt=None):
+    """
+    Run both passes. Returns (output_path, stats).
+    """
+    workers = workers or WORKERS
+    header, spans = plan_chunks(input_path, chunk_bytes)
+
+    pool = ProcessPoolExecutor(max_workers=workers) if workers > 1 and len(spans) > 1 else None
+    try:
+        stats, carries, masks = scan(input_path, header, spans, pool)
+        output_path, rows = transform(input_path, header, spans, carries, masks,
+                                      stats.scaling(), output_base, pool, fmt)
+    finally:
+        if pool is not None:
+            pool.shutdown()
+
+    if rows == 0:
+        raise ValueError(f"No rows found in {input_path}")
+    return output_path, stats
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Preprocess raw SME transactions")
+    parser.add_argument("input", nargs="?", default="financial_data.csv")
+    parser.add_argument("--output", default="processed_data", help="output path without extension")
+    parser.add_argument("--workers", type=int, default=None)
+    parser.add_argument("--chunk-mb", type=float, default=None)
+    args = parser.parse_args()
+
+    chunk_bytes = int(args.chunk_mb * 1024 * 1024) if args.chunk_mb else None
+    output_path, stats = preprocess(args.input, args.output, args.workers, chunk_bytes)
+
+    print("\n✅ PREPROCESSING COMPLETED SUCCESSFULLY")
+    print("📁 Output saved as", output_path)
+    print(f"Rows: {stats.rows_in} read, {stats.rows_in - stats.rows_out} duplicates removed, "
+          f"{stats.rows_out} written")
+    for col in numeric_cols:
+        lower, upper = stats.bounds(col)
+        print(f"   {col}: clip [{lower:,.2f}, {upper:,.2f}]")
+
 
-print("\n✅ PREPROCESSING COMPLETED SUCCESSFULLY")
-print("📁 Output saved as processed_data.csv")
-print("Final shape:", df.shape)
+if __name__ == "__main__":
+    main()